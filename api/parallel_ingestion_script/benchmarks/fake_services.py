@@ -0,0 +1,253 @@
+import re
+import gzip
+import json
+import math
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+from src.core.chunk_planner import parse_timespan
+
+# Local stand-ins for Advanced Hunting and ADX, so the real engine can be driven end to end without
+# touching Defender quotas or a cluster.
+
+EPOCH = datetime(2024, 1, 1)
+TICKS_PER_SECOND = 10_000_000
+DATETIME_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:\.(\d+))?")
+CONDITION_PATTERN = re.compile(r"(>=|<=|>|<) datetime\('([^']*)'\)")
+
+
+def to_ticks(value: str) -> int:
+    date_part, time_part, fraction = DATETIME_PATTERN.match(value.strip()).groups()
+    seconds = (datetime.strptime(f"{date_part}T{time_part}", "%Y-%m-%dT%H:%M:%S") - EPOCH).total_seconds()
+    return int(seconds) * TICKS_PER_SECOND + int((fraction or "0")[:7].ljust(7, "0"))
+
+
+def from_ticks(ticks: int) -> str:
+    seconds, fraction = divmod(ticks, TICKS_PER_SECOND)
+    return (EPOCH + timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%S") + f".{fraction:07d}Z"
+
+
+class SyntheticTable:
+    # Row i is generated on demand with watermark i * step ticks after EPOCH, so a watermark
+    # condition maps straight to an index range and huge tables cost no memory.
+
+    def __init__(self, rows: int, width: int = 256, step_ms: float = 100.0):
+        self.rows = rows
+        self.step = max(int(step_ms * 10_000), 1)
+        self.filler = ("x" * width)
+
+    def watermark(self, i: int) -> str:
+        return from_ticks(i * self.step)
+
+    def row(self, i: int) -> dict:
+        return {
+            "Timestamp": self.watermark(i),
+            "DeviceId": f"device-{i % 500}",
+            "ActionType": ("ProcessCreated", "FileModified", "ConnectionSuccess")[i % 3],
+            "ReportId": i,
+            "AdditionalFields": self.filler,
+        }
+
+    def narrow(self, low: int, high: int, operator: str, value: str):
+        position = to_ticks(value) / self.step
+        if operator == ">":
+            low = max(low, math.floor(position) + 1)
+        elif operator == ">=":
+            low = max(low, math.ceil(position))
+        elif operator == "<":
+            high = min(high, math.ceil(position))
+        else:
+            high = min(high, math.floor(position) + 1)
+        return low, max(low, high)
+
+
+class FakeHuntingApi:
+    # Answers the queries the engine and reprocessor send (keyset and histogram plans, counts,
+    # medians, row_number pages and watermark ranges) over synthetic tables. latency delays every
+    # call, every throttle_every-th call gets a 429 with Retry-After, and results larger than
+    # max_result_rows fail with the result-size error Defender returns.
+
+    def __init__(self, tables: dict, latency: float = 0.0, throttle_every: int = 0, retry_after: int = 1, max_result_rows: int = 0):
+        self.tables = tables
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.max_result_rows = max_result_rows
+        self.stats = {"calls": 0, "throttled": 0, "size_limited": 0, "rows_sent": 0, "bytes_sent": 0}
+
+    def run(self, query: str) -> list:
+        parts = [part.strip() for part in query.split(" | ")]
+        table = self.tables[parts[0]]
+        low, high = 0, table.rows
+
+        for part in parts[1:]:
+            if part.startswith("extend") and "ingestion_time()" in part:
+                continue
+            match = re.match(r"where rownum between \((\d+) \.\. (\d+)\)", part)
+            if match:
+                start = low + int(match.group(1)) - 1
+                low, high = start, min(high, low + int(match.group(2)))
+                continue
+            if part.startswith("where"):
+                for operator, value in CONDITION_PATTERN.findall(part):
+                    low, high = table.narrow(low, high, operator, value)
+                continue
+            if part == "count":
+                return [{"Count": high - low}]
+            if "row_cumsum" in query and part.startswith("summarize Count = count() by"):
+                chunk_size = int(re.search(r"/ (\d+)", query).group(1))
+                return [
+                    {
+                        "ChunkIndex": index,
+                        "LowWatermark": table.watermark(start),
+                        "HighWatermark": table.watermark(min(start + chunk_size, high) - 1),
+                        "Records": min(start + chunk_size, high) - start
+                    }
+                    for index, start in enumerate(range(low, high, chunk_size))
+                ]
+            match = re.match(r"summarize Count = count\(\) by Bin = bin\(\w+, (\w+)\)", part)
+            if match:
+                return self.histogram(table, low, high, parse_timespan(match.group(1)))
+            if re.match(r"summarize Median = percentile\(\w+, 50\)", part):
+                return [{"Median": table.watermark(low + (high - low) // 2) if high > low else None}]
+            if part.startswith("sort by") or part.startswith("extend rownum") or part == "project-away rownum":
+                continue
+            raise ValueError(f"Unsupported query operator: {part}")
+
+        return [table.row(i) for i in range(low, high)]
+
+    def histogram(self, table: SyntheticTable, low: int, high: int, bin_size: timedelta) -> list:
+        bin_ticks = max(int(bin_size.total_seconds() * TICKS_PER_SECOND), 1)
+        counts = {}
+        if high > low:
+            first, last = low * table.step // bin_ticks, (high - 1) * table.step // bin_ticks
+            if last - first > high - low:
+                for i in range(low, high):
+                    counts[i * table.step // bin_ticks] = counts.get(i * table.step // bin_ticks, 0) + 1
+            else:
+                for b in range(first, last + 1):
+                    start, end = table.narrow(low, high, ">=", from_ticks(b * bin_ticks))
+                    start, end = table.narrow(start, end, "<", from_ticks((b + 1) * bin_ticks))
+                    if end > start:
+                        counts[b] = end - start
+        return [{"Bin": from_ticks(b * bin_ticks), "Count": c} for b, c in sorted(counts.items())]
+
+    async def hunting(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.stats["calls"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.throttle_every and self.stats["calls"] % self.throttle_every == 0:
+            self.stats["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.retry_after)}, text='{"error":{"code":"TooManyRequests"}}')
+
+        try:
+            rows = self.run(body["Query"])
+        except Exception as e:
+            return web.Response(status=400, text=json.dumps({"error": {"message": f"Syntax error: {e}"}}))
+
+        if self.max_result_rows and len(rows) > self.max_result_rows:
+            self.stats["size_limited"] += 1
+            return web.Response(status=400, text='{"error":{"message":"Query result size exceeded the limit"}}')
+
+        data = json.dumps({"Schema": [], "Results": rows}).encode("utf-8")
+        self.stats["rows_sent"] += len(rows)
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data, compresslevel=1)
+            self.stats["bytes_sent"] += len(data)
+            return web.Response(body=data, headers={"Content-Encoding": "gzip", "Content-Type": "application/json"})
+        self.stats["bytes_sent"] += len(data)
+        return web.Response(body=data, content_type="application/json")
+
+    async def token(self, request: web.Request) -> web.Response:
+        return web.json_response({"access_token": "benchmark", "expires_in": "3600"})
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def serve(self, port: int, ready=None) -> None:
+        # Blocks serving on 127.0.0.1:port; run it in its own process so the fake's JSON encoding
+        # does not compete with the engine for the event loop.
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_post("/api/advancedhunting/run", self.hunting)
+        app.router.add_post("/{tenant}/oauth2/token", self.token)
+        app.router.add_get("/stats", self.get_stats)
+
+        async def start():
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", port).start()
+            if ready is not None:
+                ready.put(port)
+            await asyncio.Event().wait()
+
+        asyncio.run(start())
+
+
+class FakeIngestClient:
+    # Stands in for QueuedIngestClient: reads each payload as an upload would and counts it.
+    # ingest_latency adds a fixed delay per ingestion, like a blob upload and queue post.
+
+    def __init__(self, ingest_latency: float = 0.0):
+        self.ingest_latency = ingest_latency
+        self.lock = threading.Lock()
+        self.stats = {"ingestions": 0, "bytes": 0}
+
+    def _consume(self, stream) -> None:
+        size = 0
+        while True:
+            block = stream.read(1024 * 1024)
+            if not block:
+                break
+            size += len(block)
+        if self.ingest_latency:
+            time.sleep(self.ingest_latency)
+        with self.lock:
+            self.stats["ingestions"] += 1
+            self.stats["bytes"] += size
+
+    def ingest_from_stream(self, stream_descriptor, ingestion_properties):
+        self._consume(stream_descriptor.stream)
+        return SimpleNamespace(status="Queued", source_id=stream_descriptor.source_id)
+
+    def ingest_from_file(self, file_descriptor, ingestion_properties):
+        with open(file_descriptor.path, "rb") as f:
+            self._consume(f)
+        return SimpleNamespace(status="Queued", source_id=file_descriptor.source_id)
+
+
+class FakeRow(dict):
+    def to_dict(self) -> dict:
+        return dict(self)
+
+
+class FakeKustoClient:
+    # Stands in for KustoClient: commands succeed and are counted, and queries on the config table
+    # and the config and chunk-failure views return the rows the scenario seeded. Like the real
+    # view, the config view only returns active tables.
+
+    def __init__(self, config_table: str, config_view: str, chunk_audit_view: str, table_configs: list = None, failed_chunks: list = None):
+        table_configs = table_configs or []
+        self.views = {
+            config_table: table_configs,
+            config_view: [row for row in table_configs if row.get("IsActive")],
+            chunk_audit_view: failed_chunks or []
+        }
+        self.commands = 0
+
+    def execute(self, database: str, query: str):
+        for view, rows in self.views.items():
+            if query.strip().startswith(view):
+                return SimpleNamespace(primary_results=[[FakeRow(row) for row in rows]])
+        self.commands += 1
+        return None
+
+    def execute_mgmt(self, database: str, command: str):
+        self.commands += 1
+        return None
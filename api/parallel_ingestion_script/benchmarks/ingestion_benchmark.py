@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import contextlib
+import multiprocessing
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.ingestion_engine import Ingestor
+from src.core.chunk_reprocessor import Reprocessor
+from src.core.serialization import release_serialization_pool
+from src.core.chunk_planner import watermark_before
+from fake_services import TICKS_PER_SECOND, to_ticks, from_ticks, SyntheticTable, FakeHuntingApi, FakeIngestClient, FakeKustoClient
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Each scenario lists its synthetic tables as (name, rows), the fake Advanced Hunting behavior and
+# the bootstrap overrides it runs with. Row counts are multiplied by --scale.
+SCENARIOS = {
+    "many_small_tables": {
+        "description": "Incremental run over 50 small tables",
+        "tables": [(f"SmallTable{i:02d}", 4000) for i in range(50)],
+        "incremental": True,
+        "bootstrap": {"chunk_size": 1000},
+    },
+    "huge_backfill": {
+        "description": "Full load of one large table",
+        "tables": [("DeviceEvents", 500000)],
+        "bootstrap": {"chunk_size": 25000},
+    },
+    "throttled": {
+        "description": "Every 10th Defender call is throttled with Retry-After",
+        "tables": [(f"Throttled{i}", 20000) for i in range(5)],
+        "api": {"throttle_every": 10, "retry_after": 1},
+        "bootstrap": {"chunk_size": 5000},
+    },
+    "result_size_limit": {
+        "description": "Planned chunks exceed the result-size limit and are split",
+        "tables": [("DeviceProcessEvents", 100000)],
+        "api": {"max_result_rows": 20000},
+        "bootstrap": {"chunk_size": 50000},
+    },
+    "reprocess": {
+        "description": "Reprocessor replays 20 failed chunks",
+        "tables": [("DeviceNetworkEvents", 200000)],
+        "failed_chunks": 20,
+        "bootstrap": {"chunk_size": 10000},
+    },
+}
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(q / 100 * len(ordered)), len(ordered) - 1)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def check_watermark_before() -> None:
+    # Failed chunks record their exclusive high bound as the tick before it. A bound that is off by
+    # more than one 100ns tick leaves rows outside the range the reprocessor replays.
+    for ticks in (1_234_567, 1_234_560, TICKS_PER_SECOND, TICKS_PER_SECOND + 1, 86_400 * TICKS_PER_SECOND):
+        watermark = from_ticks(ticks)
+        if to_ticks(watermark_before(watermark)) != ticks - 1:
+            raise RuntimeError(f"watermark_before({watermark}) returned {watermark_before(watermark)}, expected {from_ticks(ticks - 1)}")
+
+
+class ChunkTimer:
+    # Records each chunk's latency from the start of its Defender fetch until its result is known,
+    # as the pipeline reports it: after ingestion, after its coalesced batch is ingested, or at the
+    # end of the fetch for chunks that end there (empty, failed or split).
+
+    sink = None
+    kusto = None
+
+    def __init__(self, *args, **kwargs):
+        self.chunk_latencies = []
+        super().__init__(*args, **kwargs)
+
+    def _create_adx_ingest_client(self):
+        return self.sink
+
+    def _create_adx_data_client(self):
+        return self.kusto
+
+    def observe_chunk(self, result_key, started):
+        self.chunk_latencies.append(time.perf_counter() - started)
+        super().observe_chunk(result_key, started)
+
+
+class BenchmarkIngestor(ChunkTimer, Ingestor):
+    pass
+
+
+class BenchmarkReprocessor(ChunkTimer, Reprocessor):
+    pass
+
+
+def build_bootstrap(port: int, overrides: dict) -> dict:
+    bootstrap = {
+        "adx_cluster_uri": "https://benchmark.kusto.windows.net",
+        "adx_ingest_uri": "https://ingest-benchmark.kusto.windows.net",
+        "adx_database": "benchmark",
+        "defender_resource_uri": "https://api.security.microsoft.com",
+        "defender_hunting_api_url": f"http://127.0.0.1:{port}/api/advancedhunting/run",
+        "aad_authority_host": f"http://127.0.0.1:{port}",
+        "config_table": "meta_MigrationConfiguration",
+        "config_view": "vw_meta_LatestMigrationConfiguration",
+        "audit_table": "meta_MigrationAudit",
+        "chunk_audit_table": "meta_ChunkIngestionFailures",
+        "chunk_audit_view": "vw_meta_LatestChunkIngestionFailures",
+        "max_concurrent_tasks": 5,
+        "max_thread_workers": 8,
+        "chunk_size": 25000,
+        "chunking_mode": "keyset",
+        "hunting_calls_per_minute": 100000,
+        "hunting_calls_per_hour": 1000000,
+        "clientId": "benchmark",
+        "clientSecret": "benchmark",
+        "tenantId": "benchmark",
+        "ingestion_start_time": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "ingestion_id": str(uuid.uuid4()),
+    }
+    bootstrap.update(overrides)
+    return bootstrap
+
+
+def build_tables(scenario: dict, scale: float, width: int) -> dict:
+    return {name: SyntheticTable(max(int(rows * scale), 1), width) for name, rows in scenario["tables"]}
+
+
+def table_config(name: str, table: SyntheticTable, incremental: bool, is_active: bool = True) -> dict:
+    # Incremental runs start from a high watermark halfway through the table.
+    return {
+        "SourceTable": name,
+        "DestinationFolder": "benchmark",
+        "DestinationTable": f"{name}_bench",
+        "WatermarkColumn": "Timestamp",
+        "HighWatermark": table.watermark(table.rows // 2) if incremental else None,
+        "LoadType": "Incremental" if incremental else "Full",
+        "IsActive": is_active,
+        "Weight": None,
+        "ChunkSize": None,
+        "CheckpointWatermark": None,
+    }
+
+
+def failed_chunks(name: str, table: SyntheticTable, count: int) -> list:
+    step = max(table.rows // count, 1)
+    return [
+        {
+            "ingestion_id": "benchmark",
+            "ingestion_timestamp": "2024-01-01T00:00:00Z",
+            "folder": "benchmark",
+            "table": f"{name}_bench",
+            "chunk_id": i + 1,
+            "success": False,
+            "records_count": step,
+            "low_watermark": table.watermark(start),
+            "high_watermark": table.watermark(min(start + step, table.rows) - 1),
+        }
+        for i, start in enumerate(range(0, step * count, step))
+    ]
+
+
+async def drive(name: str, scenario: dict, bootstrap: dict, tables: dict) -> dict:
+    failed = [chunk for table_name, table in tables.items() for chunk in failed_chunks(table_name, table, scenario["failed_chunks"])] if scenario.get("failed_chunks") else []
+    # A run that left failed chunks marks its table inactive, which is the state the reprocessor starts from.
+    configs = [table_config(table_name, table, scenario.get("incremental", False), not failed) for table_name, table in tables.items()]
+
+    ChunkTimer.sink = FakeIngestClient(bootstrap.get("benchmark_ingest_latency", 0.0))
+    ChunkTimer.kusto = FakeKustoClient(bootstrap["config_table"], bootstrap["config_view"], bootstrap["chunk_audit_view"], configs, failed)
+
+    engine_class = BenchmarkReprocessor if failed else BenchmarkIngestor
+    engine = engine_class(
+        bootstrap=bootstrap,
+        max_concurrent_tasks=bootstrap["max_concurrent_tasks"],
+        max_thread_workers=bootstrap["max_thread_workers"],
+        chunk_size=bootstrap["chunk_size"]
+    )
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    try:
+        if failed:
+            summary = await engine.reprocess_failed_chunks()
+        else:
+            summary = await engine.process_all_tables(configs)
+    finally:
+        elapsed = time.perf_counter() - start
+        engine.thread_pool.shutdown(wait=True)
+        engine.metadata_client.shutdown()
+        await engine.transport.close()
+        await engine.token_provider.close()
+        # Pool workers would otherwise keep this scenario process from exiting.
+        if engine.serialization_pool:
+            release_serialization_pool(engine.serialization_pool)
+
+    latencies = engine.chunk_latencies
+    records = summary.get("total_records_processed", 0)
+    return {
+        "scenario": name,
+        "records": records,
+        "seconds": elapsed,
+        "records_per_sec": records / elapsed if elapsed else 0.0,
+        "chunks": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "api_calls": summary["api_usage"]["calls"],
+        "throttled": summary["api_usage"]["throttled"],
+        "ingested_mb": ChunkTimer.sink.stats["bytes"] / 1024 / 1024,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_delta_mb": peak_rss_mb() - baseline_rss,
+    }
+
+
+def run_scenario(name: str, port: int, scale: float, width: int, overrides: dict, verbose: bool, queue) -> None:
+    scenario = SCENARIOS[name]
+    bootstrap = build_bootstrap(port, dict(scenario.get("bootstrap", {}), **overrides))
+    tables = build_tables(scenario, scale, width)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with output:
+        queue.put(asyncio.run(drive(name, scenario, bootstrap, tables)))
+
+
+def serve_fake_api(name: str, port: int, scale: float, width: int, latency: float, ready) -> None:
+    scenario = SCENARIOS[name]
+    FakeHuntingApi(build_tables(scenario, scale, width), latency=latency, **scenario.get("api", {})).serve(port, ready)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the ingestion engine and reprocessor against local Defender and ADX stand-ins.")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS), help=f"Scenarios to run: {', '.join(SCENARIOS)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for every scenario's row counts")
+    parser.add_argument("--width", type=int, default=256, help="Characters of filler per record")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake Advanced Hunting API waits per call")
+    parser.add_argument("--ingest-latency", type=float, default=0.0, help="Seconds the fake ingest client waits per ingestion")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Bootstrap override, value parsed as JSON when possible")
+    parser.add_argument("--json", help="Write the results to this file, for comparing runs")
+    parser.add_argument("--verbose", action="store_true", help="Show the engine's own output")
+    args = parser.parse_args()
+    check_watermark_before()
+
+    overrides = {"benchmark_ingest_latency": args.ingest_latency}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+
+    print(f"scale={args.scale} width={args.width} latency={args.latency}s ingest_latency={args.ingest_latency}s overrides={args.set}")
+    print(f"{'scenario':<20}{'records':>10}{'seconds':>9}{'rec/s':>10}{'chunks':>8}{'p50 ms':>9}{'p99 ms':>9}{'calls':>7}{'429s':>6}{'RSS MB':>8}")
+
+    # The fake API and each scenario run in fresh processes, so one scenario's peak RSS does not
+    # mask another's and the fake's JSON encoding does not share the engine's event loop.
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for name in args.scenarios:
+        port = free_port()
+        ready = context.Queue()
+        server = context.Process(target=serve_fake_api, args=(name, port, args.scale, args.width, args.latency, ready), daemon=True)
+        server.start()
+        ready.get(timeout=30)
+        try:
+            queue = context.Queue()
+            process = context.Process(target=run_scenario, args=(name, port, args.scale, args.width, overrides, args.verbose, queue))
+            process.start()
+            r = queue.get()
+            process.join()
+        finally:
+            server.terminate()
+            server.join()
+
+        results.append(r)
+        print(f"{r['scenario']:<20}{r['records']:>10,}{r['seconds']:>9.2f}{r['records_per_sec']:>10,.0f}{r['chunks']:>8}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['api_calls']:>7}{r['throttled']:>6}{r['peak_rss_mb']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import os
+import sys
+import json
+import time
+import random
+import string
+import argparse
+import multiprocessing
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azure.kusto.data.data_format import DataFormat
+from azure.kusto.ingest import IngestionProperties, IngestionMappingKind, StreamDescriptor
+from azure.kusto.ingest.base_ingest_client import BaseIngestClient
+
+from src.core.serialization import serialize_records, serialize_raw_response, orjson
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def build_records(rows: int, width: int):
+    random.seed(7)
+    filler = "".join(random.choices(string.ascii_letters + string.digits, k=width))
+    return [
+        {
+            "Timestamp": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}.{i % 10000000:07d}Z",
+            "DeviceId": f"device-{i % 500}",
+            "ActionType": random.choice(["ProcessCreated", "FileModified", "ConnectionSuccess"]),
+            "AdditionalFields": {"InitiatingProcess": f"proc-{i}.exe", "Raw": filler},
+            "ReportId": i,
+        }
+        for i in range(rows)
+    ]
+
+
+def ingestion_properties():
+    return IngestionProperties(
+        database="benchmark",
+        table="benchmark",
+        data_format=DataFormat.JSON,
+        ingestion_mapping_kind=IngestionMappingKind.JSON,
+        ingestion_mapping_reference="RawDataMap",
+    )
+
+
+def legacy_path(records):
+    # What Ingestor._sync_ingest_data used to hand to ingest_from_stream: one big str in a StringIO,
+    # which the SDK then encodes and compresses into yet another copy before upload.
+    data_as_str = "\n".join(json.dumps(r) for r in records)
+    descriptor = BaseIngestClient._prepare_stream(StreamDescriptor(StringIO(data_as_str)), ingestion_properties())
+    return len(data_as_str.encode("utf-8")), len(descriptor.stream.read())
+
+
+def compressed_path(records):
+    payload = serialize_records(records)
+    descriptor = BaseIngestClient._prepare_stream(
+        StreamDescriptor(payload["data_stream"], is_compressed=True, size=payload["raw_size"]), ingestion_properties()
+    )
+    return payload["raw_size"], len(descriptor.stream.read())
+
+
+def passthrough_path(response):
+    payload = serialize_raw_response(response, "Timestamp")
+    descriptor = BaseIngestClient._prepare_stream(
+        StreamDescriptor(payload["data_stream"], is_compressed=True, size=payload["raw_size"]), ingestion_properties()
+    )
+    return payload["raw_size"], len(descriptor.stream.read())
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_variant(variant: str, rows: int, width: int, repeats: int, queue) -> None:
+    records = build_records(rows, width)
+    # Every variant starts from the response body, as it arrives from Advanced Hunting.
+    response = json.dumps({"Schema": [], "Results": records}).encode("utf-8")
+    del records
+    baseline_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        if variant == "passthrough":
+            raw_size, wire_size = passthrough_path(response)
+        else:
+            serializer = legacy_path if variant == "legacy" else compressed_path
+            raw_size, wire_size = serializer(json.loads(response)["Results"])
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        "variant": variant,
+        "raw_mb": raw_size / 1024 / 1024,
+        "wire_mb": wire_size / 1024 / 1024,
+        "mb_per_sec": raw_size * repeats / 1024 / 1024 / elapsed,
+        "records_per_sec": rows * repeats / elapsed,
+        "peak_rss_delta_mb": peak_rss_mb() - baseline_rss,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the legacy, compressed and passthrough chunk serialization paths.")
+    parser.add_argument("--rows", type=int, default=25000)
+    parser.add_argument("--width", type=int, default=1024, help="Characters of filler per record")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"rows={args.rows:,} width={args.width} repeats={args.repeats} orjson={'yes' if orjson else 'no'}")
+    print(f"{'variant':<12}{'raw MB':>10}{'wire MB':>10}{'MB/s':>10}{'rec/s':>12}{'peak RSS +MB':>14}")
+
+    # Each variant runs in a fresh process so the peak RSS of one does not mask the other.
+    context = multiprocessing.get_context("spawn")
+    for variant in ("legacy", "compressed", "passthrough"):
+        queue = context.Queue()
+        process = context.Process(target=run_variant, args=(variant, args.rows, args.width, args.repeats, queue))
+        process.start()
+        r = queue.get()
+        process.join()
+        print(f"{r['variant']:<12}{r['raw_mb']:>10.1f}{r['wire_mb']:>10.1f}{r['mb_per_sec']:>10.1f}{r['records_per_sec']:>12,.0f}{r['peak_rss_delta_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
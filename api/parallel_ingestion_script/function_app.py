@@ -4,12 +4,11 @@ import json
 import logging
 import asyncio
 import threading
-import concurrent.futures
 
 import azure.functions as func
 import azure.durable_functions as df
 
-from src.run_ingestion import main
+from src.run_ingestion import bootstrap, main, reprocess_activity, plan_activity, ingest_partition_activity, commit_activity
 
 sys.path.insert(0, os.path.dirname(__file__))
 
@@ -32,16 +31,73 @@ async def adxingestor(req: func.HttpRequest, client) -> func.HttpResponse:
     
     return client.create_check_status_response(req, instance_id)
 
+_loop = None
+_loop_lock = threading.Lock()
+
+def run_async(coroutine_factory):
+    # Every activity runs on one long-lived event loop in its own thread, so the HTTP transport's
+    # pooled connections and the background token refreshes outlive a single invocation.
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            logging.info("[INFO] --> Starting the shared ingestion event loop")
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ingestion-loop", daemon=True).start()
+
+    return asyncio.run_coroutine_threadsafe(coroutine_factory(), _loop).result()
+
 @app.orchestration_trigger(context_name="context")
 def start_orchestrator(context: df.DurableOrchestrationContext):
     logging.info("[INFO] --> Started orchestration")
     
-    input_data = context.get_input()
-
-    result = yield context.call_activity("start_ingestion", input_data)
-
+    input_data = context.get_input() or {}
+
+    if not input_data.get("fan_out", bootstrap.get("fan_out", False)):
+        result = yield context.call_activity("start_ingestion", input_data)
+        logging.info(f"[INFO] --> Orchestration completed with result: {result}")
+        return result
+
+    # Fan-out: plan once, ingest each partition in its own activity with at most
+    # max_parallel_activities in flight, then commit the metadata once.
+    reprocessing_summary = yield context.call_activity("reprocess_chunks", input_data)
+    plan = yield context.call_activity("plan_ingestion", input_data)
+
+    if not plan["partitions"] and not plan["table_plans"]:
+        result = {"reprocessing_summary": reprocessing_summary, "processing_summary": "[INFO] --> No active tables found for migration"}
+        logging.info(f"[INFO] --> Orchestration completed with result: {result}")
+        return result
+
+    # A partition whose activity raises or times out is passed to the commit as its error, so the
+    # other partitions' results are still committed and its chunks are recorded for reprocessing.
+    # Partitions are not retried, since a partly ingested partition would be ingested twice.
+    def collect(task, partition):
+        try:
+            result = yield task
+        except Exception as e:
+            logging.error(f"[ERROR] --> Partition of {partition['table_plan']['table_config']['DestinationTable']} failed: {e}")
+            result = {"partition": partition, "error": f"Partition activity failed: {e}"}
+        return result
+
+    pending = []
+    partition_results = []
+    for partition in plan["partitions"]:
+        if len(pending) >= plan["run"]["max_parallel_activities"]:
+            finished = yield context.task_any([task for task, _ in pending])
+            entry = next(entry for entry in pending if entry[0] is finished)
+            pending.remove(entry)
+            partition_results.append((yield from collect(*entry)))
+        pending.append((context.call_activity("ingest_partition", {"run": plan["run"], "partition": partition}), partition))
+
+    for entry in pending:
+        partition_results.append((yield from collect(*entry)))
+
+    processing_summary = yield context.call_activity("commit_ingestion", {
+        "plan": {key: plan[key] for key in ("run", "table_configs", "table_plans")},
+        "partition_results": partition_results
+    })
+
+    result = {"reprocessing_summary": reprocessing_summary, "processing_summary": processing_summary}
     logging.info(f"[INFO] --> Orchestration completed with result: {result}")
-
     return result
 
 @app.activity_trigger(input_name="payload")
@@ -49,25 +105,7 @@ def start_ingestion(payload) -> dict:
     logging.info("[INFO] --> Started ingestion activity")
     
     try:
-        try:
-            loop = asyncio.get_running_loop()
-
-            logging.info("[INFO] --> Running in existing event loop")
-            
-            def run_main_in_thread():
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                try:
-                    return new_loop.run_until_complete(main())
-                finally:
-                    new_loop.close()
-            
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                executor.submit(run_main_in_thread)
-
-        except RuntimeError:
-            logging.info("[INFO] --> No existing event loop, using asyncio.run()")
-            result = asyncio.run(main())
+        result = run_async(main)
         
         return {
             "result": result if result else "Completed"
@@ -82,6 +120,26 @@ def start_ingestion(payload) -> dict:
             "result": None
         }
 
+@app.activity_trigger(input_name="payload")
+def reprocess_chunks(payload) -> dict:
+    logging.info("[INFO] --> Started reprocessing activity")
+    return run_async(reprocess_activity)
+
+@app.activity_trigger(input_name="payload")
+def plan_ingestion(payload) -> dict:
+    logging.info("[INFO] --> Started planning activity")
+    return run_async(plan_activity)
+
+@app.activity_trigger(input_name="payload")
+def ingest_partition(payload) -> dict:
+    logging.info(f"[INFO] --> Started ingestion activity for {payload['partition']['table_plan']['table_config']['DestinationTable']}")
+    return run_async(lambda: ingest_partition_activity(payload["run"], payload["partition"]))
+
+@app.activity_trigger(input_name="payload")
+def commit_ingestion(payload) -> dict:
+    logging.info("[INFO] --> Started commit activity")
+    return run_async(lambda: commit_activity(payload["plan"], payload["partition_results"]))
+
 @app.route(route="status/{instanceId}")
 @app.durable_client_input(client_name="client")
 async def get_status(req: func.HttpRequest, client) -> func.HttpResponse:
@@ -0,0 +1,130 @@
+import os
+import time
+import random
+import threading
+from typing import List, Dict, Any
+
+from azure.storage.blob import BlobServiceClient
+from azure.storage.queue import QueueServiceClient, TextBase64EncodePolicy
+from azure.kusto.ingest import QueuedIngestClient, IngestionProperties, BlobDescriptor
+from azure.kusto.ingest.ingestion_blob_info import IngestionBlobInfo
+
+
+class BlobIngestUploader:
+    # Uploads compressed chunk payloads straight to the ingestion temp storage and enqueues them
+    # with the same message ingest_from_blob would send. The storage and queue resources are read
+    # from the ingest client's resource manager once per resource_ttl instead of on every ingest.
+    # Each worker thread keeps its own storage clients, so uploads do not share (and queue behind)
+    # one connection pool, and each blob is uploaded in parallel blocks.
+
+    def __init__(
+        self,
+        ingest_client: QueuedIngestClient,
+        upload_concurrency: int = 4,
+        block_size: int = 4 * 1024 * 1024,
+        resource_ttl: float = 1800.0
+    ):
+        self.ingest_client = ingest_client
+        self.upload_concurrency = upload_concurrency
+        self.block_size = block_size
+        self.resource_ttl = resource_ttl
+
+        self.resources = None
+        self.resources_loaded = 0.0
+        self.resources_lock = threading.Lock()
+        self.local = threading.local()
+
+    def _get_resources(self) -> Dict[str, Any]:
+        # The ingest client's _resource_manager is private SDK API, used on purpose: it is the only way
+        # to reach the cluster's temp storage, ingestion queues and storage-account ranking that
+        # ingest_from_blob uses itself. requirements.txt pins azure-kusto-ingest to the version this
+        # was written against; re-check this class whenever that pin moves.
+        with self.resources_lock:
+            if self.resources is None or time.monotonic() - self.resources_loaded > self.resource_ttl:
+                resource_manager = self.ingest_client._resource_manager
+                self.resources = {
+                    "containers": resource_manager.get_containers(),
+                    "queues": resource_manager.get_ingestion_queues(),
+                    "authorization_context": resource_manager.get_authorization_context()
+                }
+                self.resources_loaded = time.monotonic()
+            return self.resources
+
+    def _report(self, storage_account_name: str, success: bool) -> None:
+        self.ingest_client._resource_manager.report_resource_usage_result(storage_account_name, success)
+
+    def _blob_service(self, account_uri: str) -> BlobServiceClient:
+        services = self.local.__dict__.setdefault("blob_services", {})
+        if account_uri not in services:
+            services[account_uri] = BlobServiceClient(
+                account_uri,
+                max_block_size=self.block_size,
+                max_single_put_size=self.block_size
+            )
+        return services[account_uri]
+
+    def _queue_client(self, queue) -> Any:
+        clients = self.local.__dict__.setdefault("queue_clients", {})
+        if queue.url not in clients:
+            clients[queue.url] = QueueServiceClient(queue.account_uri).get_queue_client(
+                queue=queue.object_name, message_encode_policy=TextBase64EncodePolicy()
+            )
+        return clients[queue.url]
+
+    def _ordered(self, resources: List[Any]) -> List[Any]:
+        # The resource manager ranks resources by recent success; rotating the start spreads
+        # concurrent workers over the top-ranked storage accounts.
+        if not resources:
+            raise RuntimeError("No ingestion storage resources available")
+        start = random.randrange(min(len(resources), 2))
+        return resources[start:] + resources[:start]
+
+    def upload(self, payload: Dict[str, Any], database: str, table: str, source_id: Any) -> BlobDescriptor:
+        spill_path = payload.get("spill_path")
+        blob_name = f"{database}__{table}__{source_id}__chunk.json.gz"
+
+        last_error = None
+        for container in self._ordered(self._get_resources()["containers"]):
+            try:
+                blob_client = self._blob_service(container.account_uri).get_blob_client(container=container.object_name, blob=blob_name)
+                if spill_path:
+                    with open(spill_path, "rb") as data:
+                        blob_client.upload_blob(data, length=os.path.getsize(spill_path), max_concurrency=self.upload_concurrency, overwrite=True)
+                else:
+                    data = payload["data_stream"]
+                    data.seek(0)
+                    blob_client.upload_blob(data, length=data.getbuffer().nbytes, max_concurrency=self.upload_concurrency, overwrite=True)
+                self._report(container.storage_account_name, True)
+                return BlobDescriptor(blob_client.url, payload["raw_size"], source_id)
+            except Exception as e:
+                last_error = e
+                self._report(container.storage_account_name, False)
+
+        raise last_error
+
+    def enqueue(self, blob_descriptor: BlobDescriptor, ingestion_properties: IngestionProperties) -> None:
+        resources = self._get_resources()
+        message = IngestionBlobInfo(
+            blob_descriptor,
+            ingestion_properties=ingestion_properties,
+            auth_context=resources["authorization_context"],
+            application_for_tracing=self.ingest_client.application_for_tracing,
+            client_version_for_tracing=self.ingest_client.client_version_for_tracing
+        ).to_json()
+
+        last_error = None
+        for queue in self._ordered(resources["queues"]):
+            try:
+                self._queue_client(queue).send_message(content=message)
+                self._report(queue.storage_account_name, True)
+                return
+            except Exception as e:
+                last_error = e
+                self._report(queue.storage_account_name, False)
+
+        raise last_error
+
+    def ingest(self, payload: Dict[str, Any], ingestion_properties: IngestionProperties, source_id: Any) -> BlobDescriptor:
+        blob_descriptor = self.upload(payload, ingestion_properties.database, ingestion_properties.table, source_id)
+        self.enqueue(blob_descriptor, ingestion_properties)
+        return blob_descriptor
@@ -0,0 +1,93 @@
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+
+from src.core.chunk_planner import parse_watermark
+from src.core.telemetry import log
+
+
+class WatermarkCheckpointer:
+    # Tracks the chunks of each table in watermark order and, every interval seconds, commits the
+    # high watermark of the longest run of leading chunks that have all succeeded. A run that dies
+    # part-way then resumes after that boundary instead of starting over. Only range-planned tables
+    # are tracked: every row sharing a watermark value falls in the same range, so the boundary
+    # never separates rows with equal watermarks.
+
+    def __init__(
+        self,
+        commit: Callable[[List[Tuple[Dict[str, Any], Any]]], Awaitable[None]],
+        is_durable: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        interval: float = 60.0
+    ):
+        self.commit = commit
+        self.is_durable = is_durable or (lambda result: True)
+        self.interval = interval
+        self.tables = {}
+        self.flusher = None
+
+    def add_table(self, table_config: Dict[str, Any], work_items: List[Dict[str, Any]]) -> None:
+        if len(work_items) < 2 or not all(item["chunk_range"] for item in work_items):
+            return
+
+        self.tables[table_config["DestinationTable"]] = {
+            "table_config": table_config,
+            "chunks": {(item["chunk_index"], ()): None for item in work_items},
+            "committed": table_config.get("CheckpointWatermark")
+        }
+
+    def split(self, destination_tbl: str, chunk_index: int, split_path: Tuple[int, ...], sub_paths: List[Tuple[int, ...]]) -> None:
+        # A split chunk is replaced by its sub-ranges, which sort right where it was.
+        state = self.tables.get(destination_tbl)
+        if state is None:
+            return
+        state["chunks"].pop((chunk_index, split_path), None)
+        for sub_path in sub_paths:
+            state["chunks"][(chunk_index, sub_path)] = None
+
+    def record(self, result_key: Tuple[str, int, Tuple[int, ...]], result: Any) -> None:
+        state = self.tables.get(result_key[0])
+        if state is not None:
+            state["chunks"][(result_key[1], result_key[2])] = result
+
+    def boundary(self, destination_tbl: str) -> Any:
+        watermark = None
+        chunks = self.tables[destination_tbl]["chunks"]
+        for key in sorted(chunks):
+            result = chunks[key]
+            if not (isinstance(result, dict) and result.get("success") and self.is_durable(result)):
+                break
+            # Empty sub-ranges have no watermark of their own and leave the boundary where it was.
+            watermark = result.get("high_watermark") or watermark
+        return watermark
+
+    async def flush(self) -> None:
+        checkpoints = []
+        for destination_tbl, state in self.tables.items():
+            watermark = self.boundary(destination_tbl)
+            if watermark and (not state["committed"] or parse_watermark(watermark) > parse_watermark(state["committed"])):
+                checkpoints.append((state["table_config"], watermark))
+
+        if not checkpoints:
+            return
+
+        try:
+            await self.commit(checkpoints)
+            for table_config, watermark in checkpoints:
+                self.tables[table_config["DestinationTable"]]["committed"] = watermark
+        except Exception as e:
+            # The end-of-run commit still records everything; a missed checkpoint only costs resume progress.
+            log.warning(f"Error committing checkpoints: {str(e)}")
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self.tables and self.flusher is None:
+            self.flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self) -> None:
+        if self.flusher:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
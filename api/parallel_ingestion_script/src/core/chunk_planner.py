@@ -0,0 +1,151 @@
+import re
+import math
+import threading
+from datetime import timezone, datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+WATERMARK_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}:\d{2}:\d{2})(?:\.(\d+))?)?(?:Z|[+-]00:?00)?$")
+TIMESPAN_PATTERN = re.compile(r"^(\d+)(ms|s|m|h|d)$")
+TIMESPAN_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_watermark(value: Any) -> datetime:
+    # Defender returns 7 fractional digits and the config view returns a space separator,
+    # neither of which datetime.fromisoformat accepts on Python 3.10.
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    match = WATERMARK_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f"Unrecognized watermark value: {value}")
+
+    date_part, time_part, fraction = match.groups()
+    micros = int((fraction or "0")[:6].ljust(6, "0"))
+    parsed = datetime.strptime(f"{date_part}T{time_part or '00:00:00'}", "%Y-%m-%dT%H:%M:%S")
+    return parsed.replace(microsecond=micros, tzinfo=timezone.utc)
+
+
+def format_watermark(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def parse_timespan(value: str) -> timedelta:
+    match = TIMESPAN_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f"Unsupported timespan: {value}")
+    return timedelta(seconds=int(match.group(1)) * TIMESPAN_UNITS[match.group(2)])
+
+
+def format_timespan(value: timedelta) -> str:
+    return f"{max(1, int(value.total_seconds() * 1000))}ms"
+
+
+def pack_bins(bins: List[Dict[str, Any]], chunk_size: int) -> List[Dict[str, Any]]:
+    # Greedily packs contiguous histogram bins (sorted by start) into [low, high) ranges of at most
+    # chunk_size records; a single bin larger than chunk_size becomes a chunk on its own.
+    chunk_ranges = []
+    current = None
+
+    for b in bins:
+        if current and current["records_count"] + b["count"] > chunk_size:
+            chunk_ranges.append(current)
+            current = None
+
+        if current is None:
+            current = {
+                "chunk_id": len(chunk_ranges) + 1,
+                "low_watermark": format_watermark(b["start"]),
+                "high_watermark": format_watermark(b["end"]),
+                "high_inclusive": False,
+                "records_count": 0
+            }
+
+        current["high_watermark"] = format_watermark(b["end"])
+        current["records_count"] += b["count"]
+
+    if current:
+        chunk_ranges.append(current)
+
+    # Empty bins are absent from the histogram, so close the gaps to keep the ranges contiguous.
+    for previous, following in zip(chunk_ranges, chunk_ranges[1:]):
+        previous["high_watermark"] = following["low_watermark"]
+
+    return chunk_ranges
+
+
+def watermark_before(value: Any) -> str:
+    # The last 100ns tick before a watermark, so an exclusive upper bound can be stored as an
+    # inclusive one. Works on the 7-digit tick fraction, which parse_watermark cuts to microseconds.
+    if isinstance(value, datetime):
+        seconds, ticks = value.replace(microsecond=0), value.microsecond * 10
+    else:
+        match = WATERMARK_PATTERN.match(str(value).strip())
+        if not match:
+            raise ValueError(f"Unrecognized watermark value: {value}")
+        date_part, time_part, fraction = match.groups()
+        seconds = parse_watermark(f"{date_part}T{time_part or '00:00:00'}")
+        ticks = int((fraction or "0")[:7].ljust(7, "0"))
+
+    if ticks == 0:
+        seconds, ticks = seconds - timedelta(seconds=1), 10_000_000
+    return format_watermark(seconds)[:19] + f".{ticks - 1:07d}Z"
+
+
+def split_chunk_range(chunk_range: Dict[str, Any], split_point: Any = None) -> Optional[List[Dict[str, Any]]]:
+    # Bisects a watermark range at split_point (e.g. its median watermark) when that falls inside
+    # the range, otherwise at its time midpoint; returns None once the range cannot shrink.
+    low = parse_watermark(chunk_range["low_watermark"])
+    high = parse_watermark(chunk_range["high_watermark"])
+    if high - low <= timedelta(microseconds=1):
+        return None
+
+    split_at = parse_watermark(split_point) if split_point else None
+    if split_at is None or not low < split_at < high:
+        split_at = low + (high - low) / 2
+    middle = format_watermark(split_at)
+    half_records = math.ceil((chunk_range.get("records_count") or 0) / 2)
+    return [
+        dict(chunk_range, high_watermark=middle, high_inclusive=False, records_count=half_records),
+        dict(chunk_range, low_watermark=middle, records_count=half_records),
+    ]
+
+
+class ChunkPlanCache:
+    def __init__(self):
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def put(self, table: str, bins: List[Dict[str, Any]], chunk_ranges: List[Dict[str, Any]]) -> None:
+        if not bins:
+            return
+        with self._lock:
+            self._plans.setdefault(table, []).append({"bins": bins, "chunk_ranges": chunk_ranges})
+
+    def get(self, table: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            plans = self._plans.get(table)
+            return plans[-1] if plans else None
+
+    def sub_ranges(self, table: str, low_watermark: Any, high_watermark: Any, chunk_size: int) -> Optional[List[Dict[str, Any]]]:
+        low = parse_watermark(low_watermark)
+        high = parse_watermark(high_watermark)
+
+        with self._lock:
+            plans = list(self._plans.get(table, []))
+
+        # Newest plan first; only a plan whose bins cover the whole range can be used to split it.
+        for plan in reversed(plans):
+            if plan["bins"][0]["start"] > low or plan["bins"][-1]["end"] <= high:
+                continue
+
+            bins = [dict(b) for b in plan["bins"] if b["end"] > low and b["start"] <= high]
+            if not bins:
+                return None
+
+            bins[0]["start"] = max(bins[0]["start"], low)
+            chunk_ranges = pack_bins(bins, chunk_size)
+            chunk_ranges[-1]["high_watermark"] = format_watermark(high)
+            chunk_ranges[-1]["high_inclusive"] = True
+            return chunk_ranges
+
+        return None
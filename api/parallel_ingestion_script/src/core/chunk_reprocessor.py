@@ -8,21 +8,28 @@ from typing import List, Dict, Any, Optional, Tuple, Union
 from concurrent.futures import ThreadPoolExecutor
 
 from src.core.ingestion_engine import Ingestor
+from src.core.chunk_planner import ChunkPlanCache, watermark_before
+from src.core.rate_limiter import HuntingRateLimiter
+from src.core.token_provider import TokenProvider
+from src.core.chunk_scheduler import ChunkScheduler
+from src.core.metadata_writer import CHUNK_AUDIT_SCHEMA, kql_string
+from src.core.telemetry import log
 
 class Reprocessor(Ingestor):
     
-    def __init__(self, bootstrap: Dict[str, Any], max_concurrent_tasks: int = 3, chunk_size: int = 25000, max_thread_workers: int = 8):
+    def __init__(self, bootstrap: Dict[str, Any], max_concurrent_tasks: int = 3, chunk_size: int = 25000, max_thread_workers: int = 8, plan_cache: Optional[ChunkPlanCache] = None, rate_limiter: Optional[HuntingRateLimiter] = None, token_provider: Optional[TokenProvider] = None, shared: Optional[Ingestor] = None):
         
-        super().__init__(bootstrap, max_concurrent_tasks, chunk_size, max_thread_workers)
+        super().__init__(bootstrap, max_concurrent_tasks, chunk_size, max_thread_workers, plan_cache, rate_limiter, token_provider, shared)
+        self.work_ranges = {}
         
-    def get_failed_chunks(self) -> List[Dict[str, Any]]:        
+    async def get_failed_chunks(self) -> List[Dict[str, Any]]:        
         base_query = f"""
             {self.bootstrap["chunk_audit_view"]}
             | where reprocess_success==false and isnotnull(low_watermark) and isnotnull(high_watermark)
         """
         
         try:
-            response = self.data_client.execute(self.bootstrap["adx_database"], base_query)
+            response = await self.metadata_client.execute(self.bootstrap["adx_database"], base_query)
             failed_chunks = []
             
             for row in response.primary_results[0]:
@@ -39,210 +46,241 @@ class Reprocessor(Ingestor):
                     "records_count": row["records_count"],
                 })
             
-            print(f"[INFO] --> Found {len(failed_chunks)} failed chunks to reprocess")
+            log.info(f"Found {len(failed_chunks)} failed chunks to reprocess")
             return failed_chunks
             
         except Exception as e:
-            print(f"[ERROR] --> Error retrieving failed chunks: {str(e)}")
+            log.error(f"Error retrieving failed chunks: {str(e)}")
             raise
 
-    def get_table_config_for_chunk(self, table_name: str) -> Dict[str, Any]:
-
+    async def get_table_configs(self, table_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        # One query for every table with failed chunks, instead of one per table. This reads the
+        # config table rather than the config view: a run with failed chunks marks its table
+        # inactive, and the view only returns active tables.
+        names = ", ".join(kql_string(name) for name in sorted(table_names))
         query = f"""
             {self.bootstrap["config_table"]}
-            | where DestinationTable == '{table_name}'
-            | project SourceTable, DestinationTable, WatermarkColumn
+            | where DestinationTable in ({names})
+            | extend IngestionTime = ingestion_time()
+            | summarize arg_max(IngestionTime, *) by DestinationTable
         """
         
         try:
-            response = self.data_client.execute(self.bootstrap["adx_database"], query)
-            
-            if response.primary_results[0].rows_count == 0:
-                raise Exception(f"No configuration found for table: {table_name}")
-            
-            row = response.primary_results[0][0]
-            return {
-                "SourceTable": row["SourceTable"],
-                "DestinationTable": row["DestinationTable"],
-                "WatermarkColumn": row["WatermarkColumn"]
-            }
+            response = await self.metadata_client.execute(self.bootstrap["adx_database"], query)
+            return {row["DestinationTable"]: row.to_dict() for row in response.primary_results[0]}
             
         except Exception as e:
-            print(f"[ERROR] --> Error retrieving table config for {table_name}: {str(e)}")
+            log.error(f"Error retrieving table configs for {len(table_names)} tables: {str(e)}")
             raise
 
-    def build_watermark_based_query(
-        self, source_table: str, 
-        watermark_column: str, 
-        low_watermark: datetime, 
-        high_watermark: datetime
-    ) -> str:
-        
-        query = (
-            f"{source_table} "
-            + (f"| extend {watermark_column} = ingestion_time() " if watermark_column == "Watermark_IngestionTime" else "")
-            + f"| where {watermark_column} >= datetime('{low_watermark}') "
-            + f"and {watermark_column} <= datetime('{high_watermark}') "
-            + f"| sort by {watermark_column} asc"
-        )
-        
-        return query
-    
-    def meta_insert_successful_reprocess(
-        self, 
-        reprocess_results: List[Dict[str, Any]],
-        failed_chunks: List[Dict[str, Any]]
-    ) -> None:
-        table_lookup = {item["table"]: item for item in failed_chunks}
+    def build_reprocess_row(self, failed_chunk: Dict[str, Any], **values: Any) -> Dict[str, Any]:
+        row = {
+            "ingestion_id": failed_chunk["ingestion_id"],
+            "ingestion_timestamp": failed_chunk["ingestion_timestamp"],
+            "folder": failed_chunk["folder"],
+            "table": failed_chunk["table"],
+            "chunk_id": failed_chunk["chunk_id"],
+            "success": failed_chunk["success"],
+            "records_count": failed_chunk["records_count"],
+            "low_watermark": failed_chunk["low_watermark"],
+            "high_watermark": failed_chunk["high_watermark"]
+        }
+        row.update(values)
+        return row
+
+    async def meta_insert_reprocess_results(self, reprocessed: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        # A chunk reprocessed in one range gets a row only once it succeeds. A chunk that was split
+        # is marked as superseded, and each of its sub-ranges gets a row of its own, so a sub-range
+        # that failed again is retried on the next pass on its own, smaller range.
+        rows = []
+        for failed_chunk, result in reprocessed:
+            if not result.get("sub_ranges"):
+                if result.get("success"):
+                    rows.append(self.build_reprocess_row(
+                        failed_chunk,
+                        records_processed=result["records_processed"],
+                        error=result["error"],
+                        reprocess_success=True
+                    ))
+                continue
 
-        for result in reprocess_results:
-            if result.get("success"):
-                insert_cmd = f"""
-                    .set-or-append {self.bootstrap["chunk_audit_table"]} <|
-                    datatable (
-                        ingestion_id:string,
-                        ingestion_timestamp:datetime,
-                        folder:string,
-                        table:string,
-                        chunk_id:int,
-                        success:bool,
-                        records_count:int,
-                        records_processed:int,
-                        low_watermark:datetime,
-                        high_watermark:datetime,
-                        error:string,
-                        reprocess_success:bool
-                    )
-                    [
-                        '{table_lookup[result["table"]]["ingestion_id"]}',
-                        datetime('{table_lookup[result["table"]]["ingestion_timestamp"]}'),
-                        '{table_lookup[result["table"]]["folder"]}',
-                        '{result["table"]}',
-                        {table_lookup[result["table"]]["chunk_id"]},
-                        {str(table_lookup[result["table"]]["success"])},
-                        {table_lookup[result["table"]]["records_count"]},
-                        {result["records_processed"]},
-                        datetime('{result["low_watermark"]}'),
-                        datetime('{result["high_watermark"]}'),
-                        '{"" if result["error"] is None else result["error"].replace("'", "''")}',
-                        true
-                    ]
-                """
-                try:
-                    self.data_client.execute_mgmt(self.bootstrap["adx_database"], insert_cmd)
-                    print("[INFO] --> Inserted reprocess audit records")
-                except Exception as e:
-                    print(f"[ERROR] --> Error inserting reprocess audit records: {e}")
-                    raise
+            rows.append(self.build_reprocess_row(
+                failed_chunk,
+                records_processed=result["records_processed"],
+                error=f"Split into {len(result['sub_ranges'])} sub-ranges",
+                reprocess_success=True
+            ))
+            for sub_range in result["sub_ranges"]:
+                rows.append(self.build_reprocess_row(
+                    failed_chunk,
+                    success=False,
+                    records_count=sub_range["records_count"],
+                    records_processed=sub_range["records_processed"],
+                    low_watermark=sub_range["low_watermark"],
+                    high_watermark=sub_range["high_watermark"],
+                    error=sub_range["error"],
+                    reprocess_success=sub_range["success"]
+                ))
 
-    async def reprocess_single_chunk(
-        self, 
+        try:
+            await self.metadata_writer.write(self.bootstrap["chunk_audit_table"], CHUNK_AUDIT_SCHEMA, rows)
+            if rows:
+                log.info("Inserted reprocess audit records")
+        except Exception as e:
+            log.error(f"Error inserting reprocess audit records: {e}")
+            raise
+
+    async def get_reprocess_ranges(
+        self,
         session: aiohttp.ClientSession,
         failed_chunk: Dict[str, Any],
         source_table: str,
         watermark_column: str,
-    ) -> Dict[str, Any]:      
-        table_folder = failed_chunk["folder"]
+    ) -> Optional[List[Dict[str, Any]]]:
         table_name = failed_chunk["table"]
-        chunk_id = failed_chunk["chunk_id"]
         low_watermark = failed_chunk["low_watermark"]
         high_watermark = failed_chunk["high_watermark"]
-        
-        try:
-            print(f"[INFO] --> Reprocessing {table_name} chunk {chunk_id}")
-            print(f"[INFO] --> Watermark range: {low_watermark} to {high_watermark}")
-            
-            watermark_query = self.build_watermark_based_query(
-                source_table, watermark_column, low_watermark, high_watermark
+
+        sub_ranges = self.plan_cache.sub_ranges(table_name, low_watermark, high_watermark, self.chunk_size)
+
+        if sub_ranges is None and self.chunking_mode == "histogram" and (failed_chunk.get("records_count") or 0) > self.chunk_size:
+            range_query = self.build_range_kql_query(
+                self.build_base_kql_query(source_table, "Full", watermark_column, None),
+                watermark_column,
+                {"low_watermark": low_watermark, "high_watermark": high_watermark, "high_inclusive": True}
             )
-            
-            print(f"[INFO] --> Watermark query: {watermark_query}")
-            
-            defender_token = await self.get_defender_token(session)
-            headers = {
-                "Authorization": f"Bearer {defender_token}",
-                "Content-Type": "application/json"
-            }
-            
-            async with session.post(
-                self.bootstrap['defender_hunting_api_url'],
-                headers=headers,
-                json={"Query": watermark_query},
-                timeout=aiohttp.ClientTimeout(total=300)  # 5 minute timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    return {
-                        "success": False,
-                        "chunk_id": chunk_id,
-                        "folder": table_folder,
-                        "table": table_name,
-                        "error": f"API call failed: {response.status} - {error_text}",
-                        "records_processed": 0,
-                        "low_watermark": low_watermark,
-                        "high_watermark": high_watermark,
-                    }
-                
-                apijson = await response.json()
-                records = apijson.get("Results", [])
-                
-                if not records:
-                    print(f"[WARNING] --> No records found for {table_name} chunk {chunk_id}")
-                    return {
-                        "success": True,
-                        "chunk_id": chunk_id,
-                        "folder": table_folder,
-                        "table": table_name,
-                        "records_processed": 0,
-                        "low_watermark": low_watermark,
-                        "high_watermark": high_watermark,
-                        "error": "No records found in range"
-                    }
-                
-                ingest_result = await self.ingest_to_adx(records, chunk_id, table_folder, table_name, watermark_column)
-                
-                result = {
-                    "ingestion_id": failed_chunk["ingestion_id"],
-                    "success": ingest_result["success"],
-                    "chunk_id": chunk_id,
-                    "folder": table_folder,
-                    "table": table_name,
-                    "records_processed": ingest_result["records_processed"],
-                    "low_watermark": low_watermark,
-                    "high_watermark": high_watermark,
-                    "error": ingest_result.get("error", None)
-                }
-                
-                if ingest_result["success"]:
-                    print(f"[SUCCESS] --> Reprocessed {table_name} chunk {chunk_id} - {len(records):,} records")
-                else:
-                    print(f"[ERROR] --> Failed to reprocess {table_name} chunk {chunk_id}: {ingest_result['error']}")
-                
-                return result
-                
+            await self.plan_histogram_chunks(session, range_query, watermark_column, table_name)
+            sub_ranges = self.plan_cache.sub_ranges(table_name, low_watermark, high_watermark, self.chunk_size)
+
+        return sub_ranges
+
+    async def plan_failed_chunk(
+        self,
+        session: aiohttp.ClientSession,
+        failed_chunk: Dict[str, Any],
+        table_config: Dict[str, Any],
+        chunk_index: int,
+        total_chunks: int
+    ) -> List[Dict[str, Any]]:
+        # Turns a failed chunk into pipeline work items: one per cached sub-range, or one for the
+        # whole [low, high] range.
+        source_table = table_config["SourceTable"]
+        watermark_column = table_config["WatermarkColumn"]
+
+        try:
+            sub_ranges = await self.get_reprocess_ranges(session, failed_chunk, source_table, watermark_column)
         except Exception as e:
-            print(f"[ERROR] --> Error reprocessing chunk {chunk_id} for {table_name}: {str(e)}")
-            
-            return {
-                "success": False,
-                "chunk_id": chunk_id,
-                "folder": table_folder,
-                "table": table_name,
-                "error": str(e)[:500],
-                "records_processed": 0,
-                "low_watermark": low_watermark,
-                "high_watermark": high_watermark,
+            log.warning(f"Could not plan sub-ranges for {failed_chunk['table']} chunk {failed_chunk['chunk_id']}: {str(e)}")
+            sub_ranges = None
+
+        if sub_ranges and len(sub_ranges) > 1:
+            log.info(f"Splitting {failed_chunk['table']} chunk {failed_chunk['chunk_id']} into {len(sub_ranges)} ranges from the cached chunk plan")
+        else:
+            sub_ranges = [{
+                "low_watermark": failed_chunk["low_watermark"],
+                "high_watermark": failed_chunk["high_watermark"],
+                "high_inclusive": True,
+                "records_count": failed_chunk.get("records_count") or 0
+            }]
+
+        base_query = self.build_base_kql_query(source_table, "Full", watermark_column, None)
+        for i, sub_range in enumerate(sub_ranges):
+            self.work_ranges[(failed_chunk["table"], chunk_index, (i,) if len(sub_ranges) > 1 else ())] = sub_range
+        return [
+            {
+                "table_config": table_config,
+                "base_query": base_query,
+                "chunk_index": chunk_index,
+                "total_chunks": total_chunks,
+                "disable_chunking": False,
+                "chunk_range": sub_range,
+                "chunk_size": self.chunk_size,
+                "records_count": sub_range.get("records_count") or 0,
+                "split_path": (i,) if len(sub_ranges) > 1 else (),
+                "split_depth": 1 if len(sub_ranges) > 1 else 0
             }
+            for i, sub_range in enumerate(sub_ranges)
+        ]
+
+    async def find_split_point(self, session: aiohttp.ClientSession, item: Dict[str, Any]) -> Any:
+        # Failed chunks are bisected on row count: one extra Defender call finds the median
+        # watermark, so both halves shrink even when the rows are bunched in time.
+        watermark_column = item["table_config"]["WatermarkColumn"]
+        range_query = self.build_range_kql_query(item["base_query"], watermark_column, item["chunk_range"])
+        try:
+            rows = await self.run_hunting_query(session, f"{range_query} | summarize Median = percentile({watermark_column}, 50)")
+            return rows[0].get("Median") if rows else None
+        except Exception as e:
+            log.warning(f"Could not find the median watermark of {item['table_config']['SourceTable']} chunk {item['chunk_index']}, bisecting by time: {str(e)}")
+            return None
+
+    async def split_work_item(self, session: aiohttp.ClientSession, item: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        sub_items = await super().split_work_item(session, item)
+        for sub_item in sub_items or []:
+            self.work_ranges[(sub_item["table_config"]["DestinationTable"], sub_item["chunk_index"], sub_item["split_path"])] = sub_item["chunk_range"]
+        return sub_items
+
+    def build_reprocess_result(
+        self,
+        failed_chunk: Dict[str, Any],
+        chunk_index: int,
+        chunk_results: Dict[Tuple[str, int, Tuple[int, ...]], Any]
+    ) -> Dict[str, Any]:
+        # A failed chunk is reprocessed once every range it was split into has been ingested.
+        table_name = failed_chunk["table"]
+        range_keys = sorted(k for k in chunk_results if k[0] == table_name and k[1] == chunk_index)
+        range_results = [
+            chunk_results[key] if isinstance(chunk_results[key], dict) else {"success": False, "error": str(chunk_results[key]), "records_processed": 0}
+            for key in range_keys
+        ] or [{"success": False, "error": "Chunk was not processed", "records_processed": 0}]
+
+        errors = [r.get("error") or "Unknown error" for r in range_results if not r["success"]]
+        result = {
+            "ingestion_id": failed_chunk["ingestion_id"],
+            "success": not errors,
+            "chunk_id": failed_chunk["chunk_id"],
+            "folder": failed_chunk["folder"],
+            "table": table_name,
+            "records_processed": sum(r.get("records_processed", 0) for r in range_results),
+            "low_watermark": failed_chunk["low_watermark"],
+            "high_watermark": failed_chunk["high_watermark"],
+            "error": "; ".join(errors)[:500] if errors else None
+        }
+
+        if len(range_keys) > 1:
+            # Exclusive upper bounds are stored as the tick before them, since failure rows are
+            # reprocessed as inclusive ranges.
+            result["sub_ranges"] = []
+            for key, range_result in zip(range_keys, range_results):
+                chunk_range = self.work_ranges[key]
+                result["sub_ranges"].append({
+                    "low_watermark": chunk_range["low_watermark"],
+                    "high_watermark": chunk_range["high_watermark"] if chunk_range["high_inclusive"] else watermark_before(chunk_range["high_watermark"]),
+                    "records_count": chunk_range.get("records_count") or 0,
+                    "records_processed": range_result.get("records_processed", 0),
+                    "success": range_result["success"],
+                    "error": range_result.get("error")
+                })
+
+        if result["success"]:
+            log.success(f"Reprocessed {table_name} chunk {failed_chunk['chunk_id']} - {result['records_processed']:,} records")
+        else:
+            log.error(f"Failed to reprocess {table_name} chunk {failed_chunk['chunk_id']}: {result['error']}")
+        return result
 
-    async def reprocess_failed_chunks(self) -> Dict[str, Any]:
+    async def reprocess_failed_chunks(self, session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
+        session = session or self.transport.get_session()
 
         start_time = time.time()
+        api_usage_start = self.rate_limiter.usage()
+        http_usage_start = self.transport.usage()
+        telemetry_start = self.telemetry.snapshot()
         
         try:
-            failed_chunks = self.get_failed_chunks()
+            failed_chunks = await self.get_failed_chunks()
             
             if not failed_chunks:
-                print("[INFO] --> No failed chunks found to reprocess")
+                log.info("No failed chunks found to reprocess")
                 return {
                     "total_chunks": 0,
                     "successful_chunks": 0,
@@ -250,47 +288,67 @@ class Reprocessor(Ingestor):
                     "detailed_results": []
                 }
             
-            table_configs = {}
+            table_configs = await self.get_table_configs({chunk["table"] for chunk in failed_chunks})
+
+            # Failed chunks are grouped by table and numbered within it; the number is their key
+            # in the pipeline, since chunk ids from different runs can repeat.
+            chunks_by_table = {}
+            reprocess_results = []
             for chunk in failed_chunks:
-                table_name = chunk["table"]
-                if table_name not in table_configs:
-                    table_configs[table_name] = self.get_table_config_for_chunk(table_name)
-            
-            print(f"[INFO] --> Reprocessing {len(failed_chunks)} chunks across {len(table_configs)} tables")
-            
-            timeout = aiohttp.ClientTimeout(total=900)  # 15 minutes timeout
-            connector = aiohttp.TCPConnector(limit=50, limit_per_host=10)
+                if chunk["table"] in table_configs:
+                    chunks_by_table.setdefault(chunk["table"], []).append(chunk)
+                else:
+                    log.error(f"No configuration found for table: {chunk['table']}")
+                    reprocess_results.append({
+                        "ingestion_id": chunk["ingestion_id"],
+                        "success": False,
+                        "chunk_id": chunk["chunk_id"],
+                        "folder": chunk["folder"],
+                        "table": chunk["table"],
+                        "records_processed": 0,
+                        "low_watermark": chunk["low_watermark"],
+                        "high_watermark": chunk["high_watermark"],
+                        "error": f"No configuration found for table: {chunk['table']}"
+                    })
             
-            reprocess_results = []
+            log.info(f"Reprocessing {len(failed_chunks)} chunks across {len(chunks_by_table)} tables")
             
-            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-                semaphore = asyncio.Semaphore(self.max_concurrent_tasks)
-                
-                async def process_chunk_with_semaphore(chunk):
-                    async with semaphore:
-                        table_config = table_configs[chunk["table"]]
-                        return await self.reprocess_single_chunk(
-                            session,
-                            chunk,
-                            table_config["SourceTable"],
-                            table_config["WatermarkColumn"],
-                        )
-                
-                tasks = [process_chunk_with_semaphore(chunk) for chunk in failed_chunks]
-                reprocess_results = await asyncio.gather(*tasks, return_exceptions=True)
+            semaphore = asyncio.Semaphore(self.max_concurrent_tasks)
+
+            async def plan_with_semaphore(chunk, table_config, chunk_index, total_chunks):
+                async with semaphore:
+                    return await self.plan_failed_chunk(session, chunk, table_config, chunk_index, total_chunks)
+
+            planning = {}
+            for table_name, chunks in chunks_by_table.items():
+                table_config = dict(table_configs[table_name], DestinationFolder=chunks[0]["folder"])
+                planning[table_name] = [
+                    plan_with_semaphore(chunk, table_config, chunk_index, len(chunks))
+                    for chunk_index, chunk in enumerate(chunks, start=1)
+                ]
+
+            # Sub-range planning for every table runs concurrently, bounded by max_concurrent_tasks.
+            with self.telemetry.stage("plan"):
+                planned = await asyncio.gather(*[asyncio.gather(*tasks) for tasks in planning.values()])
+
+            scheduler = ChunkScheduler()
+            for table_name, table_items in zip(planning, planned):
+                work_items = [item for items in table_items for item in items]
+                scheduler.add_table(table_name, work_items, self.get_table_weight(work_items[0]["table_config"]))
+
+            chunk_results = await self.run_chunk_pipeline(session, scheduler)
+
+            reprocessed = []
+            for table_name, chunks in chunks_by_table.items():
+                for chunk_index, chunk in enumerate(chunks, start=1):
+                    reprocessed.append((chunk, self.build_reprocess_result(chunk, chunk_index, chunk_results)))
+            reprocess_results.extend(result for _, result in reprocessed)
             
-            successful_chunks = sum(1 for r in reprocess_results if isinstance(r, dict) and r.get("success"))
+            successful_chunks = sum(1 for r in reprocess_results if r.get("success"))
             failed_chunks_count = len(failed_chunks) - successful_chunks
-            total_records_processed = sum(
-                r.get("records_processed", 0) 
-                for r in reprocess_results 
-                if isinstance(r, dict)
-            )
-            
-            valid_results = [r for r in reprocess_results if isinstance(r, dict)]
+            total_records_processed = sum(r.get("records_processed", 0) for r in reprocess_results)
 
-            if valid_results:
-                self.meta_insert_successful_reprocess(valid_results, failed_chunks)
+            await self.meta_insert_reprocess_results(reprocessed)
             
             end_time = time.time()
             execution_time = end_time - start_time
@@ -301,18 +359,21 @@ class Reprocessor(Ingestor):
                 "failed_chunks": failed_chunks_count,
                 "total_records_processed": total_records_processed,
                 "execution_time_seconds": execution_time,
+                "api_usage": self.rate_limiter.usage(api_usage_start),
+                "http_usage": self.transport.usage(http_usage_start),
+                "telemetry": self.telemetry.report(telemetry_start),
                 "detailed_results": reprocess_results
             }
             
-            print(f"\n" + "="*100)
-            print(f"REPROCESSING COMPLETED")
-            print("="*100)
-            print(f"Execution time: {execution_time:.2f} seconds")
-            print(f"Chunks - Successful: {successful_chunks}, Failed: {failed_chunks_count}")
-            print(f"Records reprocessed: {total_records_processed:,}")
+            log.info("REPROCESSING COMPLETED")
+            log.info(f"Execution time: {execution_time:.2f} seconds")
+            log.info(f"Chunks - Successful: {successful_chunks}, Failed: {failed_chunks_count}")
+            log.info(f"Records reprocessed: {total_records_processed:,}")
+            log.info(f"Defender API calls: {summary['api_usage']['calls']}, throttled: {summary['api_usage']['throttled']}")
+            self.log_stage_timings(summary["telemetry"])
             
             return summary
             
         except Exception as e:
-            print(f"[ERROR] --> Error during reprocessing: {str(e)}")
-            raise
\ No newline at end of file
+            log.error(f"Error during reprocessing: {str(e)}")
+            raise
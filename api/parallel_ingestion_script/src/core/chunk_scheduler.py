@@ -0,0 +1,45 @@
+from collections import deque
+from typing import List, Dict, Any, Optional
+
+
+class ChunkScheduler:
+    # Weighted fair queue over the chunks of every table in a run. Each table advances a virtual
+    # clock by records / weight whenever one of its chunks is dispatched, and the table with the
+    # smallest clock goes next; ties go to the table with the most remaining records, so the
+    # largest tables start first and small tables are never stuck behind them.
+
+    def __init__(self):
+        self._tables = {}
+
+    def add_table(self, table_key: str, work_items: List[Dict[str, Any]], weight: float = 1.0) -> None:
+        if not work_items:
+            return
+
+        self._tables[table_key] = {
+            "weight": weight if weight and weight > 0 else 1.0,
+            "work_items": deque(work_items),
+            "virtual_time": 0.0,
+            "remaining_records": sum(max(item.get("records_count") or 0, 1) for item in work_items)
+        }
+
+    def requeue(self, table_key: str, work_items: List[Dict[str, Any]]) -> None:
+        # Split chunks go back to the front of their table's queue so they run next.
+        table = self._tables[table_key]
+        table["work_items"].extendleft(reversed(work_items))
+        table["remaining_records"] += sum(max(item.get("records_count") or 0, 1) for item in work_items)
+
+    def next_chunk(self) -> Optional[Dict[str, Any]]:
+        candidates = [t for t in self._tables.values() if t["work_items"]]
+        if not candidates:
+            return None
+
+        table = min(candidates, key=lambda t: (t["virtual_time"], -t["remaining_records"]))
+        item = table["work_items"].popleft()
+
+        records = max(item.get("records_count") or 0, 1)
+        table["virtual_time"] += records / table["weight"]
+        table["remaining_records"] -= records
+        return item
+
+    def __len__(self) -> int:
+        return sum(len(t["work_items"]) for t in self._tables.values())
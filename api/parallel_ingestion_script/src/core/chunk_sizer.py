@@ -0,0 +1,57 @@
+from typing import Dict, Any, Optional
+
+SPLITTABLE_ERRORS = (
+    "exceeded",
+    "result size",
+    "too large",
+    "cpu",
+    "resources",
+    "timeout",
+    "timed out",
+)
+
+
+def is_splittable_error(error: Optional[str]) -> bool:
+    # Errors a smaller watermark range can fix: result-size limits, CPU quota and timeouts.
+    # Throttling (429) is excluded because it is handled by the rate limiter.
+    message = (error or "").lower()
+    return "429" not in message and any(marker in message for marker in SPLITTABLE_ERRORS)
+
+
+class AdaptiveChunkSizer:
+    # AIMD controller for per-table chunk sizes: every successful fetch adds a fixed step, and a
+    # fetch that fails on size, CPU or time halves the size. The resulting size is persisted in
+    # meta_MigrationConfiguration so the next run plans with it.
+
+    def __init__(self, default_size: int, min_size: int = 1000, max_size: int = 100000, increase_step: Optional[int] = None):
+        self.default_size = default_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.increase_step = increase_step or max(default_size // 10, 1)
+        self.sizes = {}
+
+    def initial_size(self, table: str, persisted_size: Any = None) -> int:
+        if table not in self.sizes:
+            try:
+                size = int(persisted_size) if persisted_size else self.default_size
+            except (TypeError, ValueError):
+                size = self.default_size
+            self.sizes[table] = min(max(size, self.min_size), self.max_size)
+        return self.sizes[table]
+
+    def current_size(self, table: str) -> int:
+        return self.sizes.get(table, self.default_size)
+
+    def record_success(self, table: str, records_count: int) -> None:
+        current = self.current_size(table)
+        # Only chunks that actually used most of the current size are evidence that it can grow.
+        if records_count >= current // 2:
+            self.sizes[table] = min(current + self.increase_step, self.max_size)
+
+    def record_failure(self, table: str, records_count: int) -> None:
+        current = self.current_size(table)
+        attempted = min(current, records_count) if records_count else current
+        self.sizes[table] = max(attempted // 2, self.min_size)
+
+    def learned_sizes(self) -> Dict[str, int]:
+        return dict(self.sizes)
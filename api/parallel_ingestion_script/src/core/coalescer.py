@@ -0,0 +1,182 @@
+import gzip
+import time
+import asyncio
+import threading
+from io import BytesIO
+from concurrent.futures import Executor
+from typing import Dict, Any, Callable, Optional
+
+from src.core.serialization import write_records, write_raw_response
+from src.core.telemetry import log
+
+
+class EncodedChunk(list):
+    # Collects the NDJSON batches the serialization writers would send to a gzip stream.
+    def write(self, data: bytes) -> None:
+        self.append(data)
+
+
+class IngestionCoalescer:
+    # Merges the chunks of each destination table into one gzip NDJSON buffer and ingests it as a
+    # single blob once it reaches target_bytes of raw data or its oldest chunk is max_age seconds
+    # old. Every source chunk still gets its own result, with its own watermark range, once the
+    # blob holding it has been ingested.
+
+    def __init__(
+        self,
+        ingest_payload: Callable[[Dict[str, Any], int, str, str], Dict[str, Any]],
+        executor: Executor,
+        target_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 60.0,
+        compression_level: int = 1,
+        buffer_factory: Optional[Callable[[], Any]] = None
+    ):
+        self.ingest_payload = ingest_payload
+        self.executor = executor
+        self.target_bytes = target_bytes
+        self.max_age = max_age
+        self.compression_level = compression_level
+        self.buffer_factory = buffer_factory or BytesIO
+
+        self.buffers = {}
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.age_flusher = None
+        self.flushes = set()
+
+    def _new_buffer(self, destination_folder: str, destination_tbl: str) -> Dict[str, Any]:
+        stream = self.buffer_factory()
+        return {
+            "folder": destination_folder,
+            "table": destination_tbl,
+            "stream": stream,
+            "gz": gzip.GzipFile(fileobj=stream, mode="wb", compresslevel=self.compression_level),
+            "raw_size": 0,
+            "records_count": 0,
+            "chunks": [],
+            "created": time.monotonic(),
+            "lock": threading.Lock()
+        }
+
+    def _sync_add(self, table_config: Dict[str, Any], records: Any, chunk_id: int, future: asyncio.Future) -> bool:
+        # The chunk is encoded before any buffer is touched, so a chunk that fails to encode
+        # leaves no partial rows behind in a shared batch.
+        encoded = EncodedChunk()
+        if isinstance(records, bytes):
+            written = write_raw_response(encoded, records, table_config["WatermarkColumn"])
+        else:
+            watermark_column = table_config["WatermarkColumn"]
+            written = {
+                "raw_size": write_records(encoded, records),
+                "records_count": len(records),
+                "low_watermark": min(item[watermark_column] for item in records),
+                "high_watermark": max(item[watermark_column] for item in records)
+            }
+
+        destination_tbl = table_config["DestinationTable"]
+        while True:
+            with self.lock:
+                buffer = self.buffers.get(destination_tbl)
+                if buffer is None:
+                    buffer = self.buffers[destination_tbl] = self._new_buffer(table_config["DestinationFolder"], destination_tbl)
+
+            with buffer["lock"]:
+                # A flush may have taken this buffer between the two locks; start a new one.
+                if buffer["gz"].closed:
+                    continue
+
+                for data in encoded:
+                    buffer["gz"].write(data)
+                buffer["raw_size"] += written["raw_size"]
+                buffer["records_count"] += written["records_count"]
+                buffer["chunks"].append((chunk_id, written, future))
+                return buffer["raw_size"] >= self.target_bytes
+
+    def _sync_flush(self, destination_tbl: str) -> None:
+        with self.lock:
+            buffer = self.buffers.pop(destination_tbl, None)
+            if buffer is None:
+                return
+            self.batches += 1
+            batch_id = self.batches
+
+        stream = buffer["stream"]
+        try:
+            # Writers that already hold the buffer finish their chunk before it is closed.
+            with buffer["lock"]:
+                buffer["gz"].close()
+
+            payload = {
+                "data_stream": stream.finish() if hasattr(stream, "finish") else stream,
+                "spill_path": getattr(stream, "path", None),
+                "raw_size": buffer["raw_size"],
+                "records_count": buffer["records_count"],
+                "low_watermark": min((w["low_watermark"] for _, w, _ in buffer["chunks"] if w["low_watermark"]), default=None),
+                "high_watermark": max((w["high_watermark"] for _, w, _ in buffer["chunks"] if w["high_watermark"]), default=None)
+            }
+            batch_result = self.ingest_payload(payload, batch_id, buffer["folder"], destination_tbl)
+        except Exception as e:
+            batch_result = {"success": False, "error": f"Coalesced ingestion failed: {str(e)[:500]}"}
+        finally:
+            if hasattr(stream, "discard"):
+                stream.discard()
+
+        if batch_result["success"]:
+            log.info(f"Ingested coalesced batch {batch_id} for {destination_tbl}: {len(buffer['chunks'])} chunks, {buffer['records_count']:,} records")
+        else:
+            log.error(f"Coalesced batch {batch_id} for {destination_tbl} failed ({len(buffer['chunks'])} chunks): {batch_result['error']}")
+
+        for chunk_id, written, future in buffer["chunks"]:
+            chunk_result = {
+                "chunk_id": chunk_id,
+                "folder": buffer["folder"],
+                "table": destination_tbl,
+                "success": batch_result["success"],
+                "records_count": written["records_count"],
+                "records_processed": written["records_count"] if batch_result["success"] else 0,
+                "low_watermark": written["low_watermark"],
+                "high_watermark": written["high_watermark"],
+                "error": batch_result.get("error"),
+                "batch_id": batch_id
+            }
+            if batch_result.get("source_id"):
+                chunk_result["source_id"] = batch_result["source_id"]
+            future.get_loop().call_soon_threadsafe(future.set_result, chunk_result)
+
+    async def flush(self, destination_tbl: str) -> None:
+        task = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(self.executor, self._sync_flush, destination_tbl))
+        self.flushes.add(task)
+        try:
+            await task
+        finally:
+            self.flushes.discard(task)
+
+    async def add(self, table_config: Dict[str, Any], records: Any, chunk_id: int) -> asyncio.Future:
+        # Returns a future for the chunk's result; it resolves when the chunk's batch is ingested.
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self.age_flusher is None or self.age_flusher.done():
+            self.age_flusher = asyncio.create_task(self._flush_aged())
+
+        is_full = await loop.run_in_executor(self.executor, self._sync_add, table_config, records, chunk_id, future)
+        if is_full:
+            await self.flush(table_config["DestinationTable"])
+        return future
+
+    async def _flush_aged(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.max_age / 4, 5))
+            now = time.monotonic()
+            with self.lock:
+                aged = [t for t, b in self.buffers.items() if now - b["created"] >= self.max_age]
+            await asyncio.gather(*[self.flush(t) for t in aged])
+
+    async def close(self) -> None:
+        if self.age_flusher:
+            self.age_flusher.cancel()
+            await asyncio.gather(self.age_flusher, return_exceptions=True)
+            self.age_flusher = None
+
+        with self.lock:
+            tables = list(self.buffers)
+        await asyncio.gather(*[self.flush(t) for t in tables], *list(self.flushes))
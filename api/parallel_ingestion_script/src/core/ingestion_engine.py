@@ -2,8 +2,7 @@ import time
 import math
 import json
 import random
-import urllib.parse
-from io import StringIO
+import uuid
 from datetime import timezone, datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 
@@ -14,17 +13,57 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from azure.kusto.data import KustoClient, KustoConnectionStringBuilder
 from azure.kusto.data.data_format import DataFormat
-from azure.kusto.ingest import QueuedIngestClient, IngestionProperties, IngestionMappingKind, ReportLevel
+from azure.kusto.ingest import QueuedIngestClient, ManagedStreamingIngestClient, IngestionStatus, IngestionProperties, IngestionMappingKind, ReportLevel, ReportMethod, StreamDescriptor, FileDescriptor
+
+from src.core.chunk_planner import ChunkPlanCache, pack_bins, split_chunk_range, parse_watermark, format_watermark, parse_timespan, format_timespan, watermark_before
+from src.core.chunk_sizer import AdaptiveChunkSizer, is_splittable_error
+from src.core.chunk_scheduler import ChunkScheduler
+from src.core.rate_limiter import HuntingRateLimiter
+from src.core.serialization import serialize_chunk, get_serialization_pool
+from src.core.spill import MemoryBudget, SpillBuffer
+from src.core.ingestion_status import get_status_tracker
+from src.core.coalescer import IngestionCoalescer
+from src.core.blob_uploader import BlobIngestUploader
+from src.core.token_provider import TokenProvider, get_token_provider
+from src.core.transport import get_transport
+from src.core.metadata_client import AsyncMetadataClient
+from src.core.metadata_writer import MetadataWriter, CONFIG_SCHEMA, AUDIT_SCHEMA, CHUNK_AUDIT_SCHEMA
+from src.core.checkpoint import WatermarkCheckpointer
+from src.core.telemetry import log, configure_logging, get_telemetry
 
 
 class Ingestor:
-    def __init__(self, bootstrap: Dict[str, Any], max_concurrent_tasks: int = 3, chunk_size: int = 25000, max_thread_workers: int = 8):
+    def __init__(self, bootstrap: Dict[str, Any], max_concurrent_tasks: int = 3, chunk_size: int = 25000, max_thread_workers: int = 8, plan_cache: Optional[ChunkPlanCache] = None, rate_limiter: Optional[HuntingRateLimiter] = None, token_provider: Optional[TokenProvider] = None, shared: Optional["Ingestor"] = None):
         self.bootstrap = bootstrap
+        configure_logging(self.bootstrap)
+        self.telemetry = shared.telemetry if shared else get_telemetry(self.bootstrap)
         self.chunk_size = chunk_size
         self.max_concurrent_tasks = max_concurrent_tasks
         self.semaphore = asyncio.Semaphore(max_concurrent_tasks)
+        self.chunking_mode = self.bootstrap.get("chunking_mode", "keyset")
+        self.plan_cache = plan_cache if plan_cache is not None else ChunkPlanCache()
+        self.adaptive_chunking = self.bootstrap.get("adaptive_chunking", True)
+        self.chunk_sizer = AdaptiveChunkSizer(
+            chunk_size,
+            self.bootstrap.get("adaptive_min_chunk_size", 1000),
+            self.bootstrap.get("adaptive_max_chunk_size", 100000)
+        )
+        self.rate_limiter = rate_limiter if rate_limiter is not None else HuntingRateLimiter(
+            self.bootstrap.get("hunting_calls_per_minute", 45),
+            self.bootstrap.get("hunting_calls_per_hour", 1500)
+        )
         self.max_thread_workers = max_thread_workers
-        self.thread_pool = ThreadPoolExecutor(max_workers=self.max_thread_workers)
+        # An Ingestor built with shared= runs on that Ingestor's thread pool, Kusto clients and the
+        # helpers built on them (metadata writer, blob uploader, status tracker, coalescer), so
+        # pipelines running side by side in one process hold a single set. The owner closes them.
+        self.shared = shared
+        self.thread_pool = shared.thread_pool if shared else ThreadPoolExecutor(max_workers=self.max_thread_workers)
+        self.compression_level = self.bootstrap.get("ingest_compression_level", 1)
+        self.serialization_pool = shared.serialization_pool if shared else get_serialization_pool(self.bootstrap)
+        self.passthrough_responses = self.bootstrap.get("passthrough_responses", False)
+        self.memory_budget = MemoryBudget(self.bootstrap["spill_budget_bytes"]) if self.bootstrap.get("spill_budget_bytes") else None
+        self.spill_directory = self.bootstrap.get("spill_directory")
+        self.spill_row_bytes = self.bootstrap.get("spill_row_bytes", 4096)
 
         self.connection_config = {
             'ingest_uri': self.bootstrap["adx_ingest_uri"],
@@ -34,12 +73,53 @@ class Ingestor:
             'tenant_id': self.bootstrap["tenantId"]
         }
 
-        self.ingest_client = self._create_adx_ingest_client()
-        self.data_client = self._create_adx_data_client()
+        if shared:
+            self.ingest_client = shared.ingest_client
+            self.data_client = shared.data_client
+            self.metadata_client = shared.metadata_client
+        else:
+            self.ingest_client = self._create_adx_ingest_client()
+            self.data_client = self._create_adx_data_client()
+            self.metadata_client = AsyncMetadataClient(self.data_client, self.bootstrap.get("metadata_workers", 2), self.telemetry)
+        self.metadata_writer = shared.metadata_writer if shared else MetadataWriter(
+            self.metadata_client,
+            self.bootstrap["adx_database"],
+            self.ingest_client,
+            self.bootstrap.get("metadata_command_max_rows", 1000),
+            self.bootstrap.get("metadata_command_max_bytes", 1024 * 1024),
+            self.bootstrap.get("metadata_queued_min_rows")
+        )
+
+        # Chunks of at most streaming_max_records rows are streamed, falling back to queued ingestion
+        # when streaming is unavailable or the payload is too large for it.
+        self.streaming_max_records = self.bootstrap.get("streaming_max_records")
+        self.streaming_client = None
+        if self.streaming_max_records:
+            self.streaming_client = shared.streaming_client if shared and shared.streaming_client else self._create_adx_streaming_client()
 
-        self.defender_token_cache = {'token': None, 'expires': None}
-        self.adx_token_cache = {'token': None, 'expires': None}
-        self.token_lock = asyncio.Lock()
+        self.blob_uploader = shared.blob_uploader if shared else BlobIngestUploader(
+            self.ingest_client,
+            self.bootstrap.get("blob_upload_concurrency", 4),
+            self.bootstrap.get("blob_block_size", 4 * 1024 * 1024)
+        ) if self.bootstrap.get("direct_blob_upload", False) else None
+
+        self.confirm_ingestion = self.bootstrap.get("confirm_ingestion", False)
+        if shared:
+            self.status_tracker = shared.status_tracker
+        else:
+            self.status_tracker = get_status_tracker(self.ingest_client, self.bootstrap) if self.confirm_ingestion else None
+
+        self.coalescer = shared.coalescer if shared else IngestionCoalescer(
+            self._sync_ingest_payload,
+            self.thread_pool,
+            self.bootstrap.get("coalesce_target_bytes", 256 * 1024 * 1024),
+            self.bootstrap.get("coalesce_max_age", 60),
+            self.compression_level,
+            (lambda: SpillBuffer(self.memory_budget, self.spill_directory)) if self.memory_budget else None
+        ) if self.bootstrap.get("coalesce_ingestion", False) else None
+
+        self.token_provider = token_provider if token_provider is not None else get_token_provider(self.bootstrap)
+        self.transport = shared.transport if shared else get_transport(self.bootstrap)
 
     def _create_adx_ingest_client(self):
         kcsb = KustoConnectionStringBuilder.with_aad_application_key_authentication(
@@ -50,6 +130,21 @@ class Ingestor:
         )
         return QueuedIngestClient(kcsb)
     
+    def _create_adx_streaming_client(self):
+        engine_kcsb = KustoConnectionStringBuilder.with_aad_application_key_authentication(
+            connection_string=self.connection_config['cluster_uri'],
+            aad_app_id=self.connection_config['client_id'],
+            app_key=self.connection_config['client_secret'],
+            authority_id=self.connection_config['tenant_id']
+        )
+        dm_kcsb = KustoConnectionStringBuilder.with_aad_application_key_authentication(
+            connection_string=self.connection_config['ingest_uri'],
+            aad_app_id=self.connection_config['client_id'],
+            app_key=self.connection_config['client_secret'],
+            authority_id=self.connection_config['tenant_id']
+        )
+        return ManagedStreamingIngestClient(engine_kcsb, dm_kcsb)
+
     def _create_adx_data_client(self):
         kcsb = KustoConnectionStringBuilder.with_aad_application_key_authentication(
             connection_string=self.connection_config['cluster_uri'],
@@ -60,85 +155,15 @@ class Ingestor:
         return KustoClient(kcsb)
     
     async def get_defender_token(self, session: aiohttp.ClientSession) -> str:
-        async with self.token_lock:
-            if (self.defender_token_cache['token'] and 
-                self.defender_token_cache['expires'] and
-                datetime.now() < self.defender_token_cache['expires']):
-                return self.defender_token_cache['token']
-            
-            try:
-                aad_token_url = f"https://login.microsoftonline.com/{self.bootstrap['tenantId']}/oauth2/token"
-                body = {
-                    'resource': self.bootstrap["defender_resource_uri"],
-                    'client_id': self.bootstrap["clientId"],
-                    'client_secret': self.bootstrap["clientSecret"],
-                    'grant_type': 'client_credentials'
-                }
-                
-                async with session.post(
-                    aad_token_url,
-                    data=urllib.parse.urlencode(body),
-                    headers={'Content-Type': 'application/x-www-form-urlencoded'}
-                ) as response:
-                    if response.status == 200:
-                        token_data = await response.json()
-                        token = token_data["access_token"]
-                        expires_in = int(token_data.get("expires_in", 3600))
-                        
-                        self.defender_token_cache = {
-                            'token': token,
-                            'expires': datetime.now() + timedelta(seconds=expires_in - 300)
-                        }
-                        print("[INFO] --> Defender Token acquired")
-                        return token
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Failed to get Defender token: {response.status} - {error_text}")
-                        
-            except Exception as e:
-                self.defender_token_cache = {'token': None, 'expires': None}
-                raise Exception(f"Defender token acquisition failed: {str(e)}")
+        return await self.token_provider.get_token(self.bootstrap["defender_resource_uri"])
 
     async def get_adx_token(self, session: aiohttp.ClientSession) -> str:
-        async with self.token_lock:
-            if (self.adx_token_cache['token'] and 
-                self.adx_token_cache['expires'] and
-                datetime.now() < self.adx_token_cache['expires']):
-                return self.adx_token_cache['token']
-            
-            try:
-                aad_token_url = f"https://login.microsoftonline.com/{self.bootstrap['tenantId']}/oauth2/token"
-                body = {
-                    "grant_type": "client_credentials",
-                    "client_id": self.bootstrap["clientId"],
-                    "client_secret": self.bootstrap["clientSecret"],
-                    "resource": self.bootstrap["adx_cluster_uri"]
-                }
-                
-                async with session.post(
-                    aad_token_url,
-                    data=body,
-                ) as response:
-                    if response.status == 200:
-                        token_data = await response.json()
-                        token = token_data["access_token"]
-                        expires_in = int(token_data.get("expires_in", 3600))
-                        
-                        self.adx_token_cache = {
-                            'token': token,
-                            'expires': datetime.now() + timedelta(seconds=expires_in - 300)
-                        }
-                        print("[INFO] --> ADX Token acquired")
-                        return token
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Failed to get ADX token: {response.status} - {error_text}")
-                        
-            except Exception as e:
-                self.adx_token_cache = {'token': None, 'expires': None}
-                raise Exception(f"ADX token acquisition failed: {str(e)}")
-    
-    def build_base_kql_query(self, source_tbl: str, load_type: str, watermark_column: str, high_watermark: datetime) -> str:        
+        return await self.token_provider.get_token(self.bootstrap["adx_cluster_uri"])
+
+    def build_base_kql_query(self, source_tbl: str, load_type: str, watermark_column: str, high_watermark: datetime, checkpoint_watermark: Optional[datetime] = None) -> str:        
+        # A checkpoint left by an interrupted run resumes after it, for full and incremental loads alike.
+        if checkpoint_watermark:
+            load_type, high_watermark = "Incremental", checkpoint_watermark
         if load_type == "Full" or not high_watermark:
             if watermark_column == "Watermark_IngestionTime":
                 return f"{source_tbl} | extend {watermark_column} = ingestion_time()"
@@ -155,53 +180,203 @@ class Ingestor:
         end_rownum = start_rownum + chunk_size
         return f"{base_query} | sort by {watermark_column} asc | extend rownum = row_number() | where rownum between ({start_rownum+1} .. {end_rownum}) | project-away rownum"
 
-    async def get_record_count(self, session: aiohttp.ClientSession, base_query: str) -> int:
-        count_query = f"{base_query} | count"
-        
-        try:
+    def build_keyset_plan_query(self, base_query: str, watermark_column: str, chunk_size: int) -> str:
+        # One pass over the delta: rows sharing a watermark value always land in the same chunk,
+        # so the [low, high) ranges below never split ties across chunk boundaries.
+        return (
+            f"{base_query} | summarize Count = count() by {watermark_column} "
+            f"| sort by {watermark_column} asc | extend Cumulative = row_cumsum(Count) "
+            f"| summarize LowWatermark = min({watermark_column}), HighWatermark = max({watermark_column}), Records = sum(Count) "
+            f"by ChunkIndex = (Cumulative - Count) / {chunk_size} "
+            f"| sort by ChunkIndex asc"
+        )
+
+    def build_histogram_plan_query(self, base_query: str, watermark_column: str, bin_size: timedelta) -> str:
+        return f"{base_query} | summarize Count = count() by Bin = bin({watermark_column}, {format_timespan(bin_size)}) | sort by Bin asc"
+
+    def build_range_kql_query(self, base_query: str, watermark_column: str, chunk_range: Dict[str, Any]) -> str:
+        upper_operator = "<=" if chunk_range["high_inclusive"] else "<"
+        return (
+            f"{base_query} | where {watermark_column} >= datetime('{chunk_range['low_watermark']}') "
+            f"and {watermark_column} {upper_operator} datetime('{chunk_range['high_watermark']}')"
+        )
+
+    async def call_hunting_api(
+        self, 
+        session: aiohttp.ClientSession, 
+        query: str, 
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+        raw: bool = False
+    ) -> Tuple[int, Any, Optional[str]]:
+        # Every Defender call goes through the shared rate limiter; a 429 pauses all callers
+        # for Retry-After instead of only the coroutine that received it. With raw=True the
+        # undecoded response bytes are returned instead of the parsed JSON.
+        max_retries = 5
+        retry_attempts = 0
+
+        while True:
+            await self.rate_limiter.acquire()
+
             defender_token = await self.get_defender_token(session)
             headers = {
                 "Authorization": f"Bearer {defender_token}",
                 "Content-Type": "application/json"
             }
-            
-            async with session.post(
-                self.bootstrap['defender_hunting_api_url'],
-                headers=headers,
-                json={"Query": count_query}
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    records = result.get("Results", [])
-                    if records and len(records) > 0:
-                        return records[0].get("Count", 0)
-                    return 0
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"Failed to get record count: {response.status} - {error_text}")
+
+            with self.telemetry.stage("defender_call"):
+                async with session.post(
+                    self.bootstrap['defender_hunting_api_url'],
+                    headers=headers,
+                    json={"Query": query},
+                    timeout=timeout
+                ) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After", "60")
+                    body = await response.read()
+            self.telemetry.increment("defender_calls")
+
+            if status == 429:
+                retry_attempts += 1
+                retry_after = int(retry_after)
+                self.telemetry.increment("defender_throttled")
+                self.rate_limiter.pause(retry_after)
+                if retry_attempts < max_retries:
+                    log.warning(f"Rate limited by Defender API. Pausing all Defender calls for {retry_after} seconds...")
+                    continue
+
+                return status, None, f"Rate limited by Defender API: {status} - {body.decode('utf-8', errors='replace')}"
+
+            if status != 200:
+                return status, None, f"API call failed: {status} - {body.decode('utf-8', errors='replace')}"
+
+            self.telemetry.increment("defender_response_bytes", len(body))
+            if raw:
+                return status, body, None
+            with self.telemetry.stage("json_decode"):
+                return status, json.loads(body), None
+
+    async def run_hunting_query(self, session: aiohttp.ClientSession, query: str) -> List[Dict[str, Any]]:
+        status, result, error = await self.call_hunting_api(session, query)
+        if error:
+            raise Exception(f"Hunting query failed: {error}")
+        return result.get("Results", [])
+
+    async def get_record_count(self, session: aiohttp.ClientSession, base_query: str) -> int:
+        count_query = f"{base_query} | count"
+        
+        try:
+            records = await self.run_hunting_query(session, count_query)
+            if records and len(records) > 0:
+                return records[0].get("Count", 0)
+            return 0
                     
         except Exception as e:
-            print(f"[ERROR] --> Error getting record count: {str(e)}")
+            log.error(f"Error getting record count: {str(e)}")
+            raise
+
+    async def plan_keyset_chunks(self, session: aiohttp.ClientSession, base_query: str, watermark_column: str, chunk_size: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        chunk_size = chunk_size or self.chunk_size
+        plan_query = self.build_keyset_plan_query(base_query, watermark_column, chunk_size)
+
+        try:
+            rows = await self.run_hunting_query(session, plan_query)
+        except Exception as e:
+            log.error(f"Error planning keyset chunks: {str(e)}")
+            raise
+
+        chunk_ranges = []
+        for i, row in enumerate(rows):
+            is_last = i == len(rows) - 1
+            chunk_ranges.append({
+                "chunk_id": i + 1,
+                "low_watermark": row["LowWatermark"],
+                "high_watermark": row["HighWatermark"] if is_last else rows[i + 1]["LowWatermark"],
+                "high_inclusive": is_last,
+                "records_count": row["Records"]
+            })
+
+        total_records = sum(r["records_count"] for r in chunk_ranges)
+        return total_records, chunk_ranges
+
+    async def get_histogram_bins(self, session: aiohttp.ClientSession, base_query: str, watermark_column: str, bin_size: timedelta) -> List[Dict[str, Any]]:
+        rows = await self.run_hunting_query(session, self.build_histogram_plan_query(base_query, watermark_column, bin_size))
+        bins = []
+        for row in rows:
+            start = parse_watermark(row["Bin"])
+            bins.append({"start": start, "end": start + bin_size, "count": row["Count"]})
+        return bins
+
+    async def plan_histogram_chunks(self, session: aiohttp.ClientSession, base_query: str, watermark_column: str, table_name: str, chunk_size: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        chunk_size = chunk_size or self.chunk_size
+        bin_size = parse_timespan(self.bootstrap.get("histogram_bin_size", "1h"))
+        max_refinements = self.bootstrap.get("histogram_max_refinements", 2)
+        refinement_factor = self.bootstrap.get("histogram_refinement_factor", 60)
+
+        try:
+            bins = await self.get_histogram_bins(session, base_query, watermark_column, bin_size)
+
+            # Bursty bins that alone exceed the chunk size are re-binned at a finer grain so they
+            # can still be packed into size-balanced chunks.
+            for _ in range(max_refinements):
+                oversized = [b for b in bins if b["count"] > chunk_size and (b["end"] - b["start"]) > timedelta(milliseconds=1)]
+                if not oversized:
+                    break
+
+                refined = await asyncio.gather(*[
+                    self.get_histogram_bins(
+                        session,
+                        self.build_range_kql_query(base_query, watermark_column, {
+                            "low_watermark": format_watermark(b["start"]),
+                            "high_watermark": format_watermark(b["end"]),
+                            "high_inclusive": False
+                        }),
+                        watermark_column,
+                        (b["end"] - b["start"]) / refinement_factor
+                    )
+                    for b in oversized
+                ])
+
+                replacements = {id(b): r for b, r in zip(oversized, refined)}
+                bins = [sub for b in bins for sub in replacements.get(id(b), [b])]
+
+        except Exception as e:
+            log.error(f"Error planning histogram chunks: {str(e)}")
             raise
 
-    async def calculate_chunks(self, session: aiohttp.ClientSession, base_query: str) -> Tuple[int, int]:
+        chunk_ranges = pack_bins(bins, chunk_size)
+        self.plan_cache.put(table_name, bins, chunk_ranges)
+
+        total_records = sum(r["records_count"] for r in chunk_ranges)
+        log.info(f"Histogram plan for {table_name}: {len(bins)} bins packed into {len(chunk_ranges)} chunks")
+        return total_records, chunk_ranges
+
+    async def calculate_chunks(self, session: aiohttp.ClientSession, base_query: str, watermark_column: str, table_name: str, chunk_size: Optional[int] = None) -> Tuple[int, int, Optional[List[Dict[str, Any]]]]:
+        chunk_size = chunk_size or self.chunk_size
         try:
+            if self.chunking_mode == "histogram":
+                total_records, chunk_ranges = await self.plan_histogram_chunks(session, base_query, watermark_column, table_name, chunk_size)
+                return total_records, len(chunk_ranges), chunk_ranges
+
+            if self.chunking_mode == "keyset":
+                total_records, chunk_ranges = await self.plan_keyset_chunks(session, base_query, watermark_column, chunk_size)
+                return total_records, len(chunk_ranges), chunk_ranges
+
             total_records = await self.get_record_count(session, base_query)
             if total_records == 0:
-                return 0, 0
+                return 0, 0, None
             
-            num_chunks = math.ceil(total_records / self.chunk_size)
+            num_chunks = math.ceil(total_records / chunk_size)
 
-            return total_records, num_chunks
+            return total_records, num_chunks, None
         except Exception as e:
-            print(f"[ERROR] --> Error calculating chunks: {e}")
-            return 0, 0
+            log.error(f"Error calculating chunks: {e}")
+            return 0, 0, None
 
-    def ensure_table_exists(self, destination_folder: str, destination_tbl: str, watermark_column: str) -> None:
+    async def ensure_table_exists(self, destination_folder: str, destination_tbl: str, watermark_column: str) -> None:
         try:
             create_table_cmd = f".create-merge table {destination_tbl} ({watermark_column}: datetime, RawData: dynamic) with (folder = '{destination_folder}')"
-            self.data_client.execute(self.bootstrap["adx_database"], create_table_cmd)
-            print(f"[INFO] --> Table {destination_tbl} created/verified")
+            await self.metadata_client.execute(self.bootstrap["adx_database"], create_table_cmd)
+            log.info(f"Table {destination_tbl} created/verified")
 
             mapping = [
                 {"column": watermark_column, "path": f"$.{watermark_column}", "datatype": "datetime"},
@@ -211,141 +386,127 @@ class Ingestor:
                 f".create-or-alter table {destination_tbl} ingestion json mapping 'RawDataMap' "
                 f"'{json.dumps(mapping)}'"
             )            
-            self.data_client.execute(self.bootstrap["adx_database"], create_mapping_cmd)
-            print(f"[INFO] --> Ingestion JSON mapping created for {destination_tbl}")
+            await self.metadata_client.execute(self.bootstrap["adx_database"], create_mapping_cmd)
+            log.info(f"Ingestion JSON mapping created for {destination_tbl}")
+
+            if self.streaming_client:
+                await self.metadata_client.execute(self.bootstrap["adx_database"], f".alter table {destination_tbl} policy streamingingestion enable")
+                log.info(f"Streaming ingestion policy enabled for {destination_tbl}")
             
         except Exception as e:
-            print(f"[ERROR] --> Error creating table {destination_tbl}: {str(e)}")
+            log.error(f"Error creating table {destination_tbl}: {str(e)}")
             raise
 
-    def meta_insert_configs(self, ingestion_results: Dict[str, Any], table_configs: List[Dict[str, Any]]) -> None:
+    def build_config_row(self, table_config: Dict[str, Any], high_watermark: Any, is_active: bool, checkpoint_watermark: Any = None) -> Dict[str, Any]:
+        chunk_size = self.chunk_sizer.sizes.get(table_config["DestinationTable"]) if self.adaptive_chunking else None
+        return {
+            "SourceTable": table_config["SourceTable"],
+            "DestinationFolder": table_config["DestinationFolder"],
+            "DestinationTable": table_config["DestinationTable"],
+            "WatermarkColumn": table_config["WatermarkColumn"],
+            "LastRefreshedTime": self.bootstrap["ingestion_start_time"],
+            "HighWatermark": high_watermark,
+            "LoadType": table_config["LoadType"],
+            "IsActive": is_active,
+            "Weight": table_config.get("Weight"),
+            "ChunkSize": chunk_size or table_config.get("ChunkSize") or None,
+            "CheckpointWatermark": checkpoint_watermark
+        }
+
+    async def meta_insert_configs(self, ingestion_results: Dict[str, Any], table_configs: List[Dict[str, Any]]) -> None:
         table_lookup = {item["DestinationTable"]: item for item in table_configs}
 
+        # A finished run clears the table's checkpoint; its failed chunks are in the failures table.
+        rows = []
         for r in ingestion_results:
             if r.get("chunk_results"):
-                try:
-                    max_high_watermark = r["chunk_results"][-1]["high_watermark"] if r["chunk_results"][-1]["high_watermark"] else 'null'
+                # Empty sub-ranges and unprocessed chunks carry no watermark, so the table advances to the
+                # highest one recorded, or keeps its current watermark when there is none.
+                watermarks = [c["high_watermark"] for c in r["chunk_results"] if isinstance(c, dict) and c.get("high_watermark")]
+                high_watermark = max(watermarks, key=parse_watermark) if watermarks else table_lookup[r["table"]]["HighWatermark"] or None
+                rows.append(self.build_config_row(table_lookup[r["table"]], high_watermark, r["success"]))
+            elif r.get("success") and table_lookup.get(r["table"], {}).get("CheckpointWatermark"):
+                # Nothing was left after the checkpoint, so the interrupted run is complete.
+                rows.append(self.build_config_row(table_lookup[r["table"]], table_lookup[r["table"]]["CheckpointWatermark"], True))
 
-                    source_table = table_lookup.get(r["table"])["SourceTable"]
-                    destination_folder = table_lookup.get(r["table"])["DestinationFolder"]
-                    watermark_column = table_lookup.get(r["table"])["WatermarkColumn"]
-                    load_type = table_lookup.get(r["table"])["LoadType"]
-                    
-                    if r["success"]:
-                        append_command = f"""
-                            .set-or-append {self.bootstrap['config_table']} <|
-                            datatable (
-                                SourceTable: string,
-                                DestinationFolder: string,
-                                DestinationTable: string,
-                                WatermarkColumn: string,
-                                LastRefreshedTime: datetime,
-                                HighWatermark: datetime,
-                                LoadType: string,
-                                IsActive: bool
-                            )
-                            [
-                                '{source_table}',
-                                '{destination_folder}',
-                                '{r["table"]}',
-                                '{watermark_column}',
-                                '{self.bootstrap["ingestion_start_time"]}',
-                                datetime('{max_high_watermark}'),
-                                '{load_type}',
-                                true
-                            ]
-                        """
-                    else:
-                        append_command = f"""
-                            .set-or-append {self.bootstrap['config_table']} <|
-                            datatable (
-                                SourceTable: string,
-                                DestinationFolder: string,
-                                DestinationTable: string,
-                                WatermarkColumn: string,
-                                LastRefreshedTime: datetime,
-                                HighWatermark: datetime,
-                                LoadType: string,
-                                IsActive: bool
-                            )
-                            [
-                                '{source_table}',
-                                '{destination_folder}',
-                                '{r["table"]}',
-                                '{watermark_column}',
-                                '{self.bootstrap["ingestion_start_time"]}',
-                                datetime('{max_high_watermark}'),
-                                '{load_type}',
-                                false
-                            ]
-                        """
-
-                    self.data_client.execute_mgmt(self.bootstrap["adx_database"], append_command)
-
-                    print(f"[INFO] --> Updated config for {r['table']} to {max_high_watermark}")
-                except Exception as e:
-                    print(f"[ERROR] --> Error updating config for {r['table']}: {str(e)}")
-                    raise
+        try:
+            # The next run reads these rows back through the config view, so they are never queued.
+            await self.metadata_writer.write(self.bootstrap["config_table"], CONFIG_SCHEMA, rows, allow_queued=False)
+            for row in rows:
+                log.info(f"Updated config for {row['DestinationTable']} to {row['HighWatermark'] or 'null'}")
+        except Exception as e:
+            log.error(f"Error updating configs for {', '.join(row['DestinationTable'] for row in rows)}: {str(e)}")
+            raise
 
-    def meta_insert_audits(self, ingestion_id: str, ingestion_start_time: str, ingestion_results: Dict[str, Any]) -> None:
-        insert_values = []
-        for data in ingestion_results:
-            error_val = '""' if data["error"] is None else str(data["error"]).replace('"', "")
-            if data.get('chunk_results'):
-                chunk_results = json.dumps(data['chunk_results']).replace('"', '\\"')
-                chunk_results = f'dynamic({json.dumps(data["chunk_results"])})'
-            else:
-                chunk_results = 'dynamic([])'
-            insert_values.append(
-                f'"{ingestion_id}", datetime({ingestion_start_time}), "{data["folder"]}", "{data["table"]}", {str(data["success"]).lower()}, '
-                f'{data["records_processed"]}, {data["chunked"]}, {data["chunks_processed"]}, {data["chunks_failed"]}, '
-                f'{chunk_results}, "{error_val}"'
-            )
-            insert_values_str = ",\n    ".join(insert_values)
+    async def meta_insert_checkpoints(self, checkpoints: List[Tuple[Dict[str, Any], Any]]) -> None:
+        # HighWatermark keeps its committed value, so a full load that has not finished is not
+        # mistaken for a completed one.
+        rows = [
+            self.build_config_row(table_config, table_config["HighWatermark"] or None, True, watermark)
+            for table_config, watermark in checkpoints
+        ]
+        await self.metadata_writer.write(self.bootstrap["config_table"], CONFIG_SCHEMA, rows, allow_queued=False)
+        for row in rows:
+            log.info(f"Checkpointed {row['DestinationTable']} at {row['CheckpointWatermark']}")
 
-        kql_command = f"""
-        .set-or-append {self.bootstrap["audit_table"]} <|
-        datatable(ingestion_id:string, ingestion_timestamp: datetime, folder: string, table: string, success: bool, records_processed: long, chunked: bool, chunks_processed: int, chunks_failed: int, chunk_results: dynamic, error: string)
-        [
-        {insert_values_str}
-        ]"""
+    def is_chunk_durable(self, result: Dict[str, Any]) -> bool:
+        # With confirm_ingestion on, a queued chunk only counts once ADX has reported it ingested.
+        if not self.status_tracker or not result.get("source_id") or result.get("confirmed"):
+            return True
+        outcome = self.status_tracker.outcome(result["source_id"])
+        return bool(outcome and outcome[0])
+
+    async def meta_insert_audits(self, ingestion_id: str, ingestion_start_time: str, ingestion_results: Dict[str, Any]) -> None:
+        rows = [
+            {
+                "ingestion_id": ingestion_id,
+                "ingestion_timestamp": ingestion_start_time,
+                "folder": data["folder"],
+                "table": data["table"],
+                "success": data["success"],
+                "records_processed": data["records_processed"],
+                "chunked": data["chunked"],
+                "chunks_processed": data["chunks_processed"],
+                "chunks_failed": data["chunks_failed"],
+                "chunk_results": data.get("chunk_results") or [],
+                "error": data["error"]
+            }
+            for data in ingestion_results
+        ]
 
         try:
-            self.data_client.execute_mgmt(self.bootstrap["adx_database"], kql_command)
-            print("[INFO] --> Inserted audit records")
+            await self.metadata_writer.write(self.bootstrap["audit_table"], AUDIT_SCHEMA, rows)
+            log.info("Inserted audit records")
         except Exception as e:
-            print(f"Error inserting audit records: {e}")
+            log.error(f"Error inserting audit records: {e}")
 
-    def meta_insert_chunk_failures(self, ingestion_id: str, ingestion_start_time: str, ingestion_results: Dict[str, Any]) -> None:
-        insert_values = []
+    async def meta_insert_chunk_failures(self, ingestion_id: str, ingestion_start_time: str, ingestion_results: Dict[str, Any]) -> None:
+        rows = []
         for data in ingestion_results:
-            if data.get("chunk_results"):
-                for r in data["chunk_results"]:
-                    if not r["success"]:
-                        low_watermark = r["low_watermark"] if r["low_watermark"] else 'null'
-                        high_watermark = r["high_watermark"] if r["high_watermark"] else 'null'
-                        error_val = '""' if r["error"] is None else str(r["error"]).replace('"', "")
-                        insert_values.append(
-                            f'"{ingestion_id}", datetime({ingestion_start_time}), '
-                            f'"{r["folder"]}", "{r["table"]}", {r["chunk_id"]}, {str(r["success"]).lower()}, '
-                            f'{r["records_count"]}, {r["records_processed"]}, '
-                            f'datetime({low_watermark}), datetime({high_watermark}), "{error_val}", "false"'
-                        )
-                insert_values_str = ",\n    ".join(insert_values)
-        
-        if insert_values != []:
-            kql_command = f"""
-            .set-or-append {self.bootstrap["chunk_audit_table"]} <|
-            datatable(ingestion_id:string, ingestion_time:datetime, folder:string, table:string, chunk_id:int, success:bool, records_count:int, records_processed:int, low_watermark:datetime, high_watermark:datetime, error:string, reprocess_success:bool)
-            [
-            {insert_values_str}
-            ]"""
+            for r in data.get("chunk_results") or []:
+                # Chunks that never produced a result have no range to replay.
+                if isinstance(r, dict) and not r["success"]:
+                    rows.append({
+                        "ingestion_id": ingestion_id,
+                        "ingestion_timestamp": ingestion_start_time,
+                        "folder": r.get("folder", data["folder"]),
+                        "table": r.get("table", data["table"]),
+                        "chunk_id": r["chunk_id"],
+                        "success": r["success"],
+                        "records_count": r.get("records_count", 0),
+                        "records_processed": r["records_processed"],
+                        "low_watermark": r.get("low_watermark"),
+                        "high_watermark": r.get("high_watermark"),
+                        "error": r["error"],
+                        "reprocess_success": False
+                    })
 
+        if rows:
             try:
-                self.data_client.execute_mgmt(self.bootstrap["adx_database"], kql_command)
-                print("[INFO] --> Inserted chunk failure records")
+                await self.metadata_writer.write(self.bootstrap["chunk_audit_table"], CHUNK_AUDIT_SCHEMA, rows)
+                log.info("Inserted chunk failure records")
             except Exception as e:
-                print(f"Error inserting chunk failure records: {e}")
+                log.error(f"Error inserting chunk failure records: {e}")
                 raise
 
 
@@ -362,7 +523,7 @@ class Ingestor:
             table_name = table_configs[i]["SourceTable"]
             
             if isinstance(result, Exception):
-                print(f"[ERROR] --> Exception in {table_name}: {str(result)}")
+                log.error(f"Exception in {table_name}: {str(result)}")
                 exceptions.append(f"{table_name}: {str(result)}")
                 failed_tables += 1
                 detailed_results.append({
@@ -374,10 +535,10 @@ class Ingestor:
                 detailed_results.append(result)
                 if result.get("success"):
                     successful_tables += 1
-                    print(f"[SUCCESS] --> {table_name}: {result.get('records_processed', 0)} records")
+                    log.success(f"{table_name}: {result.get('records_processed', 0)} records")
                 else:
                     failed_tables += 1
-                    print(f"[ERROR] --> {table_name}: {result.get('error', 'Unknown error')}")
+                    log.error(f"{table_name}: {result.get('error', 'Unknown error')}")
                 
                 total_records_processed += result.get("records_processed", 0)
                 total_chunks_processed += result.get("chunks_processed", 0)
@@ -397,27 +558,93 @@ class Ingestor:
             "exceptions": exceptions,
             "detailed_results": detailed_results,
             "chunking_enabled": True,
+            "chunking_mode": self.chunking_mode,
             "chunk_size": self.chunk_size
         }
         
-        print(f"\n" + f"="*100)
-        print(f"PROCESSING COMPLETED")
-        print(f"="*100)
-        print(f"Execution time: {execution_time:.2f} seconds")
-        print(f"Tables - Successful: {successful_tables}, Failed: {failed_tables}")
-        print(f"Records processed: {total_records_processed:,}")
-        print(f"Chunks - Successful: {total_chunks_processed}, Failed: {total_chunks_failed}")
+        log.info("PROCESSING COMPLETED")
+        log.info(f"Execution time: {execution_time:.2f} seconds")
+        log.info(f"Tables - Successful: {successful_tables}, Failed: {failed_tables}")
+        log.info(f"Records processed: {total_records_processed:,}")
+        log.info(f"Chunks - Successful: {total_chunks_processed}, Failed: {total_chunks_failed}")
         
         if exceptions:
-            print(f"\nErrors encountered:")
             for error in exceptions[:5]:  # Show first 5 errors
-                print(f"  - {error}")
+                log.error(f"Error encountered: {error}")
             if len(exceptions) > 5:
-                print(f"  ... and {len(exceptions) - 5} more errors")
+                log.error(f"... and {len(exceptions) - 5} more errors")
 
         return summary
 
+    def _serialize(self, records: Any, watermark_column: Optional[str], fileobj: Optional[Any] = None) -> Dict[str, Any]:
+        # With serialize_processes set (experimental), large raw responses are encoded and compressed in worker processes.
+        if self.serialization_pool:
+            payload = self.serialization_pool.serialize(records, watermark_column, self.compression_level, fileobj)
+        else:
+            payload = serialize_chunk(records, watermark_column, self.compression_level, fileobj)
+        # Passthrough responses are only counted once they are sliced into rows here.
+        if isinstance(records, bytes):
+            self.telemetry.increment("rows_fetched", payload["records_count"])
+        return payload
+
     def _sync_ingest_data(self, records: List[Dict], chunk_index: int, destination_folder: str, destination_tbl: str, low_watermark: str, high_watermark: str) -> Dict[str, Any]:
+        try:
+            with self.telemetry.stage("serialize"):
+                payload = self._serialize(records, None)
+        except Exception as e:
+            log.error(f"Serialization failed for {destination_tbl} chunk {chunk_index}: {str(e)}")
+            return {
+                "chunk_id": chunk_index,
+                "folder": destination_folder,
+                "table": destination_tbl,
+                "success": False,
+                "records_count": len(records),
+                "records_processed": 0,
+                "low_watermark": low_watermark,
+                "high_watermark": high_watermark,
+                "error": f"Serialization failed: {str(e)[:500]}"
+            }
+
+        payload["low_watermark"] = low_watermark
+        payload["high_watermark"] = high_watermark
+        return self._sync_ingest_payload(payload, chunk_index, destination_folder, destination_tbl)
+
+    def _sync_ingest_raw(self, raw: bytes, chunk_index: int, destination_folder: str, destination_tbl: str, watermark_column: str) -> Dict[str, Any]:
+        result = {
+            "chunk_id": chunk_index,
+            "folder": destination_folder,
+            "table": destination_tbl,
+            "success": False,
+            "records_count": 0,
+            "records_processed": 0,
+            "low_watermark": None,
+            "high_watermark": None,
+            "error": None
+        }
+
+        try:
+            with self.telemetry.stage("serialize"):
+                payload = self._serialize(raw, watermark_column)
+        except Exception as e:
+            result["error"] = f"Serialization failed: {str(e)[:500]}"
+            log.error(f"Serialization failed for {destination_tbl} chunk {chunk_index}: {str(e)}")
+            return result
+
+        if payload["records_count"] == 0:
+            result["success"] = True
+            return result
+
+        return self._sync_ingest_payload(payload, chunk_index, destination_folder, destination_tbl)
+
+    def _sync_ingest_payload(self, payload: Dict[str, Any], chunk_index: int, destination_folder: str, destination_tbl: str) -> Dict[str, Any]:
+        with self.telemetry.stage("ingest"):
+            result = self._sync_send_payload(payload, chunk_index, destination_folder, destination_tbl)
+        if result["success"]:
+            self.telemetry.increment("rows_ingested", result["records_processed"])
+            self.telemetry.increment("ingested_raw_bytes", payload["raw_size"])
+        return result
+
+    def _sync_send_payload(self, payload: Dict[str, Any], chunk_index: int, destination_folder: str, destination_tbl: str) -> Dict[str, Any]:
         max_retries = 5
         retry_attempts = 0
         backoff_factor = 2
@@ -428,17 +655,29 @@ class Ingestor:
             "folder": destination_folder,
             "table": destination_tbl,
             "success": False,
-            "records_count": len(records),
+            "records_count": payload["records_count"],
             "records_processed": 0,
-            "low_watermark": low_watermark,
-            "high_watermark": high_watermark,
+            "low_watermark": payload["low_watermark"],
+            "high_watermark": payload["high_watermark"],
             "error": None
         }
 
+        data_stream = payload["data_stream"]
+        spill_path = payload.get("spill_path")
+
+        if payload["records_count"] == 0:
+            result["success"] = True
+            return result
+
+        # With confirmation on, ADX reports the outcome of this ingestion to the status queues
+        # under this id, and the chunk only counts as ingested once that report arrives.
+        source_id = uuid.uuid4() if self.confirm_ingestion else None
+
         while retry_attempts < max_retries:
             try:
-                data_as_str = "\n".join(json.dumps(r) for r in records)
-                data_stream = StringIO(data_as_str)
+                # The compressed payload is built once per chunk; retries only rewind it.
+                if data_stream is not None:
+                    data_stream.seek(0)
                 
                 ingestion_props = IngestionProperties(
                     database=self.bootstrap["adx_database"],
@@ -446,14 +685,39 @@ class Ingestor:
                     data_format=DataFormat.JSON,
                     ingestion_mapping_kind=IngestionMappingKind.JSON,
                     ingestion_mapping_reference="RawDataMap",
+                    report_level=ReportLevel.FailuresAndSuccesses if source_id else ReportLevel.DoNotReport,
+                    report_method=ReportMethod.Queue
                 )
 
-                self.ingest_client.ingest_from_stream(data_stream, ingestion_props)
+                streamed = False
+                if self.streaming_client and payload["records_count"] <= self.streaming_max_records:
+                    if spill_path:
+                        ingestion_result = self.streaming_client.ingest_from_file(FileDescriptor(spill_path, size=payload["raw_size"], source_id=source_id), ingestion_props)
+                    else:
+                        ingestion_result = self.streaming_client.ingest_from_stream(
+                            StreamDescriptor(data_stream, source_id=source_id, is_compressed=True, size=payload["raw_size"]),
+                            ingestion_props
+                        )
+                    streamed = ingestion_result.status == IngestionStatus.SUCCESS
+                elif self.blob_uploader:
+                    # Direct uploads name the blob after the source id, so every ingestion needs one.
+                    source_id = source_id or uuid.uuid4()
+                    self.blob_uploader.ingest(payload, ingestion_props, source_id)
+                elif spill_path:
+                    self.ingest_client.ingest_from_file(FileDescriptor(spill_path, size=payload["raw_size"], source_id=source_id), ingestion_props)
+                else:
+                    self.ingest_client.ingest_from_stream(
+                        StreamDescriptor(data_stream, source_id=source_id, is_compressed=True, size=payload["raw_size"]),
+                        ingestion_props
+                    )
 
                 result["success"] = True
                 result["records_processed"] = result["records_count"]
                 result["error"] = None
-                print(f"[INFO - {threading.current_thread().name}] --> Successfully ingested {len(records)} records to {destination_tbl}")
+                # A streamed chunk is committed by the time the call returns, so there is nothing to confirm.
+                if self.confirm_ingestion and not streamed:
+                    result["source_id"] = str(source_id)
+                log.debug("Successfully %s %d records to %s", "streamed" if streamed else "ingested", result["records_count"], destination_tbl)
                 
                 return result
             
@@ -474,21 +738,75 @@ class Ingestor:
                         wait_time = max(0.1, base_wait_time + jitter)
                         thread_offset = (chunk_index % 10) * 0.1 
                         wait_time += thread_offset
-                        print(f"[WARNING] --> Timeout error during ingestion of chunk {chunk_index} to {destination_tbl}, attempt {retry_attempts}/{max_retries}: {str(e)}. Retrying in {wait_time:.2f} seconds...")
+                        log.warning(f"Timeout error during ingestion of chunk {chunk_index} to {destination_tbl}, attempt {retry_attempts}/{max_retries}: {str(e)}. Retrying in {wait_time:.2f} seconds...")
                         time.sleep(wait_time)
                         continue
                     else:
                         result["success"] = False
                         result["error"] = f"Max retries reached: {str(e)[:500]}"
-                        print(f"[ERROR] --> Ingestion failed for {destination_tbl} after {max_retries} attempts: {str(e)}")
+                        log.error(f"Ingestion failed for {destination_tbl} after {max_retries} attempts: {str(e)}")
                         return result
                 else:
                     result["success"] = False
                     result["error"] = str(e)[:500]
-                    print(f"[ERROR] --> Ingestion failed for {destination_tbl}: {str(e)}")
+                    log.error(f"Ingestion failed for {destination_tbl}: {str(e)}")
                     return result
 
+    def _sync_prepare_payload(self, records: Any, watermark_column: str) -> Dict[str, Any]:
+        # Serializes a fetched chunk as soon as it arrives so the decoded records (or the raw
+        # response) can be dropped while the chunk waits for an ingest worker. The compressed
+        # payload stays in memory within the budget and is spilled to a temp file beyond it.
+        spill_buffer = SpillBuffer(self.memory_budget, self.spill_directory)
+        try:
+            with self.telemetry.stage("serialize"):
+                payload = self._serialize(records, watermark_column, spill_buffer)
+                payload["data_stream"] = spill_buffer.finish()
+        except Exception:
+            spill_buffer.discard()
+            raise
+
+        payload["spill_path"] = spill_buffer.path
+        payload["spill_buffer"] = spill_buffer
+        return payload
+
+    def _sync_ingest_prepared(self, payload: Dict[str, Any], chunk_index: int, destination_folder: str, destination_tbl: str) -> Dict[str, Any]:
+        try:
+            return self._sync_ingest_payload(payload, chunk_index, destination_folder, destination_tbl)
+        finally:
+            payload["spill_buffer"].discard()
+
+    async def prepare_payload(self, records: Any, watermark_column: str) -> Dict[str, Any]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.thread_pool, self._sync_prepare_payload, records, watermark_column)
+
+    async def ingest_payload_to_adx(self, payload: Dict[str, Any], chunk_index: int, destination_folder: str, destination_tbl: str) -> Dict[str, Any]:
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                self.thread_pool,
+                self._sync_ingest_prepared,
+                payload,
+                chunk_index,
+                destination_folder,
+                destination_tbl
+            )
+
+        except Exception as e:
+            return {
+                "chunk_id": chunk_index,
+                "folder": destination_folder,
+                "table": destination_tbl,
+                "success": False,
+                "records_count": payload["records_count"],
+                "records_processed": 0,
+                "low_watermark": payload["low_watermark"],
+                "high_watermark": payload["high_watermark"],
+                "error": f"Async wrapper error: {str(e)[:500]}"
+            }
+
     async def ingest_to_adx(self, records: List[Dict], chunk_index: int, destination_folder: str, destination_tbl: str, watermark_column: str) -> Dict[str, Any]:
+        low_watermark = None
+        high_watermark = None
         try:
             low_watermark = min(item[watermark_column] for item in records)
             high_watermark = max(item[watermark_column] for item in records)
@@ -520,150 +838,396 @@ class Ingestor:
                 "error": f"Async wrapper error: {str(e)[:500]}"
             }
 
-    async def process_single_chunk(
+    async def ingest_raw_to_adx(self, raw: bytes, chunk_index: int, destination_folder: str, destination_tbl: str, watermark_column: str) -> Dict[str, Any]:
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                self.thread_pool,
+                self._sync_ingest_raw,
+                raw,
+                chunk_index,
+                destination_folder,
+                destination_tbl,
+                watermark_column
+            )
+
+        except Exception as e:
+            return {
+                "chunk_id": chunk_index,
+                "folder": destination_folder,
+                "table": destination_tbl,
+                "success": False,
+                "records_count": 0,
+                "records_processed": 0,
+                "low_watermark": None,
+                "high_watermark": None,
+                "error": f"Async wrapper error: {str(e)[:500]}"
+            }
+
+    def build_chunk_result(self, table_config: Dict[str, Any], chunk_index: int, success: bool, error: Optional[str] = None, chunk_range: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        result = {
+            "folder": table_config["DestinationFolder"],
+            "table": table_config["DestinationTable"],
+            "success": success,
+            "chunk_id": chunk_index,
+            "records_count": 0,
+            "records_processed": 0,
+            "low_watermark": None,
+            "high_watermark": None,
+            "error": error
+        }
+        # A failed range is recorded with its planned bounds (upper bound inclusive), so the
+        # failures view keeps the row and the reprocessor can replay exactly that range.
+        if not success and chunk_range:
+            result["records_count"] = chunk_range.get("records_count") or 0
+            result["low_watermark"] = chunk_range["low_watermark"]
+            result["high_watermark"] = chunk_range["high_watermark"] if chunk_range["high_inclusive"] else watermark_before(chunk_range["high_watermark"])
+        return result
+
+    async def fetch_chunk(
         self, 
         session: aiohttp.ClientSession, 
         table_config: Dict[str, Any], 
         base_query: str, 
         chunk_index: int, 
         total_chunks: int,
-        disable_chunking: bool = False
-    ) -> Dict[str, Any]:
+        disable_chunking: bool = False,
+        chunk_range: Optional[Dict[str, Any]] = None,
+        chunk_size: Optional[int] = None
+    ) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        # Returns the fetched records (raw response bytes in passthrough mode), or a finished
+        # chunk result when there is nothing to ingest.
         source_tbl = table_config["SourceTable"]
-        destination_folder = table_config["DestinationFolder"]
-        destination_tbl = table_config["DestinationTable"]
         watermark_column = table_config["WatermarkColumn"]
 
-        max_retries = 5
-        retry_attempts = 0
-        
         try:
             if disable_chunking:
                 chunked_query = base_query
+            elif chunk_range:
+                chunked_query = self.build_range_kql_query(base_query, watermark_column, chunk_range)
             else:
-                chunked_query = self.build_chunked_kql_query(base_query, watermark_column, chunk_index, self.chunk_size)
+                chunked_query = self.build_chunked_kql_query(base_query, watermark_column, chunk_index, chunk_size or self.chunk_size)
             
-            print(f"[INFO] --> Processing {source_tbl} chunk {chunk_index}/{total_chunks}")
+            log.debug("Processing %s chunk %d/%d", source_tbl, chunk_index, total_chunks)
             
-            defender_token = await self.get_defender_token(session)
-            headers = {
-                "Authorization": f"Bearer {defender_token}",
-                "Content-Type": "application/json"
-            }
-            
-            while retry_attempts < max_retries:
-                async with session.post(
-                    self.bootstrap['defender_hunting_api_url'],
-                    headers=headers,
-                    json={"Query": chunked_query},
-                    timeout=aiohttp.ClientTimeout(total=300)
-                ) as response:
-                    if response.status == 429:
-                        retry_attempts += 1
-                        if retry_attempts < max_retries:
-                            retry_after = int(response.headers.get("Retry-After", "60"))
-                            jitter = random.uniform(0, 0.2) * retry_after
-                            wait_time = retry_after + jitter
-                            print(f"[WARNING] --> Rate limited by Defender API. Retrying chunk {chunk_index} after {wait_time:.2f} seconds...")
-                            await asyncio.sleep(wait_time)
-                            continue
-                        else:
-                            error_text = await response.text()
-                            return {
-                                "folder": destination_folder,
-                                "table": destination_tbl,
-                                "success": False,
-                                "chunk_id": chunk_index,
-                                "records_count": 0,
-                                "records_processed": 0,
-                                "low_watermark": None,
-                                "high_watermark": None,
-                                "error": f"Rate limited by Defender API: {response.status} - {error_text}",
-                            }
-                    elif response.status != 200:
-                        error_text = await response.text()
-                        return {
-                            "folder": destination_folder,
-                            "table": destination_tbl,
-                            "success": False,
-                            "chunk_id": chunk_index,
-                            "records_count": 0,
-                            "records_processed": 0,
-                            "low_watermark": None,
-                            "high_watermark": None,
-                            "error": f"API call failed: {response.status} - {error_text}",
-                        }
-                
-                    apijson = await response.json()
-                    records = apijson.get("Results", [])
-                    
-                    if not records:
-                        return {
-                            "folder": destination_folder,
-                            "table": destination_tbl,
-                            "success": True,
-                            "chunk_id": chunk_index,
-                            "records_count": 0,
-                            "records_processed": 0,
-                            "low_watermark": None,
-                            "high_watermark": None,
-                            "error": None
-                        }
-                    
-                    chunk_result = await self.ingest_to_adx(records, chunk_index, destination_folder, destination_tbl, watermark_column)
-                    
-                    if not chunk_result["success"]:
-                        print(f"[ERROR] --> Chunk ingestion failed for {source_tbl} chunk {chunk_index}/{total_chunks}: {chunk_result['error']}")
-                    else:
-                        print(f"[INFO] --> Successfully processed {source_tbl} chunk {chunk_index}/{total_chunks} - {len(records):,} records")
+            status, apijson, error = await self.call_hunting_api(
+                session, chunked_query, aiohttp.ClientTimeout(total=300), raw=self.passthrough_responses
+            )
+            if error:
+                return [], self.build_chunk_result(table_config, chunk_index, False, error, chunk_range)
+
+            if self.passthrough_responses:
+                return apijson, None
 
-                    return chunk_result
+            records = apijson.get("Results", [])
+            self.telemetry.increment("rows_fetched", len(records))
+            
+            if not records:
+                return [], self.build_chunk_result(table_config, chunk_index, True)
+            
+            return records, None
                 
         except Exception as e:
-            print(f"[ERROR] --> Error processing chunk for {source_tbl} (chunk {chunk_index}): {str(e)}")
+            log.error(f"Error processing chunk for {source_tbl} (chunk {chunk_index}): {str(e)}")
             
-            return {
-                "success": False,
-                "chunk_id": chunk_index,
-                "error": str(e),
-                "records_processed": 0
-            }
+            return [], self.build_chunk_result(table_config, chunk_index, False, str(e) or type(e).__name__, chunk_range)
+
+    async def ingest_fetched_chunk(
+        self, 
+        table_config: Dict[str, Any], 
+        records: Any, 
+        chunk_index: int, 
+        total_chunks: int
+    ) -> Dict[str, Any]:
+        source_tbl = table_config["SourceTable"]
+
+        if isinstance(records, dict):
+            chunk_result = await self.ingest_payload_to_adx(
+                records, chunk_index, table_config["DestinationFolder"], table_config["DestinationTable"]
+            )
+        elif isinstance(records, bytes):
+            chunk_result = await self.ingest_raw_to_adx(
+                records, chunk_index, table_config["DestinationFolder"], table_config["DestinationTable"], table_config["WatermarkColumn"]
+            )
+        else:
+            chunk_result = await self.ingest_to_adx(
+                records, chunk_index, table_config["DestinationFolder"], table_config["DestinationTable"], table_config["WatermarkColumn"]
+            )
         
-    async def process_multiple_chunks_parallel(
+        if chunk_result.get("source_id"):
+            self.status_tracker.track(chunk_result["source_id"])
+
+        if not chunk_result["success"]:
+            log.error(f"Chunk ingestion failed for {source_tbl} chunk {chunk_index}/{total_chunks}: {chunk_result['error']}")
+        else:
+            log.debug("Successfully processed %s chunk %d/%d - %d records", source_tbl, chunk_index, total_chunks, chunk_result["records_count"])
+
+        return chunk_result
+
+    async def process_single_chunk(
         self, 
         session: aiohttp.ClientSession, 
         table_config: Dict[str, Any], 
         base_query: str, 
-        num_chunks: int
-    ) -> List[Dict[str, Any]]:
-        # Group chunks into batches for thread pool processing
-        batch_size = min(self.max_thread_workers, num_chunks)
-        chunk_batches = [
-            list(range(i, min(i + batch_size, num_chunks+1))) 
-            for i in range(1, num_chunks+1, batch_size)
-        ]
+        chunk_index: int, 
+        total_chunks: int,
+        disable_chunking: bool = False,
+        chunk_range: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        records, finished_result = await self.fetch_chunk(
+            session, table_config, base_query, chunk_index, total_chunks, disable_chunking, chunk_range
+        )
+        if finished_result:
+            return finished_result
 
-        processed_results = []
-        
-        for batch_indices in chunk_batches:
-            # Process batch of chunks concurrently
-            batch_tasks = [
-                self.process_single_chunk(session, table_config, base_query, chunk_index, num_chunks)
-                for chunk_index in batch_indices
-            ]
-            
-            chunk_results  = await asyncio.gather(*batch_tasks, return_exceptions=True)
-            processed_results.extend(chunk_results)
-            
-            # Small delay between batches to prevent overwhelming the system
-            if len(chunk_batches) > 1:
-                await asyncio.sleep(1)
+        return await self.ingest_fetched_chunk(table_config, records, chunk_index, total_chunks)
         
-        return processed_results
+    async def find_split_point(self, session: aiohttp.ClientSession, item: Dict[str, Any]) -> Any:
+        # None bisects by time, which costs no Defender call; the Reprocessor bisects on count.
+        return None
 
-    
-    async def process_single_table(self, session: aiohttp.ClientSession, table_config: Dict[str, Any]) -> Dict[str, Any]:
-        print("-"*100)
+    async def split_work_item(self, session: aiohttp.ClientSession, item: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        if not item["chunk_range"] or item.get("split_depth", 0) >= self.bootstrap.get("adaptive_max_split_depth", 4):
+            return None
+
+        sub_ranges = split_chunk_range(item["chunk_range"], await self.find_split_point(session, item))
+        if not sub_ranges:
+            return None
+
+        return [
+            dict(
+                item,
+                chunk_range=sub_range,
+                records_count=sub_range["records_count"],
+                split_path=item.get("split_path", ()) + (i,),
+                split_depth=item.get("split_depth", 0) + 1
+            )
+            for i, sub_range in enumerate(sub_ranges)
+        ]
+
+    async def confirm_chunk_results(self, chunk_results: List[Any]) -> None:
+        # Waits for the ADX status of every queued chunk and turns ingestions that failed inside
+        # ADX, or never reported back, into failed chunks so their watermarks are not committed.
+        pending = [r for r in chunk_results if isinstance(r, dict) and r.get("success") and r.get("source_id") and not r.get("confirmed")]
+        if not pending or not self.status_tracker:
+            return
+
+        timeout = self.bootstrap.get("ingestion_status_timeout", 600)
+        log.info(f"Waiting for ADX to confirm {len(pending)} queued ingestions...")
+        outcomes = await self.status_tracker.wait([r["source_id"] for r in pending], timeout)
+
+        failed = 0
+        for r in pending:
+            outcome = outcomes.get(r["source_id"])
+            if outcome and outcome[0]:
+                r["confirmed"] = True
+                continue
+
+            failed += 1
+            r["success"] = False
+            r["records_processed"] = 0
+            if outcome:
+                message = outcome[1]
+                r["error"] = f"Ingestion failed in ADX: {message.ErrorCode} {message.FailureStatus} {str(message.Details)[:400]}"
+            else:
+                r["error"] = f"Ingestion status not confirmed within {timeout} seconds"
+            log.error(f"Chunk {r['chunk_id']} of {r['table']} was not confirmed: {r['error']}")
+
+        log.info(f"Confirmed {len(pending) - failed} of {len(pending)} queued ingestions")
+
+    def observe_chunk(self, result_key: Tuple[str, int, Tuple[int, ...]], started: float) -> None:
+        # Time from the start of a chunk's fetch until its result is known (stored, split or coalesced).
+        self.telemetry.observe("chunk_seconds", time.perf_counter() - started)
+
+    async def run_chunk_pipeline(self, session: aiohttp.ClientSession, scheduler: ChunkScheduler, checkpointer: Optional[WatermarkCheckpointer] = None) -> Dict[Tuple[str, int, Tuple[int, ...]], Any]:
+        # Fetchers pull chunks of every table from the scheduler, keeping at most fetch_concurrency
+        # Defender calls in flight for the whole run, and hand records to a separate pool of ingest
+        # workers through a bounded queue, so a slow chunk never stalls the others.
+        fetch_concurrency = min(self.bootstrap.get("fetch_concurrency", self.max_thread_workers), max(len(scheduler), 1))
+        ingest_concurrency = self.bootstrap.get("ingest_concurrency", self.max_thread_workers)
+        queue_size = self.bootstrap.get("ingest_queue_size", ingest_concurrency * 2)
+
+        fetched_chunks = asyncio.Queue(maxsize=queue_size)
+        results = {}
+        coalesced = {}
+
+        def store_result(result_key, result):
+            results[result_key] = result
+            if checkpointer:
+                checkpointer.record(result_key, result)
+
+        # Fetches in flight may split and requeue their chunk, so idle fetchers wait for them
+        # instead of exiting while work can still appear.
+        work_available = asyncio.Condition()
+        fetches_in_flight = 0
+
+        async def next_work_item():
+            nonlocal fetches_in_flight
+            async with work_available:
+                while True:
+                    item = scheduler.next_chunk()
+                    if item is not None:
+                        fetches_in_flight += 1
+                        return item
+                    if fetches_in_flight == 0:
+                        return None
+                    await work_available.wait()
+
+        async def finish_work_item(sub_items: Optional[List[Dict[str, Any]]] = None):
+            nonlocal fetches_in_flight
+            async with work_available:
+                if sub_items:
+                    scheduler.requeue(sub_items[0]["table_config"]["DestinationTable"], sub_items)
+                    if checkpointer:
+                        checkpointer.split(
+                            sub_items[0]["table_config"]["DestinationTable"],
+                            sub_items[0]["chunk_index"],
+                            sub_items[0]["split_path"][:-1],
+                            [sub_item["split_path"] for sub_item in sub_items]
+                        )
+                fetches_in_flight -= 1
+                work_available.notify_all()
+
+        async def fetch_worker():
+            while True:
+                item = await next_work_item()
+                if item is None:
+                    return
+
+                table_key = item["table_config"]["DestinationTable"]
+                result_key = (table_key, item["chunk_index"], item.get("split_path", ()))
+
+                # Chunks planned before the controller shrank this table's size are split up front.
+                if self.adaptive_chunking and item["records_count"] > self.chunk_sizer.current_size(table_key):
+                    sub_items = await self.split_work_item(session, item)
+                    if sub_items:
+                        await finish_work_item(sub_items)
+                        continue
+
+                # The response and its decoded records count against the memory budget until the
+                # chunk is compressed, so the budget bounds the fetches in flight.
+                fetch_reservation = 0
+                if self.memory_budget:
+                    fetch_reservation = (item["records_count"] or item["chunk_size"] or self.chunk_size) * self.spill_row_bytes
+                    await self.memory_budget.admit_fetch(fetch_reservation)
+
+                started = time.perf_counter()
+                try:
+                    records, finished_result = await self.fetch_chunk(
+                        session,
+                        item["table_config"],
+                        item["base_query"],
+                        item["chunk_index"],
+                        item["total_chunks"],
+                        item["disable_chunking"],
+                        item["chunk_range"],
+                        item["chunk_size"]
+                    )
+                except BaseException:
+                    if fetch_reservation:
+                        self.memory_budget.release_fetch(fetch_reservation)
+                    raise
+
+                sub_items = None
+                if finished_result and not finished_result["success"] and self.adaptive_chunking and is_splittable_error(finished_result["error"]):
+                    self.chunk_sizer.record_failure(table_key, item["records_count"])
+                    sub_items = await self.split_work_item(session, item)
+                    if sub_items:
+                        log.warning(f"Splitting {item['table_config']['SourceTable']} chunk {item['chunk_index']} into {len(sub_items)} sub-ranges: {finished_result['error'][:200]}")
+                elif not finished_result:
+                    # Passthrough responses are not decoded here, so the planned count stands in for the row count.
+                    self.chunk_sizer.record_success(table_key, item["records_count"] if isinstance(records, bytes) else len(records))
+
+                # Coalesced chunks are compressed straight into their table's batch by the ingest workers.
+                if not finished_result and self.memory_budget and not self.coalescer:
+                    try:
+                        records = await self.prepare_payload(records, item["table_config"]["WatermarkColumn"])
+                    except Exception as e:
+                        log.error(f"Serialization failed for {item['table_config']['SourceTable']} chunk {item['chunk_index']}: {str(e)}")
+                        finished_result = self.build_chunk_result(item["table_config"], item["chunk_index"], False, f"Serialization failed: {str(e)[:500]}", item["chunk_range"])
+                    # The compressed payload holds its own share of the budget from here on.
+                    self.memory_budget.release_fetch(fetch_reservation)
+                    fetch_reservation = 0
+                elif finished_result and fetch_reservation:
+                    self.memory_budget.release_fetch(fetch_reservation)
+                    fetch_reservation = 0
+
+                if finished_result:
+                    self.observe_chunk(result_key, started)
+                if finished_result and not sub_items:
+                    store_result(result_key, finished_result)
+                elif not finished_result:
+                    self.telemetry.observe("ingest_queue_depth", fetched_chunks.qsize())
+                    # Coalesced chunks keep their reservation until an ingest worker has compressed them.
+                    await fetched_chunks.put((result_key, item, records, fetch_reservation, started))
+
+                await finish_work_item(sub_items)
+
+        async def ingest_worker():
+            while True:
+                queued = await fetched_chunks.get()
+                if queued is None:
+                    return
+
+                result_key, item, records, fetch_reservation, started = queued
+                try:
+                    if self.coalescer:
+                        coalesced[result_key] = await self.coalescer.add(item["table_config"], records, item["chunk_index"])
+                        coalesced[result_key].add_done_callback(lambda future, key=result_key, started=started: self.observe_chunk(key, started))
+                        # The coalescer slices passthrough responses itself, so their rows are counted once the chunk resolves.
+                        if isinstance(records, bytes):
+                            coalesced[result_key].add_done_callback(
+                                lambda future: self.telemetry.increment("rows_fetched", future.result()["records_count"]) if not future.exception() else None
+                            )
+                        # Batches are confirmed in the background like single chunks, so checkpoints need not wait for the final wait.
+                        if self.status_tracker:
+                            coalesced[result_key].add_done_callback(
+                                lambda future: self.status_tracker.track(future.result()["source_id"]) if not future.exception() and future.result().get("source_id") else None
+                            )
+                        if checkpointer:
+                            coalesced[result_key].add_done_callback(
+                                lambda future, key=result_key: checkpointer.record(key, future.result()) if not future.exception() else None
+                            )
+                    else:
+                        store_result(result_key, await self.ingest_fetched_chunk(
+                            item["table_config"], records, item["chunk_index"], item["total_chunks"]
+                        ))
+                        self.observe_chunk(result_key, started)
+                except Exception as e:
+                    store_result(result_key, e)
+                    self.observe_chunk(result_key, started)
+                finally:
+                    if fetch_reservation:
+                        self.memory_budget.release_fetch(fetch_reservation)
+
+        self.telemetry.start_loop_monitor()
+        ingesters = [asyncio.create_task(ingest_worker()) for _ in range(ingest_concurrency)]
+        try:
+            await asyncio.gather(*[fetch_worker() for _ in range(fetch_concurrency)])
+        finally:
+            for _ in ingesters:
+                await fetched_chunks.put(None)
+            await asyncio.gather(*ingesters)
+            if self.coalescer:
+                await self.coalescer.close()
+            await self.telemetry.stop_loop_monitor()
+
+        for result_key, chunk_future in coalesced.items():
+            results[result_key] = chunk_future.result() if not chunk_future.exception() else chunk_future.exception()
+
+        # Statuses were polled in the background while the pipeline ran; this only waits for the tail.
+        await self.confirm_chunk_results(list(results.values()))
+
+        return results
+
+    def get_table_weight(self, table_config: Dict[str, Any]) -> float:
+        try:
+            weight = float(table_config.get("Weight") or 1.0)
+        except (TypeError, ValueError):
+            weight = 1.0
+        return weight if weight > 0 else 1.0
+
+    async def plan_single_table(self, session: aiohttp.ClientSession, table_config: Dict[str, Any]) -> Dict[str, Any]:
         async with self.semaphore:
             source_tbl = table_config["SourceTable"]
             destination_folder = table_config["DestinationFolder"]
@@ -671,24 +1235,33 @@ class Ingestor:
             load_type = table_config['LoadType']
             watermark_column = table_config["WatermarkColumn"]
             high_watermark = table_config["HighWatermark"]
+            checkpoint_watermark = table_config.get("CheckpointWatermark")
             
             try:
-                print(f"[INFO] --> Starting processing for table: {source_tbl}")
+                log.info(f"Planning table: {source_tbl}")
                 
                 # Build base query
                 base_query = self.build_base_kql_query(
                     source_tbl, 
                     load_type, 
                     watermark_column,
-                    high_watermark
+                    high_watermark,
+                    checkpoint_watermark
                 )
                 
-                print(f"[INFO] --> Base query for {source_tbl}: {base_query}")
+                if checkpoint_watermark:
+                    log.info(f"Resuming {source_tbl} from checkpoint {checkpoint_watermark}")
+                log.debug("Base query for %s: %s", source_tbl, base_query)
                 
-                total_records, num_chunks = await self.calculate_chunks(session, base_query)
+                if self.adaptive_chunking:
+                    table_chunk_size = self.chunk_sizer.initial_size(destination_tbl, table_config.get("ChunkSize"))
+                else:
+                    table_chunk_size = self.chunk_size
+
+                total_records, num_chunks, chunk_ranges = await self.calculate_chunks(session, base_query, watermark_column, destination_tbl, table_chunk_size)
                 
                 if total_records == 0:
-                    print(f"[INFO] --> No records found for {source_tbl}")
+                    log.info(f"No records found for {source_tbl}")
                     return {
                         "folder": destination_folder,
                         "table": destination_tbl,
@@ -701,60 +1274,43 @@ class Ingestor:
                         "error": None
                     }
 
-                needs_chunking = total_records > self.chunk_size
+                needs_chunking = num_chunks > 1
                 
                 if not needs_chunking:
-                    print(f"[INFO] --> {source_tbl} has {total_records:,} records - processing without chunking")
-                    
-                    result = await self.process_single_chunk(session, table_config, base_query, 1, num_chunks, True)
-                    
-                    return {
-                        "folder": destination_folder,
-                        "table": result["table"],
-                        "success": result["success"],
-                        "records_processed": result["records_processed"],
-                        "chunks_processed": 1 if result["success"] else 0,
-                        "chunks_failed": 0 if result["success"] else 1,
-                        "chunked": False,
-                        "chunk_results": [result],
-                        "error": result.get("error", None)
-                    }
+                    log.info(f"{source_tbl} has {total_records:,} records - processing without chunking")
                 else:
-                    print(f"[INFO] --> {source_tbl} has {total_records:,} records - processing with {num_chunks} chunks")
-                    
-                    chunk_results = await self.process_multiple_chunks_parallel(
-                        session, table_config, base_query, num_chunks
-                    )
-                    
-                    successful_chunks = sum(1 for r in chunk_results if isinstance(r, dict) and r.get("success"))
-                    failed_chunks = num_chunks - successful_chunks
-                    total_records_processed = sum(
-                        r.get("records_processed", 0) 
-                        for r in chunk_results 
-                        if isinstance(r, dict)
-                    )
-                    
-                    # Collect errors
-                    errors = [
-                        r.get("error", str(r)) 
-                        for r in chunk_results 
-                        if isinstance(r, dict) and not r.get("success") or isinstance(r, Exception)
-                    ]
-                    
-                    return {
-                        "folder": destination_folder,
-                        "table": destination_tbl,
-                        "success": failed_chunks == 0,
-                        "records_processed": total_records_processed,
-                        "chunks_processed": successful_chunks,
-                        "chunks_failed": failed_chunks,
-                        "chunked": True,
-                        "chunk_results": chunk_results,
-                        "error": errors if errors else None
-                    }
+                    log.info(f"{source_tbl} has {total_records:,} records - processing with {num_chunks} chunks")
+
+                work_items = []
+                for chunk_index in range(1, num_chunks + 1):
+                    # A table planned as one chunk keeps its range too, so it can still be split and recorded.
+                    chunk_range = chunk_ranges[chunk_index-1] if chunk_ranges else None
+                    if chunk_range:
+                        records_count = chunk_range["records_count"]
+                    else:
+                        records_count = min(table_chunk_size, total_records - (chunk_index-1) * table_chunk_size)
+
+                    work_items.append({
+                        "table_config": table_config,
+                        "base_query": base_query,
+                        "chunk_index": chunk_index,
+                        "total_chunks": num_chunks,
+                        "disable_chunking": not needs_chunking and not chunk_range,
+                        "chunk_range": chunk_range,
+                        "chunk_size": table_chunk_size,
+                        "records_count": records_count
+                    })
+
+                return {
+                    "table_config": table_config,
+                    "total_records": total_records,
+                    "num_chunks": num_chunks,
+                    "chunked": needs_chunking,
+                    "work_items": work_items
+                }
                     
             except Exception as e:
-                print(f"[ERROR] --> Error processing table {source_tbl}: {str(e)}")
+                log.error(f"Error processing table {source_tbl}: {str(e)}")
                 return {
                     "folder": destination_folder,
                     "table": destination_tbl,
@@ -765,51 +1321,168 @@ class Ingestor:
                     "chunked": False,
                     "error": str(e)
                 }
-                
-    async def process_all_tables(self, table_configs: List[Dict[str, Any]]) -> Dict[str, Any]:        
-        print(f"[INFO] --> Chunk size: {self.chunk_size:,} records")
-        print(f"[INFO] --> Max concurrent tasks: {self.max_concurrent_tasks}")
-        print(f"[INFO] --> Max thread workers: {self.max_thread_workers}")
 
-        start_time = time.time()
+    def build_table_result(self, table_plan: Dict[str, Any], chunk_results: Dict[Tuple[str, int, Tuple[int, ...]], Any]) -> Dict[str, Any]:
+        table_config = table_plan["table_config"]
+        destination_tbl = table_config["DestinationTable"]
+        num_chunks = table_plan["num_chunks"]
 
-        for config in table_configs:
-            if not config["HighWatermark"]:
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(
-                    self.thread_pool,
-                    self.ensure_table_exists,
-                    config["DestinationFolder"],
-                    config["DestinationTable"],
-                    config["WatermarkColumn"]
-                )
+        # A chunk that was split has one result per sub-range; sorting by split path keeps them in watermark order.
+        table_chunk_results = []
+        for chunk_index in range(1, num_chunks + 1):
+            split_paths = sorted(key[2] for key in chunk_results if key[0] == destination_tbl and key[1] == chunk_index)
+            if not split_paths:
+                table_chunk_results.append(Exception(f"Chunk {chunk_index} was not processed"))
+            for split_path in split_paths:
+                table_chunk_results.append(chunk_results[(destination_tbl, chunk_index, split_path)])
+
+        # An unchunked table that was split is summed up like a chunked one.
+        if not table_plan["chunked"] and len(table_chunk_results) == 1:
+            result = table_chunk_results[0]
+            if isinstance(result, Exception):
+                result = {"success": False, "chunk_id": 1, "error": str(result), "records_processed": 0}
+
+            return {
+                "folder": table_config["DestinationFolder"],
+                "table": destination_tbl,
+                "success": result["success"],
+                "records_processed": result["records_processed"],
+                "chunks_processed": 1 if result["success"] else 0,
+                "chunks_failed": 0 if result["success"] else 1,
+                "chunked": False,
+                "chunk_results": [result],
+                "error": result.get("error", None)
+            }
+
+        successful_chunks = sum(1 for r in table_chunk_results if isinstance(r, dict) and r.get("success"))
+        failed_chunks = len(table_chunk_results) - successful_chunks
+        total_records_processed = sum(
+            r.get("records_processed", 0) 
+            for r in table_chunk_results 
+            if isinstance(r, dict)
+        )
         
-        timeout = aiohttp.ClientTimeout(total=900)  # 15 minutes timeout
-        connector = aiohttp.TCPConnector(limit=50, limit_per_host=10)  # Connection pooling
+        # Collect errors
+        errors = [
+            r.get("error", str(r)) if isinstance(r, dict) else str(r)
+            for r in table_chunk_results 
+            if isinstance(r, dict) and not r.get("success") or isinstance(r, Exception)
+        ]
         
-        print(f"[INFO] --> Starting concurrent processing of {len(table_configs)} tables")
+        return {
+            "folder": table_config["DestinationFolder"],
+            "table": destination_tbl,
+            "success": failed_chunks == 0,
+            "records_processed": total_records_processed,
+            "chunks_processed": successful_chunks,
+            "chunks_failed": failed_chunks,
+            "chunked": table_plan["chunked"],
+            "chunk_results": table_chunk_results,
+            "error": errors if errors else None
+        }
 
-        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-            tasks = [self.process_single_table(session, config) for config in table_configs]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        end_time = time.time()
-        execution_time = end_time - start_time
+    async def plan_tables(self, session: aiohttp.ClientSession, table_configs: List[Dict[str, Any]]) -> List[Any]:
+        await asyncio.gather(*[
+            self.ensure_table_exists(config["DestinationFolder"], config["DestinationTable"], config["WatermarkColumn"])
+            for config in table_configs
+            if not config["HighWatermark"]
+        ])
+
+        tasks = [self.plan_single_table(session, config) for config in table_configs]
+        with self.telemetry.stage("plan"):
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def process_table_plans(self, session: aiohttp.ClientSession, table_plans: List[Any], checkpoint: bool = True) -> Dict[Tuple[str, int, Tuple[int, ...]], Any]:
+        # Runs the chunks of every planned table through one scheduler and pipeline. The plans may
+        # hold only part of a table's chunks (one fan-out activity), in which case checkpointing is
+        # left off: a partial view of a table cannot tell which leading chunks have all succeeded.
+        checkpoint_interval = self.bootstrap.get("checkpoint_interval", 60) if checkpoint else 0
+        checkpointer = WatermarkCheckpointer(self.meta_insert_checkpoints, self.is_chunk_durable, checkpoint_interval) if checkpoint_interval else None
+
+        scheduler = ChunkScheduler()
+        for table_plan in table_plans:
+            if isinstance(table_plan, dict) and table_plan.get("work_items"):
+                scheduler.add_table(
+                    table_plan["table_config"]["DestinationTable"],
+                    table_plan["work_items"],
+                    self.get_table_weight(table_plan["table_config"])
+                )
+                if checkpointer:
+                    checkpointer.add_table(table_plan["table_config"], table_plan["work_items"])
+
+        log.info(f"Scheduling {len(scheduler)} chunks across {len(table_plans)} tables")
+        if checkpointer:
+            checkpointer.start()
+        try:
+            return await self.run_chunk_pipeline(session, scheduler, checkpointer)
+        finally:
+            if checkpointer:
+                await checkpointer.close()
+
+    async def commit_results(
+        self,
+        table_configs: List[Dict[str, Any]],
+        table_plans: List[Any],
+        chunk_results: Dict[Tuple[str, int, Tuple[int, ...]], Any],
+        execution_time: float,
+        api_usage: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        results = [
+            self.build_table_result(table_plan, chunk_results)
+            if isinstance(table_plan, dict) and table_plan.get("work_items") else table_plan
+            for table_plan in table_plans
+        ]
 
-        self.meta_insert_configs(results, table_configs)
+        await self.meta_insert_configs(results, table_configs)
 
-        self.meta_insert_audits(
+        await self.meta_insert_audits(
             self.bootstrap["ingestion_id"],
             self.bootstrap["ingestion_start_time"],
             results
         )
 
-        self.meta_insert_chunk_failures(
+        await self.meta_insert_chunk_failures(
             self.bootstrap["ingestion_id"],
             self.bootstrap["ingestion_start_time"],
             results
         )
 
         summary = self.analyze_results(table_configs, results, execution_time)
+        summary["api_usage"] = api_usage
+        log.info(f"Defender API calls: {summary['api_usage']['calls']}, throttled: {summary['api_usage']['throttled']}")
+        if self.memory_budget:
+            summary["memory_budget"] = self.memory_budget.usage()
+            log.info(f"Chunk memory peak: {summary['memory_budget']['peak_bytes'] / 1024 / 1024:.1f} MB, spilled chunks: {summary['memory_budget']['spilled_chunks']}")
         
-        return summary
\ No newline at end of file
+        return summary
+
+    def log_stage_timings(self, report: Dict[str, Any]) -> None:
+        for name, histogram in report["histograms"].items():
+            if name.endswith("_seconds"):
+                log.info(f"{name[:-len('_seconds')]}: {histogram['count']} x, {histogram['sum']:.2f} s total, p50 <= {histogram['p50'] * 1000:g} ms, p99 <= {histogram['p99'] * 1000:g} ms")
+
+    async def process_all_tables(self, table_configs: List[Dict[str, Any]], session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
+        session = session or self.transport.get_session()
+
+        log.info(f"Chunk size: {self.chunk_size:,} records")
+        log.info(f"Chunking mode: {self.chunking_mode}")
+        log.info(f"Max concurrent tasks: {self.max_concurrent_tasks}")
+        log.info(f"Max thread workers: {self.max_thread_workers}")
+
+        start_time = time.time()
+        api_usage_start = self.rate_limiter.usage()
+        http_usage_start = self.transport.usage()
+        telemetry_start = self.telemetry.snapshot()
+
+        log.info(f"Starting concurrent processing of {len(table_configs)} tables")
+
+        table_plans = await self.plan_tables(session, table_configs)
+        chunk_results = await self.process_table_plans(session, table_plans)
+
+        execution_time = time.time() - start_time
+        summary = await self.commit_results(table_configs, table_plans, chunk_results, execution_time, self.rate_limiter.usage(api_usage_start))
+        summary["http_usage"] = self.transport.usage(http_usage_start)
+        log.info(f"HTTP requests: {summary['http_usage']['requests']}, new connections: {summary['http_usage']['connections_created']}, reused: {summary['http_usage']['connections_reused']}")
+        summary["telemetry"] = self.telemetry.report(telemetry_start)
+        self.log_stage_timings(summary["telemetry"])
+        return summary
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from azure.kusto.ingest.status import KustoIngestStatusQueues
+from azure.storage.queue import QueueServiceClient, TextBase64DecodePolicy
+
+from src.core.telemetry import log
+
+
+class IngestionStatusTracker:
+    # Resolves queued ingestions by source id from the ADX status queues. Ingestions are tracked
+    # as soon as they are queued and one background task reads both queues in batches, so callers
+    # only wait for whatever is still unconfirmed when they need the outcome.
+    #
+    # The status queues belong to the cluster, so other trackers (another process, activity or
+    # deployment) read the same messages. Messages are received with a visibility timeout and only
+    # those for ingestions tracked here are deleted; the rest become visible again for their owner.
+
+    def __init__(self, ingest_client, poll_interval: float = 15.0, batch_size: int = 32):
+        self.status_queues = KustoIngestStatusQueues(ingest_client)
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.futures = {}
+        self.poller = None
+
+    def track(self, source_id: str) -> asyncio.Future:
+        source_id = source_id.lower()
+        loop = asyncio.get_running_loop()
+        if source_id not in self.futures:
+            self.futures[source_id] = loop.create_future()
+
+        # A poller left behind by an earlier event loop can never run again.
+        if self.poller is None or self.poller.done() or self.poller.get_loop() is not loop:
+            self.poller = asyncio.create_task(self._poll())
+        return self.futures[source_id]
+
+    def outcome(self, source_id: str) -> Optional[Tuple[bool, Any]]:
+        # The status received so far, without waiting; None while the ingestion is unresolved.
+        future = self.futures.get(source_id.lower())
+        return future.result() if future is not None and future.done() else None
+
+    def _receive_batch(self) -> Tuple[List[Tuple[str, bool, Any]], bool]:
+        # Returns the statuses of tracked ingestions, and whether any queue had a full batch waiting.
+        visibility_timeout = max(int(self.poll_interval), 1)
+        received = []
+        more = False
+        for succeeded, status_queue in ((True, self.status_queues.success), (False, self.status_queues.failure)):
+            for resource in status_queue.get_queues_func():
+                queue = QueueServiceClient(resource.account_uri).get_queue_client(
+                    queue=resource.object_name, message_decode_policy=TextBase64DecodePolicy()
+                )
+                messages = list(queue.receive_messages(
+                    messages_per_page=self.batch_size, max_messages=self.batch_size, visibility_timeout=visibility_timeout
+                ))
+                more = more or len(messages) >= self.batch_size
+                for message in messages:
+                    status = status_queue.message_cls(message.content)
+                    source_id = str(status.IngestionSourceId).lower()
+                    if source_id in self.futures:
+                        received.append((source_id, succeeded, status))
+                        queue.delete_message(message)
+        return received, more
+
+    async def _poll(self) -> None:
+        loop = asyncio.get_running_loop()
+        while any(not f.done() for f in self.futures.values()):
+            try:
+                received, more = await loop.run_in_executor(None, self._receive_batch)
+            except Exception as e:
+                log.warning(f"Error reading ingestion status queues: {str(e)}")
+                received, more = [], False
+
+            for source_id, succeeded, status in received:
+                future = self.futures.get(source_id)
+                if future is not None and not future.done():
+                    future.set_result((succeeded, status))
+
+            if not more:
+                await asyncio.sleep(self.poll_interval)
+
+    async def wait(self, source_ids: List[str], timeout: float) -> Dict[str, Optional[Tuple[bool, Any]]]:
+        # Returns (succeeded, status message) per source id, or None if no status arrived in time.
+        futures = {source_id: self.track(source_id) for source_id in source_ids}
+        if futures:
+            await asyncio.wait(list(futures.values()), timeout=timeout)
+
+        outcomes = {}
+        for source_id, future in futures.items():
+            outcomes[source_id] = future.result() if future.done() else None
+            self.futures.pop(source_id.lower(), None)
+        return outcomes
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_status_tracker(ingest_client, bootstrap: Dict[str, Any]) -> IngestionStatusTracker:
+    # One tracker per ingest endpoint, shared by every engine in the process, so concurrent
+    # pipelines do not read each other's confirmations off the queues.
+    with _trackers_lock:
+        if bootstrap["adx_ingest_uri"] not in _trackers:
+            _trackers[bootstrap["adx_ingest_uri"]] = IngestionStatusTracker(
+                ingest_client,
+                bootstrap.get("ingestion_status_poll_interval", 15),
+                bootstrap.get("ingestion_status_batch_size", 32)
+            )
+        return _trackers[bootstrap["adx_ingest_uri"]]
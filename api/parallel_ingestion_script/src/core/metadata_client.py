@@ -0,0 +1,30 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from azure.kusto.data import KustoClient
+
+from src.core.telemetry import Telemetry
+
+
+class AsyncMetadataClient:
+    # Runs ADX control-plane queries and commands on a small executor of their own, so a slow
+    # metadata call neither blocks the event loop nor takes an ingest worker's thread.
+
+    def __init__(self, client: KustoClient, max_workers: int = 2, telemetry: Optional[Telemetry] = None):
+        self.client = client
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata")
+
+    async def execute(self, database: str, query: str) -> Any:
+        loop = asyncio.get_running_loop()
+        with self.telemetry.stage("metadata_query"):
+            return await loop.run_in_executor(self.executor, self.client.execute, database, query)
+
+    async def execute_mgmt(self, database: str, command: str) -> Any:
+        loop = asyncio.get_running_loop()
+        with self.telemetry.stage("metadata_command"):
+            return await loop.run_in_executor(self.executor, self.client.execute_mgmt, database, command)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,183 @@
+import gzip
+import json
+import math
+import asyncio
+from io import BytesIO
+from typing import List, Dict, Any, Optional, Tuple
+
+from azure.kusto.data.data_format import DataFormat
+from azure.kusto.ingest import QueuedIngestClient, IngestionProperties, StreamDescriptor
+
+from src.core.chunk_planner import parse_watermark, format_watermark
+from src.core.metadata_client import AsyncMetadataClient
+from src.core.telemetry import log
+
+CONFIG_SCHEMA = [
+    ("SourceTable", "string"),
+    ("DestinationFolder", "string"),
+    ("DestinationTable", "string"),
+    ("WatermarkColumn", "string"),
+    ("LastRefreshedTime", "datetime"),
+    ("HighWatermark", "datetime"),
+    ("LoadType", "string"),
+    ("IsActive", "bool"),
+    ("Weight", "real"),
+    ("ChunkSize", "long"),
+    ("CheckpointWatermark", "datetime")
+]
+
+AUDIT_SCHEMA = [
+    ("ingestion_id", "string"),
+    ("ingestion_timestamp", "datetime"),
+    ("folder", "string"),
+    ("table", "string"),
+    ("success", "bool"),
+    ("records_processed", "long"),
+    ("chunked", "bool"),
+    ("chunks_processed", "int"),
+    ("chunks_failed", "int"),
+    ("chunk_results", "dynamic"),
+    ("error", "string")
+]
+
+CHUNK_AUDIT_SCHEMA = [
+    ("ingestion_id", "string"),
+    ("ingestion_timestamp", "datetime"),
+    ("folder", "string"),
+    ("table", "string"),
+    ("chunk_id", "int"),
+    ("success", "bool"),
+    ("records_count", "int"),
+    ("records_processed", "int"),
+    ("low_watermark", "datetime"),
+    ("high_watermark", "datetime"),
+    ("error", "string"),
+    ("reprocess_success", "bool")
+]
+
+STRING_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+def kql_string(value: Any) -> str:
+    # Double-quoted KQL literal; other control characters have no portable escape and become spaces.
+    text = "" if value is None else str(value)
+    escaped = "".join(STRING_ESCAPES.get(c, c if c >= " " else " ") for c in text)
+    return f'"{escaped}"'
+
+
+def normalize_value(value: Any, kusto_type: str) -> Any:
+    # Coerces a Python value to what the column holds; None (or an empty datetime) stays None.
+    if kusto_type == "dynamic":
+        return value
+    if value is None or (kusto_type == "datetime" and value in ("", "null")):
+        return None
+    if kusto_type == "string":
+        return str(value)
+    if kusto_type == "datetime":
+        # Validated strings are kept as they are; Python datetimes would drop the 7th fractional
+        # digit Defender and ADX watermarks carry.
+        if isinstance(value, str):
+            parse_watermark(value)
+            return value.strip()
+        return format_watermark(parse_watermark(value))
+    if kusto_type == "bool":
+        return value.lower() == "true" if isinstance(value, str) else bool(value)
+    if kusto_type in ("int", "long"):
+        return int(value)
+    if kusto_type == "real":
+        value = float(value)
+        return None if math.isnan(value) or math.isinf(value) else value
+    raise ValueError(f"Unsupported metadata column type: {kusto_type}")
+
+
+def kql_literal(value: Any, kusto_type: str) -> str:
+    value = normalize_value(value, kusto_type)
+    if kusto_type == "dynamic":
+        # Dynamic values travel as JSON strings and are parsed back in the command.
+        return kql_string(json.dumps(value, default=str))
+    if kusto_type == "string":
+        return kql_string(value)
+    if value is None:
+        return f"{kusto_type}(null)"
+    if kusto_type == "bool":
+        return "true" if value else "false"
+    if kusto_type == "datetime":
+        return f"datetime({value})"
+    return f"{kusto_type}({value!r})"
+
+
+class MetadataWriter:
+    # Writes metadata rows (configs, audits, chunk failures, reprocess outcomes) in bulk: one
+    # .set-or-append per table holding every row, split only when a command would exceed
+    # max_command_rows or max_command_bytes. Values are rendered through typed, escaped literals,
+    # so table names, errors and chunk results cannot break the command. Batches of at least
+    # queued_min_rows rows can instead be queued for ingestion as JSON.
+
+    def __init__(
+        self,
+        metadata_client: AsyncMetadataClient,
+        database: str,
+        ingest_client: Optional[QueuedIngestClient] = None,
+        max_command_rows: int = 1000,
+        max_command_bytes: int = 1024 * 1024,
+        queued_min_rows: Optional[int] = None
+    ):
+        self.metadata_client = metadata_client
+        self.database = database
+        self.ingest_client = ingest_client
+        self.max_command_rows = max_command_rows
+        self.max_command_bytes = max_command_bytes
+        self.queued_min_rows = queued_min_rows
+
+    def build_commands(self, table: str, schema: List[Tuple[str, str]], rows: List[Dict[str, Any]]) -> List[str]:
+        # Dynamic columns are declared as strings in the datatable and parsed in place.
+        columns = ", ".join(f"['{name}']:{'string' if kusto_type == 'dynamic' else kusto_type}" for name, kusto_type in schema)
+        dynamic_columns = [name for name, kusto_type in schema if kusto_type == "dynamic"]
+        suffix = "".join(f"\n| extend ['{name}'] = todynamic(['{name}'])" for name in dynamic_columns)
+        header = f".set-or-append ['{table}'] <|\ndatatable({columns})\n[\n"
+        footer = f"\n]{suffix}"
+
+        commands = []
+        values = []
+        size = len(header) + len(footer)
+        for row in rows:
+            value = ", ".join(kql_literal(row.get(name), kusto_type) for name, kusto_type in schema)
+            if values and (len(values) >= self.max_command_rows or size + len(value) + 2 > self.max_command_bytes):
+                commands.append(header + ",\n".join(values) + footer)
+                values = []
+                size = len(header) + len(footer)
+            values.append(value)
+            size += len(value) + 2
+
+        if values:
+            commands.append(header + ",\n".join(values) + footer)
+        return commands
+
+    def _sync_queue_rows(self, table: str, schema: List[Tuple[str, str]], rows: List[Dict[str, Any]]) -> None:
+        # JSON without a mapping is matched to the table's columns by name.
+        stream = BytesIO()
+        with gzip.GzipFile(fileobj=stream, mode="wb", compresslevel=1) as gz:
+            for row in rows:
+                record = {name: normalize_value(row.get(name), kusto_type) for name, kusto_type in schema}
+                gz.write(json.dumps(record, default=str).encode("utf-8") + b"\n")
+        stream.seek(0)
+
+        ingestion_props = IngestionProperties(database=self.database, table=table, data_format=DataFormat.JSON)
+        self.ingest_client.ingest_from_stream(StreamDescriptor(stream, is_compressed=True), ingestion_properties=ingestion_props)
+
+    async def write(self, table: str, schema: List[Tuple[str, str]], rows: List[Dict[str, Any]], allow_queued: bool = True) -> None:
+        # Queued rows land asynchronously, so rows a later step must read back (configs) pass
+        # allow_queued=False.
+        if not rows:
+            return
+
+        if allow_queued and self.ingest_client is not None and self.queued_min_rows and len(rows) >= self.queued_min_rows:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.metadata_client.executor, self._sync_queue_rows, table, schema, rows)
+            log.info(f"Queued {len(rows):,} metadata rows for {table}")
+            return
+
+        commands = self.build_commands(table, schema, rows)
+        for command in commands:
+            await self.metadata_client.execute_mgmt(self.database, command)
+        log.info(f"Wrote {len(rows):,} metadata rows to {table} in {len(commands)} command(s)")
@@ -0,0 +1,69 @@
+import time
+import asyncio
+from typing import Dict, Any, Optional
+
+
+class HuntingRateLimiter:
+    # Token buckets for the Advanced Hunting per-minute and per-hour call budgets. Every Defender
+    # call acquires a token up front, and a 429 pauses all callers until Retry-After has elapsed.
+
+    def __init__(self, calls_per_minute: int = 45, calls_per_hour: int = 1500):
+        now = time.monotonic()
+        self.buckets = [
+            {"capacity": calls_per_minute, "rate": calls_per_minute / 60, "tokens": float(calls_per_minute), "updated": now},
+            {"capacity": calls_per_hour, "rate": calls_per_hour / 3600, "tokens": float(calls_per_hour), "updated": now},
+        ]
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+        self.calls = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.pause_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        for bucket in self.buckets:
+            bucket["tokens"] = min(bucket["capacity"], bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+            bucket["updated"] = now
+
+    async def acquire(self) -> None:
+        # The lock is held while waiting so callers are admitted in arrival order.
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait_time = max(self.paused_until - now, 0)
+                for bucket in self.buckets:
+                    if bucket["tokens"] < 1:
+                        wait_time = max(wait_time, (1 - bucket["tokens"]) / bucket["rate"])
+
+                if wait_time <= 0:
+                    for bucket in self.buckets:
+                        bucket["tokens"] -= 1
+                    self.calls += 1
+                    return
+
+                self.wait_seconds += wait_time
+                await asyncio.sleep(wait_time)
+
+    def pause(self, seconds: float) -> None:
+        now = time.monotonic()
+        resume_at = now + seconds
+        if resume_at > self.paused_until:
+            self.pause_seconds += resume_at - max(self.paused_until, now)
+            self.paused_until = resume_at
+        self.throttled += 1
+
+    def usage(self, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Pass an earlier usage() snapshot as `since` to get the budget used by a single run.
+        since = since or {}
+        self._refill(time.monotonic())
+        return {
+            "calls": self.calls - since.get("calls", 0),
+            "throttled": self.throttled - since.get("throttled", 0),
+            "wait_seconds": round(self.wait_seconds - since.get("wait_seconds", 0), 2),
+            "pause_seconds": round(self.pause_seconds - since.get("pause_seconds", 0), 2),
+            "minute_budget_remaining": int(self.buckets[0]["tokens"]),
+            "hour_budget_remaining": int(self.buckets[1]["tokens"]),
+        }
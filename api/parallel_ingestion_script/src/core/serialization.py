@@ -0,0 +1,248 @@
+import re
+import gzip
+import json
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODE_BATCH_SIZE = 1000
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(record)
+        except TypeError:
+            # orjson rejects a few values the stdlib accepts (e.g. integers above 64 bits).
+            pass
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_records(gz: gzip.GzipFile, records: List[Dict[str, Any]]) -> int:
+    # Appends the records as NDJSON to an open gzip writer and returns the uncompressed bytes written.
+    raw_size = 0
+    for i in range(0, len(records), ENCODE_BATCH_SIZE):
+        lines = b"\n".join(encode_record(r) for r in records[i:i + ENCODE_BATCH_SIZE]) + b"\n"
+        raw_size += len(lines)
+        gz.write(lines)
+    return raw_size
+
+
+def serialize_records(records: List[Dict[str, Any]], compression_level: int = 1, fileobj: Optional[Any] = None) -> Dict[str, Any]:
+    # Writes the records once as gzip-compressed NDJSON and returns the rewound buffer together
+    # with the uncompressed size, which ADX uses as the raw data size hint. Pass fileobj to write
+    # somewhere other than a new BytesIO; rewinding it is then left to the caller.
+    buffer = fileobj if fileobj is not None else BytesIO()
+
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=compression_level) as gz:
+        raw_size = write_records(gz, records)
+
+    if fileobj is None:
+        buffer.seek(0)
+    return {
+        "data_stream": buffer,
+        "raw_size": raw_size,
+        "records_count": len(records),
+        "low_watermark": None,
+        "high_watermark": None
+    }
+
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_raw_results(text: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    # Walks the top-level response object and yields each element of its "Results" array as the
+    # original JSON text plus its decoded value. Only one element is decoded at a time, and the
+    # text slice is what gets ingested, so nothing is re-encoded.
+    decoder = json.JSONDecoder()
+
+    def skip(idx: int) -> int:
+        return WHITESPACE.match(text, idx).end()
+
+    idx = skip(0)
+    if text[idx:idx + 1] != "{":
+        raise ValueError("Advanced Hunting response is not a JSON object")
+    idx = skip(idx + 1)
+
+    while text[idx:idx + 1] != "}":
+        key, idx = decoder.raw_decode(text, idx)
+        idx = skip(idx)
+        if text[idx:idx + 1] != ":":
+            raise ValueError(f"Malformed Advanced Hunting response near offset {idx}")
+        idx = skip(idx + 1)
+
+        if key == "Results" and text[idx:idx + 1] == "[":
+            idx = skip(idx + 1)
+            while text[idx:idx + 1] != "]":
+                value, end = decoder.raw_decode(text, idx)
+                yield text[idx:end], value
+                idx = skip(end)
+                if text[idx:idx + 1] == ",":
+                    idx = skip(idx + 1)
+            idx = skip(idx + 1)
+        else:
+            _, idx = decoder.raw_decode(text, idx)
+            idx = skip(idx)
+
+        if text[idx:idx + 1] == ",":
+            idx = skip(idx + 1)
+
+
+def write_raw_response(gz: gzip.GzipFile, raw: bytes, watermark_column: str) -> Dict[str, Any]:
+    # Appends the Results of an undecoded Advanced Hunting response to an open gzip writer.
+    raw_size = 0
+    records_count = 0
+    low_watermark = None
+    high_watermark = None
+    lines = []
+
+    for element, value in iter_raw_results(raw.decode("utf-8")):
+        # Same ordering as ingest_to_adx: Defender returns watermarks as uniformly formatted ISO strings.
+        watermark = value.get(watermark_column) if isinstance(value, dict) else None
+        if watermark is not None:
+            if low_watermark is None or watermark < low_watermark:
+                low_watermark = watermark
+            if high_watermark is None or watermark > high_watermark:
+                high_watermark = watermark
+
+        # Raw newlines can only be insignificant whitespace in valid JSON, so they are safe to flatten.
+        lines.append(element.replace("\n", " ") if "\n" in element else element)
+        records_count += 1
+
+        if len(lines) >= ENCODE_BATCH_SIZE:
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            raw_size += len(data)
+            gz.write(data)
+            lines = []
+
+    if lines:
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        raw_size += len(data)
+        gz.write(data)
+
+    return {
+        "raw_size": raw_size,
+        "records_count": records_count,
+        "low_watermark": low_watermark,
+        "high_watermark": high_watermark
+    }
+
+
+def serialize_raw_response(raw: bytes, watermark_column: str, compression_level: int = 1, fileobj: Optional[Any] = None) -> Dict[str, Any]:
+    # Pass-through counterpart of serialize_records for an undecoded Advanced Hunting response.
+    buffer = fileobj if fileobj is not None else BytesIO()
+
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=compression_level) as gz:
+        payload = write_raw_response(gz, raw, watermark_column)
+
+    if fileobj is None:
+        buffer.seek(0)
+    payload["data_stream"] = buffer
+    return payload
+
+
+def serialize_chunk(records: Any, watermark_column: Optional[str], compression_level: int = 1, fileobj: Optional[Any] = None) -> Dict[str, Any]:
+    # serialize_raw_response for an undecoded response, otherwise serialize_records plus the
+    # watermark range of the records when a watermark column is given.
+    if isinstance(records, bytes):
+        return serialize_raw_response(records, watermark_column, compression_level, fileobj)
+    payload = serialize_records(records, compression_level, fileobj)
+    if records and watermark_column:
+        payload["low_watermark"] = min(item[watermark_column] for item in records)
+        payload["high_watermark"] = max(item[watermark_column] for item in records)
+    return payload
+
+
+def encode_payload(records: Any, watermark_column: Optional[str], compression_level: int = 1) -> Dict[str, Any]:
+    # Runs in a serialization worker process and returns the compressed bytes instead of a stream, so they pickle.
+    buffer = BytesIO()
+    payload = serialize_chunk(records, watermark_column, compression_level, buffer)
+    payload.pop("data_stream", None)
+    payload["data"] = buffer.getvalue()
+    return payload
+
+
+class SerializationPool:
+    # Encoding and gzip hold the GIL, so ingest threads serializing chunks side by side share one
+    # core. This pool moves that work into worker processes: a thread hands its chunk over the
+    # pool's pipe, waits with the GIL released, and gets the compressed bytes back. Only undecoded
+    # responses are sent: pickling a list of dicts in the parent holds the GIL about as long as
+    # encoding it, so record lists are serialized in place. Responses under min_records are also
+    # cheaper to serialize in place than to send across.
+
+    def __init__(self, processes: int, min_records: int = 1000):
+        self.processes = processes
+        self.min_records = min_records
+        self.users = 0
+        self.lock = threading.Lock()
+        self.executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # Spawned workers only import this module, instead of forking a copy of a threaded host.
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+
+    def offload(self, records: Any) -> bool:
+        # Undecoded responses are offloaded by size, assuming a few hundred bytes per record.
+        return isinstance(records, bytes) and len(records) >= self.min_records * 256
+
+    def serialize(self, records: Any, watermark_column: Optional[str], compression_level: int = 1, fileobj: Optional[Any] = None) -> Dict[str, Any]:
+        # Same result as serialize_chunk; blocks the calling thread, not the GIL, until a worker is done.
+        if not self.offload(records):
+            return serialize_chunk(records, watermark_column, compression_level, fileobj)
+
+        executor = self.executor
+        try:
+            payload = executor.submit(encode_payload, records, watermark_column, compression_level).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool and serialize this chunk here.
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = self._create_executor()
+            return serialize_chunk(records, watermark_column, compression_level, fileobj)
+
+        buffer = fileobj if fileobj is not None else BytesIO()
+        buffer.write(payload.pop("data"))
+        if fileobj is None:
+            buffer.seek(0)
+        payload["data_stream"] = buffer
+        return payload
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+_serialization_pools = {}
+_serialization_pools_lock = threading.Lock()
+
+
+def get_serialization_pool(bootstrap: Dict[str, Any]) -> Optional[SerializationPool]:
+    # One pool per setting, shared by every engine in the process; None when serialize_processes is unset.
+    # Each engine that gets the pool releases it with release_serialization_pool when it closes.
+    processes = bootstrap.get("serialize_processes", 0)
+    if not processes:
+        return None
+    settings = (processes, bootstrap.get("serialize_process_min_records", 1000))
+    with _serialization_pools_lock:
+        if settings not in _serialization_pools:
+            _serialization_pools[settings] = SerializationPool(*settings)
+        _serialization_pools[settings].users += 1
+        return _serialization_pools[settings]
+
+
+def release_serialization_pool(pool: SerializationPool) -> None:
+    # The last engine to release a pool stops its worker processes; the next engine to ask starts a new one.
+    with _serialization_pools_lock:
+        pool.users -= 1
+        if pool.users > 0:
+            return
+        _serialization_pools.pop((pool.processes, pool.min_records), None)
+    pool.shutdown()
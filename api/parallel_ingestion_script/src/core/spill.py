@@ -0,0 +1,148 @@
+import os
+import asyncio
+import tempfile
+import threading
+from io import BytesIO
+from typing import Dict, Any, Optional
+
+from src.core.telemetry import log
+
+
+class MemoryBudget:
+    # Byte budget shared by every chunk held in memory between fetch and ingest. Fetches are admitted
+    # against it with their estimated response size, so the number of responses and decoded chunks in
+    # flight is bounded by the budget rather than by fetch_concurrency. Compressed payloads that
+    # would push the total over the budget are written to disk instead.
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.in_use = 0
+        self.fetching = 0
+        self.peak = 0
+        self.spilled_chunks = 0
+        self.spilled_bytes = 0
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.in_use + size > self.budget_bytes:
+                return False
+            self.in_use += size
+            self.peak = max(self.peak, self.in_use)
+            return True
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self.in_use -= size
+        self._wake()
+
+    async def admit_fetch(self, size: int) -> None:
+        # Waits until a fetch of about size bytes fits the budget. A fetch is always admitted when
+        # no other is in flight, so an oversized chunk or a budget held by payloads still progresses.
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if not self.fetching or self.in_use + size <= self.budget_bytes:
+                    self.in_use += size
+                    self.fetching += size
+                    self.peak = max(self.peak, self.in_use)
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
+
+    def release_fetch(self, size: int) -> None:
+        with self._lock:
+            self.in_use -= size
+            self.fetching -= size
+        self._wake()
+
+    def _wake(self) -> None:
+        # Payload releases happen on ingest threads, so waiting fetches are woken on their own loop.
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(lambda w=waiter: w.done() or w.set_result(None))
+
+    def record_spill(self, size: int) -> None:
+        with self._lock:
+            self.spilled_chunks += 1
+            self.spilled_bytes += size
+
+    def usage(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "peak_bytes": self.peak,
+                "spilled_chunks": self.spilled_chunks,
+                "spilled_bytes": self.spilled_bytes
+            }
+
+
+class SpillBuffer:
+    # Write target for a compressed chunk payload. Bytes stay in memory while the budget allows and
+    # move to a .gz temp file, which the ingest client treats as pre-compressed, once it does not.
+
+    def __init__(self, budget: MemoryBudget, directory: Optional[str] = None):
+        self.budget = budget
+        self.directory = directory
+        self.buffer = BytesIO()
+        self.reserved = 0
+        self.path = None
+        self.file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def write(self, data) -> int:
+        if self.file is None and not self.budget.reserve(len(data)):
+            self._spill()
+
+        if self.file is not None:
+            return self.file.write(data)
+
+        self.reserved += len(data)
+        return self.buffer.write(data)
+
+    def flush(self) -> None:
+        if self.file is not None:
+            self.file.flush()
+
+    def _spill(self) -> None:
+        fd, self.path = tempfile.mkstemp(prefix="chunk-", suffix=".json.gz", dir=self.directory)
+        self.file = os.fdopen(fd, "wb")
+        self.file.write(self.buffer.getbuffer())
+
+        self.buffer = None
+        self.budget.release(self.reserved)
+        self.reserved = 0
+
+    def finish(self) -> Optional[BytesIO]:
+        # Returns the rewound in-memory stream, or None once the payload lives in self.path.
+        if self.file is not None:
+            self.budget.record_spill(self.file.tell())
+            self.file.close()
+            self.file = None
+            return None
+
+        if self.buffer is not None:
+            self.buffer.seek(0)
+        return self.buffer
+
+    def discard(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                log.warning(f"Could not remove spill file {self.path}: {str(e)}")
+            self.path = None
+
+        self.buffer = None
+        self.budget.release(self.reserved)
+        self.reserved = 0
@@ -0,0 +1,277 @@
+import sys
+import json
+import math
+import time
+import asyncio
+import threading
+import contextlib
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    from opentelemetry import metrics as otel_metrics, trace as otel_trace
+except ImportError:
+    otel_metrics = otel_trace = None
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+# Upper bounds shared by every histogram: stage timings in seconds, queue depths in items.
+HISTOGRAM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, math.inf)
+
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "SUCCESS": 20, "WARNING": 30, "ERROR": 40}
+
+
+class Log:
+    # Leveled logger that keeps the "[LEVEL] --> message" lines of the original prints. Every call
+    # site may log at most rate_limit lines per rate_window seconds; lines below ERROR beyond that
+    # are dropped and counted, and the count is reported with the next line that gets through.
+    # Extra keyword fields are appended as key=value, or emitted as JSON lines with format "json".
+
+    def __init__(self, level: str = "INFO", log_format: str = "text", rate_limit: int = 100, rate_window: float = 10.0):
+        self.lock = threading.Lock()
+        self.sites = {}
+        self.configure(level, log_format, rate_limit, rate_window)
+
+    def configure(self, level: str = "INFO", log_format: str = "text", rate_limit: int = 100, rate_window: float = 10.0) -> None:
+        self.level = LOG_LEVELS.get(str(level).upper(), 20)
+        self.json_format = log_format == "json"
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+
+    def enabled(self, level: str) -> bool:
+        return LOG_LEVELS[level] >= self.level
+
+    def _emit(self, level: str, message: str, args: Tuple[Any, ...], fields: Dict[str, Any]) -> None:
+        if LOG_LEVELS[level] < self.level:
+            return
+
+        # Call sites are told apart by code location, so one noisy loop cannot starve the others.
+        caller = sys._getframe(2)
+        site = (caller.f_code.co_filename, caller.f_lineno)
+        now = time.monotonic()
+        with self.lock:
+            state = self.sites.get(site)
+            if state is None or now - state[0] >= self.rate_window:
+                suppressed = state[2] if state else 0
+                state = self.sites[site] = [now, 0, 0]
+            else:
+                suppressed = 0
+            if self.rate_limit and state[1] >= self.rate_limit and LOG_LEVELS[level] < LOG_LEVELS["ERROR"]:
+                state[2] += 1
+                return
+            state[1] += 1
+
+            text = message % args if args else message
+            if suppressed:
+                fields = dict(fields, suppressed=suppressed)
+            if self.json_format:
+                record = {"timestamp": datetime.now(timezone.utc).isoformat(), "level": level, "message": text, "thread": threading.current_thread().name}
+                record.update(fields)
+                print(json.dumps(record, default=str))
+            else:
+                suffix = "".join(f" {key}={value}" for key, value in fields.items())
+                print(f"[{level}] --> {text}{suffix}")
+
+    def debug(self, message: str, *args: Any, **fields: Any) -> None:
+        self._emit("DEBUG", message, args, fields)
+
+    def info(self, message: str, *args: Any, **fields: Any) -> None:
+        self._emit("INFO", message, args, fields)
+
+    def success(self, message: str, *args: Any, **fields: Any) -> None:
+        self._emit("SUCCESS", message, args, fields)
+
+    def warning(self, message: str, *args: Any, **fields: Any) -> None:
+        self._emit("WARNING", message, args, fields)
+
+    def error(self, message: str, *args: Any, **fields: Any) -> None:
+        self._emit("ERROR", message, args, fields)
+
+
+log = Log()
+
+
+def configure_logging(bootstrap: Dict[str, Any]) -> None:
+    log.configure(
+        bootstrap.get("log_level", "INFO"),
+        bootstrap.get("log_format", "text"),
+        bootstrap.get("log_rate_limit", 100),
+        bootstrap.get("log_rate_window", 10.0)
+    )
+
+
+class OpenTelemetryExporter:
+    # Mirrors every measurement to the global OpenTelemetry meter, so whatever provider the host
+    # configured (e.g. azure-monitor-opentelemetry) ships it, and wraps stages in spans.
+
+    def __init__(self):
+        self.meter = otel_metrics.get_meter("frigatebird.ingestion")
+        self.tracer = otel_trace.get_tracer("frigatebird.ingestion")
+        self.instruments = {}
+
+    def observe(self, name: str, value: float) -> None:
+        if name not in self.instruments:
+            self.instruments[name] = self.meter.create_histogram(f"ingestion.{name}")
+        self.instruments[name].record(value)
+
+    def increment(self, name: str, value: float) -> None:
+        if name not in self.instruments:
+            self.instruments[name] = self.meter.create_counter(f"ingestion.{name}")
+        self.instruments[name].add(value)
+
+    def span(self, name: str):
+        return self.tracer.start_as_current_span(name)
+
+
+class PrometheusExporter:
+    # Serves every measurement on a Prometheus scrape endpoint at the given port.
+
+    def __init__(self, port: int):
+        prometheus_client.start_http_server(port)
+        self.instruments = {}
+
+    def observe(self, name: str, value: float) -> None:
+        if name not in self.instruments:
+            self.instruments[name] = prometheus_client.Histogram(f"ingestion_{name}", name, buckets=HISTOGRAM_BUCKETS)
+        self.instruments[name].observe(value)
+
+    def increment(self, name: str, value: float) -> None:
+        if name not in self.instruments:
+            self.instruments[name] = prometheus_client.Counter(f"ingestion_{name}", name)
+        self.instruments[name].inc(value)
+
+    def span(self, name: str):
+        return contextlib.nullcontext()
+
+
+class Telemetry:
+    # In-process histograms and counters for the pipeline's stages: Defender calls, JSON decode,
+    # serialization, ingestion, metadata commands, queue depths and event-loop lag. Measurements
+    # are also forwarded to an optional exporter. Like the rate limiter's usage(), report() takes an
+    # earlier snapshot() to cover a single run.
+
+    def __init__(self, exporter: Any = None, loop_lag_interval: float = 0.5):
+        self.exporter = exporter
+        self.loop_lag_interval = loop_lag_interval
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.lag_monitors = {}
+
+    def observe(self, name: str, value: float) -> None:
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = {"count": 0, "sum": 0.0, "buckets": [0] * len(HISTOGRAM_BUCKETS)}
+            histogram["count"] += 1
+            histogram["sum"] += value
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+        if self.exporter:
+            self.exporter.observe(name, value)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self.exporter:
+            self.exporter.increment(name, value)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        # Times the block into the "<name>_seconds" histogram; usable in threads and coroutines alike.
+        start = time.perf_counter()
+        with self.exporter.span(name) if self.exporter else contextlib.nullcontext():
+            try:
+                yield
+            finally:
+                self.observe(f"{name}_seconds", time.perf_counter() - start)
+
+    async def _monitor_loop_lag(self) -> None:
+        # A blocked event loop wakes this sleep late; the overshoot is the lag every coroutine saw.
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.loop_lag_interval)
+            self.observe("event_loop_lag_seconds", max(time.perf_counter() - start - self.loop_lag_interval, 0.0))
+
+    def start_loop_monitor(self) -> None:
+        # One monitor per event loop, however many pipelines run on it.
+        loop = asyncio.get_running_loop()
+        monitor = self.lag_monitors.get(loop)
+        if monitor is None or monitor["task"].done():
+            monitor = self.lag_monitors[loop] = {"task": asyncio.create_task(self._monitor_loop_lag()), "users": 0}
+        monitor["users"] += 1
+
+    async def stop_loop_monitor(self) -> None:
+        loop = asyncio.get_running_loop()
+        monitor = self.lag_monitors.get(loop)
+        if monitor is None:
+            return
+        monitor["users"] -= 1
+        if monitor["users"] <= 0:
+            del self.lag_monitors[loop]
+            monitor["task"].cancel()
+            await asyncio.gather(monitor["task"], return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "histograms": {name: {"count": h["count"], "sum": h["sum"], "buckets": list(h["buckets"])} for name, h in self.histograms.items()},
+                "counters": dict(self.counters)
+            }
+
+    def report(self, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Percentiles are estimated as the upper bound of the bucket they fall in.
+        since = since or {"histograms": {}, "counters": {}}
+        current = self.snapshot()
+        histograms = {}
+        for name, h in sorted(current["histograms"].items()):
+            before = since["histograms"].get(name, {"count": 0, "sum": 0.0, "buckets": [0] * len(HISTOGRAM_BUCKETS)})
+            count = h["count"] - before["count"]
+            if count <= 0:
+                continue
+            buckets = [a - b for a, b in zip(h["buckets"], before["buckets"])]
+            histograms[name] = {
+                "count": count,
+                "sum": round(h["sum"] - before["sum"], 4),
+                "mean": round((h["sum"] - before["sum"]) / count, 4),
+                "p50": self._percentile(buckets, count, 0.5),
+                "p99": self._percentile(buckets, count, 0.99)
+            }
+        counters = {name: value - since["counters"].get(name, 0) for name, value in sorted(current["counters"].items())}
+        return {"histograms": histograms, "counters": {name: value for name, value in counters.items() if value}}
+
+    @staticmethod
+    def _percentile(buckets: list, count: int, q: float) -> float:
+        cumulative = 0
+        for bound, bucket_count in zip(HISTOGRAM_BUCKETS, buckets):
+            cumulative += bucket_count
+            if cumulative >= q * count:
+                return bound if bound != math.inf else HISTOGRAM_BUCKETS[-2]
+        return HISTOGRAM_BUCKETS[-2]
+
+
+_telemetry = {}
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry(bootstrap: Dict[str, Any]) -> Telemetry:
+    # One Telemetry per exporter setting, shared by every engine in the process. An exporter whose
+    # package is not installed falls back to in-process metrics only.
+    exporter_name = bootstrap.get("telemetry_exporter")
+    key = (exporter_name, bootstrap.get("telemetry_prometheus_port", 9464), bootstrap.get("telemetry_loop_lag_interval", 0.5))
+    with _telemetry_lock:
+        if key not in _telemetry:
+            exporter = None
+            if exporter_name == "otel" and otel_metrics is not None:
+                exporter = OpenTelemetryExporter()
+            elif exporter_name == "prometheus" and prometheus_client is not None:
+                exporter = PrometheusExporter(key[1])
+            elif exporter_name:
+                log.warning("Telemetry exporter %s is unavailable; keeping metrics in process only", exporter_name)
+            _telemetry[key] = Telemetry(exporter, key[2])
+        return _telemetry[key]
@@ -0,0 +1,129 @@
+import time
+import random
+import asyncio
+import aiohttp
+import threading
+from typing import Dict, Any
+
+from src.core.telemetry import log
+
+
+class TokenProvider:
+    # Client-credential AAD tokens with one cache and one lock per resource, so acquiring a token
+    # for one resource never blocks callers of another. After each acquisition a background task
+    # renews the token refresh_margin seconds before it expires, so callers keep getting a cached
+    # token instead of waiting on AAD. AAD calls go through the provider's own aiohttp session.
+
+    def __init__(self, tenant_id: str, client_id: str, client_secret: str, authority_host: str = "https://login.microsoftonline.com", refresh_margin: int = 300, idle_timeout: int = 3600):
+        self.token_url = f"{authority_host.rstrip('/')}/{tenant_id}/oauth2/token"
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.idle_timeout = idle_timeout
+
+        self.loop = None
+        self.session = None
+        self.resources = {}
+
+    def _bind_loop(self) -> None:
+        # Sessions, locks and refresh tasks belong to one event loop; a new loop (for example a
+        # second asyncio.run in the same process) starts from a clean state but keeps valid tokens.
+        loop = asyncio.get_running_loop()
+        if self.loop is loop:
+            return
+
+        self.loop = loop
+        self.session = None
+        for state in self.resources.values():
+            state["lock"] = asyncio.Lock()
+            state["refresher"] = None
+
+    def _state(self, resource: str) -> Dict[str, Any]:
+        if resource not in self.resources:
+            self.resources[resource] = {"token": None, "expires_at": 0.0, "last_used": 0.0, "lock": asyncio.Lock(), "refresher": None}
+        return self.resources[resource]
+
+    async def get_token(self, resource: str) -> str:
+        self._bind_loop()
+        state = self._state(resource)
+        state["last_used"] = time.monotonic()
+        if state["token"] and time.monotonic() < state["expires_at"] - self.refresh_margin / 2:
+            return state["token"]
+
+        async with state["lock"]:
+            if state["token"] and time.monotonic() < state["expires_at"] - self.refresh_margin / 2:
+                return state["token"]
+            await self._acquire(resource)
+            return state["token"]
+
+    async def _acquire(self, resource: str) -> None:
+        await self._fetch(resource)
+        state = self._state(resource)
+        if state["refresher"] is None or state["refresher"].done():
+            state["refresher"] = asyncio.create_task(self._refresh(resource))
+
+    async def _fetch(self, resource: str) -> None:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+
+        body = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "resource": resource
+        }
+
+        try:
+            async with self.session.post(self.token_url, data=body) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"Failed to get token for {resource}: {response.status} - {error_text}")
+                token_data = await response.json()
+        except Exception as e:
+            raise Exception(f"Token acquisition failed for {resource}: {str(e)}")
+
+        expires_in = int(token_data.get("expires_in", 3600))
+        state = self._state(resource)
+        state["token"] = token_data["access_token"]
+        state["expires_at"] = time.monotonic() + expires_in
+        log.info(f"Token acquired for {resource}, valid for {expires_in} seconds")
+
+    async def _refresh(self, resource: str) -> None:
+        state = self._state(resource)
+        while True:
+            await asyncio.sleep(max(state["expires_at"] - self.refresh_margin - time.monotonic(), 1))
+            # Stop renewing tokens nobody has asked for in a while, e.g. between scheduled runs
+            # in a warm Function host; the next get_token fetches one on demand again.
+            if time.monotonic() - state["last_used"] > self.idle_timeout:
+                return
+            try:
+                async with state["lock"]:
+                    if time.monotonic() >= state["expires_at"] - self.refresh_margin:
+                        await self._fetch(resource)
+            except Exception as e:
+                # The cached token is still valid for a while; retry shortly rather than giving up.
+                log.warning(f"Background token refresh failed: {str(e)}")
+                await asyncio.sleep(random.uniform(5, 15))
+
+    async def close(self) -> None:
+        for state in self.resources.values():
+            if state["refresher"]:
+                state["refresher"].cancel()
+                state["refresher"] = None
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_token_provider(bootstrap: Dict[str, Any]) -> TokenProvider:
+    # One provider per service principal and authority, shared by every engine in the process.
+    authority_host = bootstrap.get("aad_authority_host", "https://login.microsoftonline.com")
+    key = (authority_host, bootstrap["tenantId"], bootstrap["clientId"])
+    with _providers_lock:
+        if key not in _providers:
+            _providers[key] = TokenProvider(bootstrap["tenantId"], bootstrap["clientId"], bootstrap["clientSecret"], authority_host)
+        return _providers[key]
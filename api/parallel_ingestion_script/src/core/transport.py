@@ -0,0 +1,127 @@
+import asyncio
+import aiohttp
+import threading
+from typing import Dict, Any, Optional
+
+
+class HttpTransport:
+    # Long-lived aiohttp session for Defender calls, shared by every engine and phase in the process.
+    # The connector caches DNS answers and keeps connections alive between calls, so a warm host
+    # skips the DNS lookup and TLS handshake that a fresh session pays on every run. Responses are
+    # requested gzip/deflate-encoded and decompressed by aiohttp. Trace hooks count how many
+    # requests reused a pooled connection.
+
+    def __init__(
+        self,
+        limit: int = 50,
+        limit_per_host: int = 10,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 60.0,
+        total_timeout: float = 900.0,
+        compress: bool = True
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.total_timeout = total_timeout
+        self.compress = compress
+
+        self.loop = None
+        self.session = None
+
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_lookups = 0
+        self.dns_cache_hits = 0
+        self.compressed_responses = 0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_resolvehost_end(session, context, params):
+            self.dns_lookups += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_request_end(session, context, params):
+            if params.response.headers.get("Content-Encoding", "").lower() in ("gzip", "deflate"):
+                self.compressed_responses += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # Sessions belong to one event loop; a new loop gets a new session, while the counters carry on.
+        loop = asyncio.get_running_loop()
+        if self.loop is loop and self.session is not None and not self.session.closed:
+            return self.session
+
+        self.loop = loop
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.total_timeout),
+            headers={"Accept-Encoding": "gzip, deflate"} if self.compress else {"Accept-Encoding": "identity"},
+            trace_configs=[self._trace_config()]
+        )
+        return self.session
+
+    def usage(self, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Pass an earlier usage() snapshot as `since` to get the traffic of a single run.
+        since = since or {}
+        usage = {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "dns_lookups": self.dns_lookups,
+            "dns_cache_hits": self.dns_cache_hits,
+            "compressed_responses": self.compressed_responses
+        }
+        return {key: value - since.get(key, 0) for key, value in usage.items()}
+
+    async def close(self) -> None:
+        if self.session and not self.session.closed and self.loop is asyncio.get_running_loop():
+            await self.session.close()
+        self.session = None
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(bootstrap: Dict[str, Any]) -> HttpTransport:
+    # One transport per pool configuration, shared by every engine in the process.
+    settings = (
+        bootstrap.get("http_pool_size", 50),
+        bootstrap.get("http_pool_size_per_host", 10),
+        bootstrap.get("http_dns_ttl", 300),
+        bootstrap.get("http_keepalive_timeout", 60),
+        bootstrap.get("http_timeout", 900),
+        bootstrap.get("http_compression", True)
+    )
+    with _transports_lock:
+        if settings not in _transports:
+            _transports[settings] = HttpTransport(*settings)
+        return _transports[settings]
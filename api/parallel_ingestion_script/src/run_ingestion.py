@@ -1,4 +1,6 @@
 import os
+import json
+import time
 import uuid
 import pprint
 from dotenv import load_dotenv
@@ -9,6 +11,11 @@ from azure.kusto.data import KustoClient, KustoConnectionStringBuilder
 
 from src.core.ingestion_engine import Ingestor
 from src.core.chunk_reprocessor import Reprocessor
+from src.core.rate_limiter import HuntingRateLimiter
+from src.core.token_provider import get_token_provider
+from src.core.metadata_client import AsyncMetadataClient
+from src.core.serialization import release_serialization_pool
+from src.core.telemetry import log
 
 load_dotenv()
 
@@ -26,6 +33,10 @@ bootstrap = {
     "max_concurrent_tasks": 5,
     "max_thread_workers": 8,
     "chunk_size": 25000,
+    "chunking_mode": "keyset",
+    "histogram_bin_size": "1h",
+    "hunting_calls_per_minute": 45,
+    "hunting_calls_per_hour": 1500,
     "clientId": os.getenv("AZURE_CLIENT_ID"),
     "clientSecret": os.getenv("AZURE_CLIENT_SECRET"),
     "tenantId": os.getenv("AZURE_TENANT_ID"),
@@ -43,71 +54,313 @@ def setup_kusto_clients(bootstrap):
     
     return kusto_client
 
-def fetch_migration_config(kusto_client, bootstrap):
-    print("[INFO] --> Fetching migration configuration from ADX...")
+async def fetch_migration_config(metadata_client, bootstrap):
+    log.info("Fetching migration configuration from ADX...")
     
-    response_config = kusto_client.execute(
+    response_config = await metadata_client.execute(
         bootstrap["adx_database"], 
         bootstrap["config_view"]
     )
     
-    print(f"[INFO] --> Retrieved configuration for migration")
+    log.info(f"Retrieved configuration for migration")
 
     return response_config
 
-async def main():
+async def run_reprocessing(rate_limiter, token_provider, shared=None, session=None):
+    # With shared (an Ingestor) the Reprocessor runs on its clients, thread pool and helpers, which stay open.
+    log.info("STARTING CHUNK REPROCESSING")
 
-    print("="*100)
-    print("STARTING CHUNK REPROCESSING")
-    print("="*100)
-    
     reprocess_handler = Reprocessor(
         bootstrap=bootstrap,
         max_concurrent_tasks=bootstrap["max_concurrent_tasks"],
-        chunk_size=bootstrap["chunk_size"]
+        chunk_size=bootstrap["chunk_size"],
+        rate_limiter=rate_limiter,
+        token_provider=token_provider,
+        shared=shared
     )
 
     try:
-        rp_summary = await reprocess_handler.reprocess_failed_chunks()
-        pprint.pprint(rp_summary)
+        rp_summary = await reprocess_handler.reprocess_failed_chunks(session)
+        log.info(pprint.pformat(rp_summary))
     except Exception as e:
-        print(f"[ERROR] --> Exception during reprocessing: {e}")
+        log.error(f"Exception during reprocessing: {e}")
         rp_summary = {"status": "error", "message": str(e)}
     finally:
-        reprocess_handler.thread_pool.shutdown(wait=True)
+        if shared is None:
+            close_ingestor(reprocess_handler)
 
-    print("="*100)
-    print("STARTING MAIN INGESTION")
-    print("="*100)
+    return rp_summary
+
+async def load_table_configs(run_bootstrap, metadata_client=None):
+    owned = metadata_client is None
+    if owned:
+        metadata_client = AsyncMetadataClient(setup_kusto_clients(run_bootstrap))
+    try:
+        response_config = await fetch_migration_config(metadata_client, run_bootstrap)
+    finally:
+        if owned:
+            metadata_client.shutdown()
+
+    table = response_config.primary_results[0]
+    return [row.to_dict() for row in table if (row["IsActive"] and not (row["LoadType"] == "Full" and row["HighWatermark"]))]
 
+def new_run_bootstrap():
     now = datetime.now(timezone.utc)
     kusto_ingest_datetime = now.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    bootstrap["ingestion_start_time"] = kusto_ingest_datetime
+    return dict(bootstrap, ingestion_start_time=kusto_ingest_datetime, ingestion_id=str(uuid.uuid4()))
 
-    bootstrap["ingestion_id"] = str(uuid.uuid4())
+async def run_concurrently(rate_limiter, token_provider):
+    # Reprocessing and the main ingestion run side by side in one event loop. The Reprocessor runs
+    # on the Ingestor's Kusto clients and thread pool, and both share one HTTP transport and one
+    # Defender budget, so the run takes as long as the longer phase instead of both.
+    run_bootstrap = new_run_bootstrap()
+    bootstrap["ingestion_start_time"] = run_bootstrap["ingestion_start_time"]
+    bootstrap["ingestion_id"] = run_bootstrap["ingestion_id"]
 
-    kusto_client = setup_kusto_clients(bootstrap)
+    ingestion_handler = Ingestor(
+        bootstrap=bootstrap,
+        max_concurrent_tasks=bootstrap["max_concurrent_tasks"],
+        max_thread_workers=bootstrap["max_thread_workers"],
+        chunk_size=bootstrap["chunk_size"],
+        rate_limiter=rate_limiter,
+        token_provider=token_provider
+    )
 
-    response_config = fetch_migration_config(kusto_client, bootstrap)
+    async def run_main_ingestion(session):
+        log.info("STARTING MAIN INGESTION")
 
-    table = response_config.primary_results[0]
-    table_configs = [row.to_dict() for row in table if (row["IsActive"] and not (row["LoadType"] == "Full" and row["HighWatermark"]))]
+        table_configs = await load_table_configs(bootstrap, ingestion_handler.metadata_client)
+        if not table_configs:
+            return "[INFO] --> No active tables found for migration"
+
+        log.info(f"Found {len(table_configs)} active tables for migration")
+        try:
+            p_summary = await ingestion_handler.process_all_tables(table_configs, session)
+            log.info(pprint.pformat(p_summary))
+            return p_summary
+        except Exception as e:
+            return f"[ERROR] --> Exception during processing: {e}"
+
+    try:
+        session = ingestion_handler.transport.get_session()
+        rp_summary, p_summary = await asyncio.gather(
+            run_reprocessing(rate_limiter, token_provider, ingestion_handler, session),
+            run_main_ingestion(session)
+        )
+        return {"reprocessing_summary": rp_summary, "processing_summary": p_summary}
+    finally:
+        close_ingestor(ingestion_handler)
+
+async def main():
+    rate_limiter = HuntingRateLimiter(bootstrap["hunting_calls_per_minute"], bootstrap["hunting_calls_per_hour"])
+    token_provider = get_token_provider(bootstrap)
+
+    if bootstrap.get("concurrent_reprocessing", False):
+        return await run_concurrently(rate_limiter, token_provider)
+
+    rp_summary = await run_reprocessing(rate_limiter, token_provider)
+
+    log.info("STARTING MAIN INGESTION")
+
+    run_bootstrap = new_run_bootstrap()
+    bootstrap["ingestion_start_time"] = run_bootstrap["ingestion_start_time"]
+    bootstrap["ingestion_id"] = run_bootstrap["ingestion_id"]
+
+    table_configs = await load_table_configs(bootstrap)
     if table_configs:
-        print(f"[INFO] --> Found {len(table_configs)} active tables for migration")
+        log.info(f"Found {len(table_configs)} active tables for migration")
         try:
             ingestion_handler = Ingestor(
                 bootstrap=bootstrap,
                 max_concurrent_tasks=bootstrap["max_concurrent_tasks"],
                 max_thread_workers=bootstrap["max_thread_workers"],
-                chunk_size=bootstrap["chunk_size"]
+                chunk_size=bootstrap["chunk_size"],
+                rate_limiter=rate_limiter,
+                token_provider=token_provider
             )
 
             p_summary = await ingestion_handler.process_all_tables(table_configs)
-            pprint.pprint(p_summary)
+            log.info(pprint.pformat(p_summary))
             return {"reprocessing_summary": rp_summary, "processing_summary": p_summary}
         except Exception as e:
             return f"[ERROR] --> Exception during processing: {e}"
         finally:
-            ingestion_handler.thread_pool.shutdown(wait=True)
+            close_ingestor(ingestion_handler)
     else:
         return "[INFO] --> No active tables found for migration"
+
+# Fan-out orchestration: the Durable orchestrator calls these as separate activities, so one
+# migration is planned once, ingested by many activities spread over the Function App's instances,
+# and committed once. Activity inputs and outputs must be JSON, hence to_payload.
+
+def to_payload(value):
+    return json.loads(json.dumps(value, default=str))
+
+def activity_bootstrap(run):
+    return dict(bootstrap, ingestion_start_time=run["ingestion_start_time"], ingestion_id=run["ingestion_id"])
+
+def create_ingestor(run_bootstrap, rate_limiter=None):
+    return Ingestor(
+        bootstrap=run_bootstrap,
+        max_concurrent_tasks=run_bootstrap["max_concurrent_tasks"],
+        max_thread_workers=run_bootstrap["max_thread_workers"],
+        chunk_size=run_bootstrap["chunk_size"],
+        rate_limiter=rate_limiter,
+        token_provider=get_token_provider(run_bootstrap)
+    )
+
+def close_ingestor(ingestion_handler):
+    ingestion_handler.thread_pool.shutdown(wait=True)
+    ingestion_handler.metadata_client.shutdown()
+    if ingestion_handler.serialization_pool:
+        release_serialization_pool(ingestion_handler.serialization_pool)
+
+async def reprocess_activity():
+    rate_limiter = HuntingRateLimiter(bootstrap["hunting_calls_per_minute"], bootstrap["hunting_calls_per_hour"])
+    return to_payload(await run_reprocessing(rate_limiter, get_token_provider(bootstrap)))
+
+async def plan_activity():
+    # Plans every active table and splits the chunks into activity-sized partitions: one per
+    # table, or at most chunks_per_activity chunks each.
+    log.info("PLANNING MAIN INGESTION")
+
+    run_bootstrap = new_run_bootstrap()
+    run = {
+        "ingestion_id": run_bootstrap["ingestion_id"],
+        "ingestion_start_time": run_bootstrap["ingestion_start_time"],
+        "started": time.time(),
+        "max_parallel_activities": run_bootstrap.get("max_parallel_activities", 8)
+    }
+
+    table_configs = await load_table_configs(run_bootstrap)
+    if not table_configs:
+        return {"run": run, "table_configs": [], "table_plans": [], "partitions": []}
+
+    log.info(f"Found {len(table_configs)} active tables for migration")
+    ingestion_handler = create_ingestor(run_bootstrap)
+    try:
+        table_plans = await ingestion_handler.plan_tables(ingestion_handler.transport.get_session(), table_configs)
+    finally:
+        close_ingestor(ingestion_handler)
+
+    table_plans = [
+        table_plan if isinstance(table_plan, dict) else {
+            "folder": config["DestinationFolder"],
+            "table": config["DestinationTable"],
+            "success": False,
+            "records_processed": 0,
+            "chunks_processed": 0,
+            "chunks_failed": 0,
+            "chunked": False,
+            "error": str(table_plan)
+        }
+        for config, table_plan in zip(table_configs, table_plans)
+    ]
+
+    chunks_per_activity = run_bootstrap.get("chunks_per_activity")
+    partitions = []
+    for table_plan in table_plans:
+        work_items = table_plan.get("work_items") or []
+        step = chunks_per_activity or len(work_items) or 1
+        for start in range(0, len(work_items), step):
+            partitions.append({
+                "table_plan": dict(table_plan, work_items=work_items[start:start + step]),
+                "complete": step >= len(work_items)
+            })
+
+    run["partitions"] = len(partitions)
+    log.info(f"Planned {sum(len(p['table_plan']['work_items']) for p in partitions)} chunks in {len(partitions)} partitions")
+    return to_payload({"run": run, "table_configs": table_configs, "table_plans": table_plans, "partitions": partitions})
+
+def failed_partition_results(ingestion_handler, partition, error):
+    # Records every chunk of a partition that did not report back as failed with its planned range,
+    # so the commit still runs for the other partitions and the reprocessor replays this one.
+    table_plan = partition["table_plan"]
+    return [
+        {
+            "key": [table_plan["table_config"]["DestinationTable"], item["chunk_index"], list(item.get("split_path") or [])],
+            "result": ingestion_handler.build_chunk_result(table_plan["table_config"], item["chunk_index"], False, error[:500], item.get("chunk_range"))
+        }
+        for item in table_plan.get("work_items") or []
+    ]
+
+async def ingest_partition_activity(run, partition):
+    # Each activity gets an equal share of the Defender call budget, since the instances running
+    # partitions in parallel cannot share one limiter. Only as many activities as there are
+    # partitions run at once, so a small plan does not leave budget unused.
+    run_bootstrap = activity_bootstrap(run)
+    share = max(min(run.get("partitions", run["max_parallel_activities"]), run["max_parallel_activities"]), 1)
+    rate_limiter = HuntingRateLimiter(
+        max(run_bootstrap["hunting_calls_per_minute"] // share, 1),
+        max(run_bootstrap["hunting_calls_per_hour"] // share, 1)
+    )
+
+    table_plan = partition["table_plan"]
+    ingestion_handler = create_ingestor(run_bootstrap, rate_limiter)
+    try:
+        chunk_results = await ingestion_handler.process_table_plans(ingestion_handler.transport.get_session(), [table_plan], checkpoint=partition["complete"])
+    except Exception as e:
+        log.error(f"Partition of {table_plan['table_config']['DestinationTable']} failed: {str(e)}")
+        return to_payload({
+            "chunk_results": failed_partition_results(ingestion_handler, partition, f"Partition failed: {str(e)}"),
+            "chunk_sizes": ingestion_handler.chunk_sizer.learned_sizes(),
+            "api_usage": rate_limiter.usage()
+        })
+    finally:
+        close_ingestor(ingestion_handler)
+
+    results = []
+    for (destination_tbl, chunk_index, split_path), result in chunk_results.items():
+        if isinstance(result, Exception):
+            result = ingestion_handler.build_chunk_result(table_plan["table_config"], chunk_index, False, str(result)[:500])
+        results.append({"key": [destination_tbl, chunk_index, list(split_path)], "result": result})
+
+    return to_payload({
+        "chunk_results": results,
+        "chunk_sizes": ingestion_handler.chunk_sizer.learned_sizes(),
+        "api_usage": rate_limiter.usage()
+    })
+
+def merge_api_usage(usages):
+    merged = {"calls": 0, "throttled": 0, "wait_seconds": 0.0, "pause_seconds": 0.0}
+    for usage in usages:
+        for key in merged:
+            merged[key] += usage.get(key, 0)
+    merged["wait_seconds"] = round(merged["wait_seconds"], 2)
+    merged["pause_seconds"] = round(merged["pause_seconds"], 2)
+    merged["activities"] = len(usages)
+    return merged
+
+async def commit_activity(plan, partition_results):
+    # Fan-in: rebuilds every table's results from the partitions and writes the config, audit
+    # and chunk-failure rows once for the whole run.
+    run_bootstrap = activity_bootstrap(plan["run"])
+    ingestion_handler = create_ingestor(run_bootstrap)
+    try:
+        chunk_results = {}
+        for partition_result in partition_results:
+            # The orchestrator reports a partition whose activity crashed or timed out as its error.
+            if partition_result.get("error"):
+                partition_result = {
+                    "chunk_results": failed_partition_results(ingestion_handler, partition_result["partition"], partition_result["error"]),
+                    "chunk_sizes": {},
+                    "api_usage": {}
+                }
+            for item in partition_result["chunk_results"]:
+                destination_tbl, chunk_index, split_path = item["key"]
+                chunk_results[(destination_tbl, chunk_index, tuple(split_path))] = item["result"]
+            for destination_tbl, size in partition_result["chunk_sizes"].items():
+                sizes = ingestion_handler.chunk_sizer.sizes
+                sizes[destination_tbl] = min(sizes.get(destination_tbl, size), size)
+
+        p_summary = await ingestion_handler.commit_results(
+            plan["table_configs"],
+            plan["table_plans"],
+            chunk_results,
+            time.time() - plan["run"]["started"],
+            merge_api_usage([r["api_usage"] for r in partition_results])
+        )
+        log.info(pprint.pformat(p_summary))
+        return to_payload(p_summary)
+    finally:
+        close_ingestor(ingestion_handler)